@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+
+from retrieval import estimate_tokens
+
+# Lower runs first: analysts waiting on an answer go ahead of queued report generation
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+# Deployment quota shared by all sessions (Azure limits requests and tokens per minute)
+REQUESTS_PER_MINUTE = 60
+TOKENS_PER_MINUTE = 60_000
+MAX_CONCURRENCY = 4
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+_DONE = object()
+
+
+class TokenBucket:
+    """Token bucket refilled at rate per second up to capacity; used from the scheduler's event loop only"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # Requests larger than the bucket still go through once it is full
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def drain(self):
+        """Empty the bucket after the server signals a rate limit, so dispatch slows down for everyone"""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+def request_key(messages, **params):
+    """Identity of a completion request; identical in-flight requests share one API call"""
+    payload = json.dumps({'messages': messages, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _is_rate_limit(error):
+    return getattr(error, 'status_code', None) == 429
+
+
+def _retry_after(error):
+    """Server-suggested delay in seconds from a 429, when it sent one"""
+    if getattr(error, 'retry_after', None) is not None:
+        return float(error.retry_after)
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Job:
+    def __init__(self, key, client, request, priority):
+        self.key = key
+        self.client = client
+        self.request = request
+        self.priority = priority
+        self.cost = estimate_tokens(json.dumps(request['messages'])) + (request.get('max_tokens') or 0)
+        self.attempts = 0
+        self.parts = []
+        self.subscribers = []
+
+
+class RequestScheduler:
+    """Process-wide scheduler for chat completions shared by all Streamlit sessions
+
+    Requests from any thread go into one priority queue served by an
+    asyncio loop on a daemon thread. Dispatch waits on token buckets for
+    the requests- and tokens-per-minute quota and on a concurrency limit,
+    and takes the most urgent queued request only when it can run, so
+    interactive questions overtake batch work. A request identical to one
+    already in flight subscribes to that call instead of making another:
+    it replays the text received so far, then follows the live stream.
+    429 responses are retried with exponential backoff (or the server's
+    Retry-After) as long as no text has been delivered yet.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE_SECONDS, backoff_max=BACKOFF_MAX_SECONDS):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = TokenBucket(requests_per_minute / 60, max(1, requests_per_minute / 6))
+        self.tokens = TokenBucket(tokens_per_minute / 60, max(1, tokens_per_minute / 6))
+        self._counters = dict.fromkeys(('submitted', 'coalesced', 'completed', 'failed', 'retries'), 0)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(max_concurrency), self._loop).result()
+
+    async def _start(self, max_concurrency):
+        self._queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def stream(self, client, messages, priority=PRIORITY_INTERACTIVE, key=None, **params):
+        """Text deltas of a streamed completion, scheduled with the given priority; blocks the calling thread"""
+        request = dict(params, messages=messages)
+        key = key or request_key(messages, **params)
+        subscriber = queue.Queue()
+        with self._lock:
+            self._counters['submitted'] += 1
+            job = self._inflight.get(key)
+            if job is not None:
+                self._counters['coalesced'] += 1
+                for part in job.parts:
+                    subscriber.put(part)
+            else:
+                job = self._inflight[key] = _Job(key, client, request, priority)
+                self._loop.call_soon_threadsafe(self._enqueue, job)
+            job.subscribers.append(subscriber)
+
+        while True:
+            item = subscriber.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def complete(self, client, messages, priority=PRIORITY_BATCH, key=None, **params):
+        """Full completion text; batch priority unless stated otherwise"""
+        return ''.join(self.stream(client, messages, priority=priority, key=key, **params))
+
+    def _enqueue(self, job):
+        self._queue.put_nowait((job.priority, next(self._sequence), job))
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            await self.requests.acquire()
+            # Picked only now, so requests queued while waiting compete on priority
+            _, _, job = await self._queue.get()
+            await self.tokens.acquire(job.cost)
+            asyncio.ensure_future(self._run(job))
+
+    async def _run(self, job):
+        try:
+            await asyncio.to_thread(self._call, job)
+        except Exception as e:
+            if _is_rate_limit(e) and not job.parts and job.attempts < self.max_retries:
+                job.attempts += 1
+                with self._lock:
+                    self._counters['retries'] += 1
+                self.requests.drain()
+                delay = _retry_after(e) or min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+                self._loop.call_later(delay * random.uniform(1, 1.25), self._enqueue, job)
+            else:
+                self._finish(job, e)
+        else:
+            self._finish(job, _DONE)
+        finally:
+            self._slots.release()
+
+    def _call(self, job):
+        """Blocking API call on a worker thread, fanning each delta out to the job's subscribers"""
+        stream = job.client.chat.completions.create(**job.request, stream=True)
+        for chunk in stream:
+            # Azure sends content-filter chunks without choices
+            if chunk.choices and chunk.choices[0].delta.content:
+                with self._lock:
+                    job.parts.append(chunk.choices[0].delta.content)
+                    for subscriber in job.subscribers:
+                        subscriber.put(chunk.choices[0].delta.content)
+
+    def _finish(self, job, outcome):
+        with self._lock:
+            del self._inflight[job.key]
+            self._counters['completed' if outcome is _DONE else 'failed'] += 1
+            for subscriber in job.subscribers:
+                subscriber.put(outcome)
+
+    def close(self):
+        """Stop the event loop once its tasks have been cancelled; queued requests are abandoned"""
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._inflight), queued=self._queue.qsize())
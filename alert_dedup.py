@@ -0,0 +1,142 @@
+import hashlib
+from collections import deque
+from datetime import datetime, timedelta
+
+from join_layer import normalize_company_name
+
+# Repeats of the same (entity, pattern) within this window of event time are merged into one alert
+SUPPRESSION_WINDOW = timedelta(hours=24)
+WINDOW_BUCKETS = 24
+
+
+def dedup_key(alert):
+    """64-bit hash of the alert's (entity, pattern) as a hex string
+
+    The entity is the company, or for alerts spanning several parties (such
+    as transfer cycles) the set of companies involved, so distinct cycles
+    through the same company stay distinct.
+    """
+    if alert.get('companies'):
+        entity = '+'.join(sorted({normalize_company_name(name) for name in alert['companies']}))
+    else:
+        entity = normalize_company_name(alert.get('company')) or alert.get('location') or ''
+    pattern = (alert.get('type') or '').strip().upper()
+    digest = hashlib.blake2b(f"{entity}|{pattern}".encode('utf-8'), digest_size=8).digest()
+    return digest.hex()
+
+
+def event_time(alert, default):
+    """When the detected activity happened: the alert's created_at, else default"""
+    value = alert.get('created_at')
+    if value is None:
+        return default
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return moment.replace(tzinfo=None)
+
+
+class AlertDeduplicator:
+    """Suppress repeat alerts in front of the alert store
+
+    Repeats are judged on event time (the alert's created_at), not on when
+    the alert was submitted, so a batch replaying months of history only
+    merges detections that really happened within one window of each other.
+    State is a dict from dedup key to (alert_id, first bucket, last bucket)
+    plus a ring of time buckets listing the keys registered in each; the
+    newest event seen is the watermark that expires old buckets. Keys not
+    held in memory (older history, or after a restart) are looked up in the
+    store, so memory stays proportional to the distinct alerts of one window.
+    """
+
+    def __init__(self, store, window=SUPPRESSION_WINDOW, buckets=WINDOW_BUCKETS, now=None):
+        self.store = store
+        self.window = window
+        self.bucket_seconds = window.total_seconds() / buckets
+        self.window_buckets = buckets
+        self._live = {}
+        self._buckets = deque()
+        self._watermark = None
+        self.published = 0
+        self.merged = 0
+        self._warm_start(now or datetime.now())
+
+    def _bucket(self, moment):
+        return int(moment.timestamp() // self.bucket_seconds)
+
+    def _remember(self, key, alert_id, bucket):
+        previous = self._live.get(key)
+        if previous is not None and previous[0] == alert_id:
+            first, last = min(previous[1], bucket), max(previous[2], bucket)
+            if (first, last) == previous[1:]:
+                return
+        else:
+            first = last = bucket
+        self._live[key] = (alert_id, first, last)
+        # Filed under the watermark (never older than the entry), so the ring stays in order
+        slot = last if self._watermark is None else max(last, self._watermark)
+        if not self._buckets or self._buckets[-1][0] < slot:
+            self._buckets.append((slot, []))
+        self._buckets[-1][1].append(key)
+
+    def _advance(self, bucket):
+        """Move the watermark to bucket if it is newer and expire buckets that fell out of the window"""
+        if self._watermark is not None and bucket <= self._watermark:
+            return
+        self._watermark = bucket
+        oldest_live = bucket - self.window_buckets + 1
+        while self._buckets and self._buckets[0][0] < oldest_live:
+            _, keys = self._buckets.popleft()
+            for key in keys:
+                entry = self._live.get(key)
+                # Keys seen again later were re-registered in a newer bucket
+                if entry is not None and entry[2] < oldest_live:
+                    del self._live[key]
+
+    def _warm_start(self, now):
+        """Rebuild state from alerts the store saw within the window"""
+        rows = self.store.recent_dedup_keys(now - self.window)
+        for row in sorted(rows, key=lambda row: row['last_seen']):
+            bucket = self._bucket(datetime.fromisoformat(row['last_seen']))
+            self._advance(bucket)
+            self._remember(row['dedup_key'], row['alert_id'], bucket)
+
+    def _match(self, key, moment):
+        """Id of the alert this detection repeats, or None"""
+        bucket = self._bucket(moment)
+        entry = self._live.get(key)
+        if entry is not None and entry[1] - self.window_buckets < bucket < entry[2] + self.window_buckets:
+            return entry[0]
+        row = self.store.find_duplicate(key, moment - self.window, moment + self.window)
+        return row['alert_id'] if row else None
+
+    def submit(self, alerts, now=None):
+        """Publish new alerts and fold repeats, with their evidence, into the alert they duplicate
+
+        Alerts without a created_at are taken to have happened at now. An
+        alert that matches itself (the same id, e.g. from re-running a batch)
+        is republished as a refresh rather than counted as a repeat.
+        Returns (published, merged) counts for this batch; published includes
+        refreshes and merged only counts repeats not already folded in.
+        """
+        now = now or datetime.now()
+        timed = sorted(((event_time(alert, now), alert) for alert in alerts), key=lambda item: item[0])
+
+        new_alerts = []
+        repeats = {}
+        for moment, alert in timed:
+            key = dedup_key(alert)
+            self._advance(self._bucket(moment))
+            alert_id = self._match(key, moment)
+            if alert_id is None or alert_id == alert['id']:
+                alert_id = alert['id']
+                new_alerts.append(dict(alert, dedup_key=key, last_seen=moment.isoformat(timespec='seconds')))
+            else:
+                repeats.setdefault(alert_id, []).append((moment, alert))
+            self._remember(key, alert_id, self._bucket(moment))
+
+        if new_alerts:
+            self.store.publish(new_alerts, now=now)
+        merged = self.store.record_repeats(repeats, now=now) if repeats else 0
+
+        self.published += len(new_alerts)
+        self.merged += merged
+        return len(new_alerts), merged
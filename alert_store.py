@@ -0,0 +1,248 @@
+import json
+from datetime import datetime
+
+from storage import Database
+
+# Lower rank sorts first in the feed
+PRIORITY_RANK = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+
+STATUS_OPEN = 'OPEN'
+STATUS_CLOSED = 'CLOSED'
+# Evidence kept per alert from the repeat detections merged into it
+MAX_MERGED_DETECTIONS = 100
+
+# Columns stored natively; any other alert keys go to the JSON payload
+_ALERT_COLUMNS = {
+    'id': 'alert_id', 'type': 'alert_type', 'risk': 'risk', 'company': 'company',
+    'location': 'location', 'details': 'details', 'alert_source': 'alert_source', 'score': 'score',
+}
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS alerts (
+        alert_id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        status TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        risk TEXT NOT NULL,
+        company TEXT,
+        alert_type TEXT,
+        location TEXT,
+        details TEXT,
+        alert_source TEXT,
+        score REAL,
+        payload TEXT,
+        dedup_key TEXT,
+        occurrences INTEGER NOT NULL DEFAULT 1,
+        last_seen TEXT
+    )""",
+    # Feed order is (priority, newest first); alert_id breaks ties for keyset paging
+    "CREATE INDEX IF NOT EXISTS idx_alerts_feed ON alerts (status, priority, created_at DESC, alert_id)",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_company ON alerts (company, status)",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_last_seen ON alerts (last_seen)",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_updated ON alerts (updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_dedup ON alerts (dedup_key, last_seen)",
+]
+
+# Columns added after the first release of the table
+_ADDED_COLUMNS = {
+    'dedup_key': "TEXT",
+    'occurrences': "INTEGER NOT NULL DEFAULT 1",
+    'last_seen': "TEXT",
+}
+
+
+class AlertStore:
+    """Persistent alert queue: detectors publish, the dashboard feed pages through open alerts"""
+
+    def __init__(self, db=None):
+        self.db = db if isinstance(db, Database) else Database(db)
+        self.db.executescript(_SCHEMA[:1])
+        self._add_missing_columns()
+        self.db.executescript(_SCHEMA[1:])
+
+    def _add_missing_columns(self):
+        existing = {column.lower() for column in self._column_names()}
+        self.db.executescript([f"ALTER TABLE alerts ADD COLUMN {name} {ddl}"
+                               for name, ddl in _ADDED_COLUMNS.items() if name not in existing])
+
+    def _column_names(self):
+        if self.db.dialect == 'postgres':
+            rows = self.db.query("SELECT column_name AS name FROM information_schema.columns WHERE table_name = 'alerts'")
+        else:
+            rows = self.db.query("PRAGMA table_info(alerts)")
+        return [row['name'] for row in rows]
+
+    def publish(self, alerts, now=None):
+        """Insert or refresh alerts keyed by alert id; status, creation time and occurrences are kept
+
+        last_seen is the alert's own last_seen when given (the deduplicator passes event time), else now,
+        and never moves backwards. Repeats already merged into a refreshed alert stay in its payload.
+        """
+        now = (now or datetime.now()).isoformat(timespec='seconds')
+        with self.db.transaction() as cursor:
+            merged = self._merged_detections(cursor, [alert['id'] for alert in alerts])
+            rows = []
+            for alert in alerts:
+                extra = {key: value for key, value in alert.items()
+                         if key not in _ALERT_COLUMNS and key not in ('time', 'created_at', 'status', 'dedup_key', 'occurrences', 'last_seen')}
+                if alert['id'] in merged:
+                    extra['merged_detections'] = merged[alert['id']]
+                rows.append((
+                    alert['id'], alert.get('created_at', now), now, STATUS_OPEN,
+                    PRIORITY_RANK.get(alert.get('risk'), len(PRIORITY_RANK)), alert.get('risk', 'LOW'),
+                    alert.get('company'), alert.get('type'), alert.get('location'), alert.get('details'),
+                    alert.get('alert_source'), alert.get('score'), json.dumps(extra, default=str),
+                    alert.get('dedup_key'), alert.get('last_seen', now),
+                ))
+            cursor.executemany(
+                """INSERT INTO alerts (alert_id, created_at, updated_at, status, priority, risk, company,
+                                       alert_type, location, details, alert_source, score, payload,
+                                       dedup_key, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (alert_id) DO UPDATE SET
+                       last_seen = CASE WHEN alerts.last_seen IS NULL OR excluded.last_seen > alerts.last_seen
+                                        THEN excluded.last_seen ELSE alerts.last_seen END,
+                       updated_at = excluded.updated_at, priority = excluded.priority, risk = excluded.risk,
+                       company = excluded.company, alert_type = excluded.alert_type, location = excluded.location,
+                       details = excluded.details, alert_source = excluded.alert_source, score = excluded.score,
+                       payload = excluded.payload""",
+                rows,
+            )
+        return len(rows)
+
+    def _merged_detections(self, cursor, alert_ids, chunk_size=500):
+        """Stored merged_detections of the given alerts that have any, by alert id"""
+        merged = {}
+        for start in range(0, len(alert_ids), chunk_size):
+            chunk = alert_ids[start:start + chunk_size]
+            cursor.execute(f"SELECT alert_id, payload FROM alerts WHERE alert_id IN ({', '.join('?' * len(chunk))})",
+                           chunk)
+            for row in cursor.fetchall():
+                detections = json.loads(row['payload'] or '{}').get('merged_detections')
+                if detections:
+                    merged[row['alert_id']] = detections
+        return merged
+
+    def open_alerts(self, limit=10, cursor=None, status=STATUS_OPEN):
+        """Return one page of alerts in feed order plus the cursor for the next page
+
+        Keyset pagination walks idx_alerts_feed directly, so each page costs the
+        same no matter how many alerts are stored or how deep the page is.
+        """
+        if cursor is None:
+            rows = self.db.query(
+                """SELECT * FROM alerts WHERE status = ?
+                   ORDER BY priority, created_at DESC, alert_id LIMIT ?""",
+                (status, limit),
+            )
+        else:
+            priority, created_at, alert_id = cursor
+            rows = self.db.query(
+                """SELECT * FROM alerts WHERE status = ?
+                     AND (priority > ? OR (priority = ? AND (created_at < ? OR (created_at = ? AND alert_id > ?))))
+                   ORDER BY priority, created_at DESC, alert_id LIMIT ?""",
+                (status, priority, priority, created_at, created_at, alert_id, limit),
+            )
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_cursor = (last['priority'], last['created_at'], last['alert_id'])
+        return [_row_to_alert(row) for row in rows], next_cursor
+
+    def record_repeats(self, repeats, now=None):
+        """Fold repeat detections into existing alerts: {alert_id: [(event time, alert), ...]}
+
+        Occurrences go up by one per detection and last_seen moves to the newest
+        event. Each detection's time, details and transaction ids are appended
+        to the alert's merged_detections (the latest MAX_MERGED_DETECTIONS are
+        kept). Re-detections of the alert itself, or of a detection already
+        merged into it, come from re-running a batch and are skipped.
+        Returns the number of detections folded in.
+        """
+        now = (now or datetime.now()).isoformat(timespec='seconds')
+        folded = 0
+        with self.db.transaction() as cursor:
+            for alert_id, detections in repeats.items():
+                cursor.execute("SELECT payload, last_seen FROM alerts WHERE alert_id = ?", (alert_id,))
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                payload = json.loads(rows[0]['payload'] or '{}')
+                merged = payload.get('merged_detections', [])
+                seen = {alert_id} | {detection['alert_id'] for detection in merged}
+                detections = [(moment, alert) for moment, alert in detections if alert['id'] not in seen]
+                if not detections:
+                    continue
+                merged += [{'time': moment.isoformat(timespec='seconds'), 'alert_id': alert['id'],
+                            'details': alert.get('details'), 'transaction_ids': alert.get('transaction_ids', [])}
+                           for moment, alert in detections]
+                payload['merged_detections'] = merged[-MAX_MERGED_DETECTIONS:]
+                last_seen = max([rows[0]['last_seen'] or ''] +
+                                [moment.isoformat(timespec='seconds') for moment, _ in detections])
+                cursor.execute(
+                    """UPDATE alerts SET occurrences = occurrences + ?, last_seen = ?, updated_at = ?, payload = ?
+                       WHERE alert_id = ?""",
+                    (len(detections), last_seen, now, json.dumps(payload, default=str), alert_id),
+                )
+                folded += len(detections)
+        return folded
+
+    def find_duplicate(self, dedup_key, start, end):
+        """Most recently seen alert with this dedup key whose [created_at, last_seen] span meets [start, end]"""
+        rows = self.db.query(
+            """SELECT alert_id, created_at, last_seen FROM alerts
+               WHERE dedup_key = ? AND last_seen >= ? AND created_at <= ?
+               ORDER BY last_seen DESC LIMIT 1""",
+            (dedup_key, start.isoformat(timespec='seconds'), end.isoformat(timespec='seconds')),
+        )
+        return rows[0] if rows else None
+
+    def recent_dedup_keys(self, since):
+        """Alerts seen since a timestamp, used to rebuild deduplication state after a restart"""
+        return self.db.query(
+            "SELECT alert_id, dedup_key, last_seen FROM alerts WHERE last_seen >= ? AND dedup_key IS NOT NULL",
+            (since.isoformat(timespec='seconds'),),
+        )
+
+    def changed_since(self, cursor=('', ''), limit=1000):
+        """Alerts changed after an (updated_at, alert_id) cursor, oldest change first
+
+        Pass the last returned alert's (updated_at, id) to continue; alerts
+        updated again later come back with their new timestamp.
+        """
+        updated_at, alert_id = cursor
+        rows = self.db.query(
+            """SELECT * FROM alerts WHERE updated_at > ? OR (updated_at = ? AND alert_id > ?)
+               ORDER BY updated_at, alert_id LIMIT ?""",
+            (updated_at, updated_at, alert_id, limit),
+        )
+        return [_row_to_alert(row) for row in rows]
+
+    def get_alert(self, alert_id):
+        rows = self.db.query("SELECT * FROM alerts WHERE alert_id = ?", (alert_id,))
+        return _row_to_alert(rows[0]) if rows else None
+
+    def alerts_for_company(self, company, status=STATUS_OPEN):
+        rows = self.db.query("SELECT * FROM alerts WHERE company = ? AND status = ?", (company, status))
+        return [_row_to_alert(row) for row in rows]
+
+    def set_status(self, alert_id, status):
+        return self.db.execute(
+            "UPDATE alerts SET status = ?, updated_at = ? WHERE alert_id = ?",
+            (status, datetime.now().isoformat(timespec='seconds'), alert_id),
+        )
+
+
+def _row_to_alert(row):
+    """Convert a stored row back into the alert dict used by the dashboard"""
+    alert = json.loads(row['payload'] or '{}')
+    for key, column in _ALERT_COLUMNS.items():
+        alert[key] = row[column]
+    alert['status'] = row['status']
+    alert['occurrences'] = row['occurrences']
+    alert['created_at'] = row['created_at']
+    alert['updated_at'] = row['updated_at']
+    created_at = datetime.fromisoformat(row['created_at'])
+    alert['time'] = created_at.strftime('%H:%M WIB' if created_at.date() == datetime.now().date() else '%d %b %H:%M WIB')
+    return alert
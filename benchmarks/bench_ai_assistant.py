@@ -0,0 +1,104 @@
+"""Benchmark the AI assistant path offline against the local LLM stand-in
+
+Each simulated analyst session asks questions drawn from a pool (so some
+repeat): retrieval builds the context, the response cache is consulted,
+and misses stream a completion from llm_backend's stand-in, either
+in-process or through its HTTP server with the openai client. Reports
+time to first token, answer latency and cache hit rate. Run from the
+repository root:
+
+    python benchmarks/bench_ai_assistant.py [sessions] [questions_per_session] [--http]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_backend import LocalChatClient, serve
+from response_cache import ResponseCache, response_cache_key
+from retrieval import RetrievalIndex, company_documents, transaction_documents
+
+DEFAULT_SESSIONS = 8
+DEFAULT_QUESTIONS = 10
+MODEL = 'gpt-4o-mini'
+MAX_TOKENS = 800
+QUESTIONS = [
+    "Siapa pemilik manfaat PT SAWIT NUSANTARA?",
+    "Pola structuring yang terdeteksi minggu ini",
+    "Transaksi mencurigakan PT KARYA UTAMA CONSULTING",
+    "Perusahaan perkebunan kelapa sawit dengan risk score tinggi",
+    "Hubungan Ahmad Wijaya dengan perusahaan lain",
+    "Transfer lintas negara yang ditandai",
+    "Shell company dengan modal disetor rendah",
+    "Ringkasan transaksi keluar terbesar",
+    "Perusahaan suspicious di Kalimantan",
+    "Rekomendasi investigasi lanjutan untuk clearing hutan",
+]
+
+
+def ask(client, cache, index, question):
+    """One assistant turn; returns (seconds to first token, seconds to complete answer, was_cached)"""
+    start = time.perf_counter()
+    context = index.context(question)
+    key = response_cache_key(MODEL, '', context, question, 0.7, max_tokens=MAX_TOKENS)
+    if cache.get(key) is not None:
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed, True
+    messages = [{'role': 'user', 'content': f"Konteks data: {context}\nPertanyaan user: {question}"}]
+    first_token = None
+    parts = []
+    for chunk in client.chat.completions.create(model=MODEL, messages=messages, max_tokens=MAX_TOKENS, stream=True):
+        if chunk.choices and chunk.choices[0].delta.content:
+            first_token = first_token or time.perf_counter() - start
+            parts.append(chunk.choices[0].delta.content)
+    cache.put(key, ''.join(parts), model=MODEL)
+    return first_token, time.perf_counter() - start, False
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    sessions = int(args[0]) if args else DEFAULT_SESSIONS
+    questions = int(args[1]) if len(args) > 1 else DEFAULT_QUESTIONS
+
+    index = RetrievalIndex()
+    start = time.perf_counter()
+    index.add_documents(company_documents(pd.read_csv('data/pt_data.csv')))
+    index.add_documents(transaction_documents(pd.read_csv('data/transactions.csv')))
+    print(f"{len(index.index)} documents indexed in {time.perf_counter() - start:.2f}s")
+
+    client = LocalChatClient()
+    server = None
+    if '--http' in sys.argv:
+        from openai import OpenAI
+        server = serve(client, port=0, background=True)
+        client = OpenAI(base_url=f"http://127.0.0.1:{server.server_port}/v1", api_key='local')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(f"sqlite:///{tmp}/cache.db")
+        rng = np.random.default_rng(0)
+        plan = [QUESTIONS[i] for i in rng.integers(0, len(QUESTIONS), sessions * questions)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(sessions) as pool:
+            results = list(pool.map(lambda question: ask(client, cache, index, question), plan))
+        elapsed = time.perf_counter() - start
+        stats = cache.stats()
+
+    first_token, total, cached = (np.array(column) for column in zip(*results))
+    print(f"{len(plan)} questions from {sessions} sessions in {elapsed:.2f}s "
+          f"({len(plan) / elapsed:.1f}/s), cache hit rate {stats['hit_rate']:.1%}")
+    for name, selected in (('generated', ~cached), ('cached', cached)):
+        if selected.any():
+            print(f"{name:<10} n={selected.sum():<5} first token p50 {np.median(first_token[selected]) * 1000:7.1f} ms  "
+                  f"answer p50 {np.median(total[selected]) * 1000:7.1f} ms  p95 {np.percentile(total[selected], 95) * 1000:7.1f} ms")
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
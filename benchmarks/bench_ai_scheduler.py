@@ -0,0 +1,96 @@
+"""Benchmark the shared AI request scheduler against a rate-limited stand-in
+
+A burst of batch report requests and interactive questions (many of them
+repeated across sessions) hits llm_backend's stand-in, which answers 429
+above its requests-per-minute quota. Without the scheduler every session
+calls the backend directly and loses the requests over quota; through
+ai_scheduler.RequestScheduler the same burst is paced, deduplicated and
+retried, with interactive questions served ahead of the batch. Run from
+the repository root:
+
+    python benchmarks/bench_ai_scheduler.py [batch_requests] [interactive_requests] [requests_per_minute]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RequestScheduler
+from llm_backend import LocalChatClient
+
+DEFAULT_BATCH = 30
+DEFAULT_INTERACTIVE = 40
+DEFAULT_QUOTA = 60
+# Distinct interactive questions; sessions ask overlapping ones
+DISTINCT_QUESTIONS = 8
+MODEL = 'gpt-4o-mini'
+
+
+def workload(n_batch, n_interactive):
+    rng = np.random.default_rng(0)
+    requests = [(PRIORITY_BATCH, f"Draft STR narrative for case CASE-{i:03d}") for i in range(n_batch)]
+    requests += [(PRIORITY_INTERACTIVE, f"Pertanyaan analis nomor {q}")
+                 for q in rng.integers(0, DISTINCT_QUESTIONS, n_interactive)]
+    return requests
+
+
+def direct(client, priority, text):
+    try:
+        client.chat.completions.create(model=MODEL, messages=[{'role': 'user', 'content': text}], max_tokens=50,
+                                       stream=False)
+        return True
+    except Exception as e:
+        if getattr(e, 'status_code', None) == 429:
+            return False
+        raise
+
+
+def scheduled(scheduler, client, priority, text):
+    scheduler.complete(client, [{'role': 'user', 'content': text}], priority=priority, model=MODEL, max_tokens=50)
+    return True
+
+
+def run(name, call, requests):
+    latencies = {PRIORITY_INTERACTIVE: [], PRIORITY_BATCH: []}
+
+    def timed(request):
+        start = time.perf_counter()
+        ok = call(*request)
+        latencies[request[0]].append(time.perf_counter() - start)
+        return ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(requests)) as pool:
+        succeeded = sum(pool.map(timed, requests))
+    print(f"{name:<10} {succeeded:>4}/{len(requests)} answered in {time.perf_counter() - start:6.1f}s  "
+          f"interactive p50 {np.median(latencies[PRIORITY_INTERACTIVE]):5.1f}s  "
+          f"batch p50 {np.median(latencies[PRIORITY_BATCH]):5.1f}s")
+
+
+def main():
+    n_batch = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH
+    n_interactive = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_INTERACTIVE
+    quota = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_QUOTA
+    requests = workload(n_batch, n_interactive)
+    # Batch work arrives first, as when a report run starts just before analysts ask questions
+    requests.sort(key=lambda request: -request[0])
+
+    client = LocalChatClient(first_token_latency=0.2, tokens_per_second=200, requests_per_minute=quota)
+    run('direct', lambda priority, text: direct(client, priority, text), requests)
+    print(f"{'':<10} backend calls {client.requests}, rejected with 429: {client.rate_limited}")
+
+    client = LocalChatClient(first_token_latency=0.2, tokens_per_second=200, requests_per_minute=quota)
+    scheduler = RequestScheduler(requests_per_minute=quota, max_concurrency=4, backoff_base=0.5)
+    run('scheduled', lambda priority, text: scheduled(scheduler, client, priority, text), requests)
+    stats = scheduler.stats()
+    print(f"{'':<10} backend calls {client.requests}, rejected with 429: {client.rate_limited}, "
+          f"coalesced {stats['coalesced']}, retries {stats['retries']}, failed {stats['failed']}")
+    scheduler.close()
+
+
+if __name__ == '__main__':
+    main()
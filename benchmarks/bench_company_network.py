@@ -0,0 +1,90 @@
+"""Benchmark node attribute extraction for the company network page
+
+Compares the old per-node DataFrame scans against the indexed lookup used by
+test.py's create_company_network(). Run from the repository root:
+
+    python benchmarks/bench_company_network.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from network_graph import build_company_index, node_attributes
+
+SIZES = [1000, 10000, 100000]
+# The scan version is quadratic; beyond this it is extrapolated instead of run
+MAX_SCAN_SIZE = 10000
+
+
+def make_companies(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'company_id': [f'PT_{i:06d}' for i in range(n)],
+        'nama_perseroan': [f'PT COMPANY {i:06d}' for i in range(n)],
+        'is_suspicious': rng.random(n) < 0.1,
+        'risk_score': rng.integers(0, 100, n),
+    })
+
+
+def scan_attributes(companies_df, nodes):
+    """Previous implementation: boolean scans of the whole frame per node"""
+    node_colors, node_sizes = [], []
+    for node in nodes:
+        node_data = companies_df[companies_df['nama_perseroan'] == node]
+        if len(node_data) > 0:
+            node_colors.append('red' if node_data.iloc[0].get('is_suspicious', False) else 'lightblue')
+            node_sizes.append(max(15, node_data.iloc[0].get('risk_score', 30) / 3))
+        else:
+            node_colors.append('lightblue')
+            node_sizes.append(15)
+    hovertext = [f"{node}<br>Risk Score: {companies_df[companies_df['nama_perseroan']==node].iloc[0].get('risk_score', 0) if len(companies_df[companies_df['nama_perseroan']==node]) > 0 else 0}" for node in nodes]
+    return node_colors, node_sizes, hovertext
+
+
+def indexed_attributes(companies_df, nodes):
+    """Current implementation: index built once, one reindex for all nodes"""
+    company_index = build_company_index(companies_df)
+    attrs = node_attributes(company_index, nodes, {'is_suspicious': False, 'risk_score': 30})
+    node_colors = np.where(attrs['is_suspicious'].astype(bool).to_numpy(), 'red', 'lightblue')
+    node_sizes = np.maximum(15, attrs['risk_score'].to_numpy(dtype=float) / 3)
+    hover_risk = node_attributes(company_index, nodes, {'risk_score': 0})['risk_score']
+    hovertext = (pd.Series(nodes, dtype=str) + "<br>Risk Score: " + hover_risk.astype(str).to_numpy()).tolist()
+    return node_colors, node_sizes, hovertext
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print(f"{'companies':>10} {'indexed (s)':>12} {'per 1k (ms)':>12} {'scan (s)':>12} {'speedup':>9}")
+    scan_rate = None
+    for n in SIZES:
+        companies_df = make_companies(n)
+        nodes = companies_df['nama_perseroan'].tolist()
+        indexed_time, indexed = timed(indexed_attributes, companies_df, nodes)
+
+        if n <= MAX_SCAN_SIZE:
+            # Time a sample of nodes; each node costs a full scan so this is representative
+            sample = nodes[:min(n, 500)]
+            sample_time, scanned = timed(scan_attributes, companies_df, sample)
+            assert list(scanned[0]) == list(indexed[0][:len(sample)])
+            scan_time = sample_time * n / len(sample)
+            scan_rate = scan_time / n ** 2
+            scan_label = f"{scan_time:12.2f}"
+        else:
+            scan_time = scan_rate * n ** 2
+            scan_label = f"~{scan_time:11.0f}"
+
+        print(f"{n:>10} {indexed_time:12.3f} {indexed_time / n * 1e6:12.3f} {scan_label} {scan_time / indexed_time:8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark land-cover mask encoding: notebook per-class loop vs landcover_codec
+
+Builds DeepGlobe-sized (2448 x 2448) colour masks of random class blobs and
+times the training notebook's one_hot_encode / reverse_one_hot /
+colour_code_segmentation against landcover_codec's packed-uint32 lookup and
+palette indexing, checking both give identical results. Run from the
+repository root:
+
+    python benchmarks/bench_landcover_codec.py [n_masks] [size]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landcover_codec import CLASS_RGB, classes_to_rgb, one_hot, reverse_one_hot, rgb_to_classes
+
+DEFAULT_MASKS = 5
+MASK_SIZE = 2448
+BLOB_SIZE = 16
+
+
+def notebook_one_hot_encode(label, label_values):
+    """one_hot_encode from LandcoverClassification_TDL.ipynb"""
+    semantic_map = []
+    for colour in label_values:
+        equality = np.equal(label, colour)
+        class_map = np.all(equality, axis=-1)
+        semantic_map.append(class_map)
+    return np.stack(semantic_map, axis=-1)
+
+
+def notebook_reverse_one_hot(image):
+    return np.argmax(image, axis=-1)
+
+
+def notebook_colour_code(image, label_values):
+    return np.array(label_values)[image.astype(int)]
+
+
+def synthetic_mask(size, seed):
+    """Colour mask of BLOB_SIZE-pixel class blocks, like the patchy DeepGlobe labels"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, len(CLASS_RGB), (-(-size // BLOB_SIZE),) * 2)
+    classes = np.kron(blocks, np.ones((BLOB_SIZE, BLOB_SIZE), dtype=blocks.dtype))[:size, :size]
+    return np.array(CLASS_RGB, dtype=np.uint8)[classes]
+
+
+def timed(func, masks):
+    start = time.perf_counter()
+    results = [func(mask) for mask in masks]
+    return results, (time.perf_counter() - start) / len(masks)
+
+
+def main():
+    n_masks = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MASKS
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else MASK_SIZE
+    masks = [synthetic_mask(size, seed) for seed in range(n_masks)]
+    rgb_to_classes(masks[0])  # builds the lookup table outside the timing
+
+    print(f"{n_masks} masks of {size}x{size}")
+    print(f"{'step':<28}{'notebook ms':>14}{'codec ms':>12}{'speedup':>10}")
+    steps = [
+        ('rgb -> one-hot',
+         lambda mask: notebook_one_hot_encode(mask, CLASS_RGB).astype('float'),
+         lambda mask: one_hot(rgb_to_classes(mask), dtype='float')),
+        ('rgb -> class indices',
+         lambda mask: notebook_reverse_one_hot(notebook_one_hot_encode(mask, CLASS_RGB)),
+         rgb_to_classes),
+        ('one-hot -> class indices', notebook_reverse_one_hot, reverse_one_hot),
+        ('class indices -> rgb',
+         lambda classes: notebook_colour_code(classes, CLASS_RGB),
+         classes_to_rgb),
+    ]
+    inputs = {
+        'rgb -> one-hot': masks,
+        'rgb -> class indices': masks,
+        'one-hot -> class indices': [one_hot(rgb_to_classes(mask)) for mask in masks],
+        'class indices -> rgb': [rgb_to_classes(mask) for mask in masks],
+    }
+    for name, notebook, codec in steps:
+        expected, notebook_seconds = timed(notebook, inputs[name])
+        actual, codec_seconds = timed(codec, inputs[name])
+        for a, b in zip(expected, actual):
+            if not np.array_equal(a, b):
+                raise AssertionError(f"{name}: codec result differs from the notebook")
+        print(f"{name:<28}{notebook_seconds * 1e3:>14.1f}{codec_seconds * 1e3:>12.1f}"
+              f"{notebook_seconds / codec_seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
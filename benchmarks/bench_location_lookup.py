@@ -0,0 +1,72 @@
+"""Benchmark batch point-in-polygon lookups against a national concession layer
+
+Replicates the map/overlap.shp polygons across Indonesia (as in
+bench_overlap.py), then times location_lookup.PolygonIndex.locate() on
+random points and on points sampled inside the polygons, and checks the
+result against a plain STRtree query over point geometries. Run from the
+repository root:
+
+    python benchmarks/bench_location_lookup.py [n_concessions] [n_points]
+"""
+import os
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_overlap import BASE_LAYER, INDONESIA_BOUNDS, replicate
+from location_lookup import CONCESSION_FIELDS, PolygonIndex
+
+DEFAULT_CONCESSIONS = 20_000
+DEFAULT_POINTS = 2_000_000
+
+
+def reference_locate(geoms, lons, lats):
+    """Lowest containing polygon per point via point geometries and an STRtree predicate query"""
+    points, polygons = shapely.STRtree(geoms).query(shapely.points(lons, lats), predicate='intersects')
+    order = np.lexsort((polygons, points))
+    points, polygons = points[order], polygons[order]
+    first = np.concatenate([[True], points[1:] != points[:-1]]) if len(points) else np.zeros(0, dtype=bool)
+    result = np.full(len(lons), -1, dtype=np.int64)
+    result[points[first]] = polygons[first]
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CONCESSIONS
+    n_points = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_POINTS
+    base = gpd.read_file(BASE_LAYER).to_crs('EPSG:4326')
+    concessions = replicate(base, n, seed=1)
+
+    start = time.perf_counter()
+    index = PolygonIndex(concessions, CONCESSION_FIELDS)
+    print(f"{n} concessions indexed in {time.perf_counter() - start:.2f}s "
+          f"({index.shape[0]}x{index.shape[1]} cells of {index.cell_size:.3f} deg)")
+
+    rng = np.random.default_rng(0)
+    minx, miny, maxx, maxy = INDONESIA_BOUNDS
+    inside = concessions.geometry.sample_points(max(1, n_points // n), rng=rng).explode(index_parts=False)
+    batches = {
+        'uniform': (rng.uniform(minx, maxx, n_points), rng.uniform(miny, maxy, n_points)),
+        'inside polygons': (inside.x.to_numpy(), inside.y.to_numpy()),
+    }
+    print(f"{'points':<16}{'n':>10}{'M pts/s':>9}{'matched':>9}{'reference M pts/s':>19}")
+    geoms = concessions.geometry.to_numpy()
+    for name, (lons, lats) in batches.items():
+        start = time.perf_counter()
+        positions = index.locate(lons, lats)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = reference_locate(geoms, lons, lats)
+        reference_elapsed = time.perf_counter() - start
+        assert np.array_equal(positions, expected), f"{name}: lookup differs from the STRtree reference"
+        print(f"{name:<16}{len(lons):>10}{len(lons) / elapsed / 1e6:>9.2f}{(positions >= 0).mean():>9.1%}"
+              f"{len(lons) / reference_elapsed / 1e6:>19.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark the tiled concession-forest overlap computation
+
+Replicates the map/overlap.shp polygons across the Indonesian bounding box
+to build national-scale concession and forest layers (forest.shp ships
+without geometry, so forests are synthesized from shifted, scaled copies),
+then times overlap_engine.compute_overlaps() from 1 to N worker processes
+and checks every run returns the same result. Run from the repository root:
+
+    python benchmarks/bench_overlap.py [n_concessions] [max_workers]
+"""
+import os
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely import affinity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from overlap_engine import compute_overlaps
+
+BASE_LAYER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'map', 'overlap.shp')
+INDONESIA_BOUNDS = (95.0, -11.0, 141.0, 6.0)
+DEFAULT_CONCESSIONS = 100_000
+
+
+def replicate(base, n, seed, scale=1.0):
+    """n copies of the base polygons, each centered at a random point in Indonesia"""
+    rng = np.random.default_rng(seed)
+    geoms = base.geometry.to_numpy()
+    centroids = shapely.centroid(geoms)
+    picks = rng.integers(0, len(geoms), n)
+    minx, miny, maxx, maxy = INDONESIA_BOUNDS
+    targets_x = rng.uniform(minx, maxx, n)
+    targets_y = rng.uniform(miny, maxy, n)
+    out = []
+    for pick, x, y in zip(picks, targets_x, targets_y):
+        geom = affinity.scale(geoms[pick], scale, scale, origin=centroids[pick])
+        out.append(affinity.translate(geom, x - centroids[pick].x, y - centroids[pick].y))
+    return gpd.GeoDataFrame(geometry=out, crs=base.crs)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CONCESSIONS
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    base = gpd.read_file(BASE_LAYER)
+
+    start = time.perf_counter()
+    concessions = replicate(base, n, seed=1)
+    forests = replicate(base, n, seed=2, scale=1.5)
+    print(f"{n} concessions x {n} forest polygons built in {time.perf_counter() - start:.1f}s "
+          f"({os.cpu_count()} CPUs available)")
+
+    reference = None
+    worker_counts = sorted({1, *[w for w in (2, 4, 8, 16, 32) if w <= max_workers], max_workers})
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'pairs':>9}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        overlaps = compute_overlaps(concessions, forests, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        if reference is None:
+            reference = overlaps
+        else:
+            # Deterministic merge: identical rows regardless of the number of workers
+            assert overlaps[['concession_idx', 'forest_idx']].equals(reference[['concession_idx', 'forest_idx']])
+            assert np.allclose(overlaps['overlap_ha'], reference['overlap_ha'])
+        print(f"{workers:>8} {elapsed:9.2f} {baseline / elapsed:7.2f}x {len(overlaps):>9}")
+
+
+if __name__ == "__main__":
+    main()
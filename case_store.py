@@ -0,0 +1,149 @@
+import json
+from datetime import datetime
+
+from storage import Database
+
+EVENT_EVIDENCE = 'evidence'
+EVENT_ACTION = 'action'
+EVENT_ACTION_DONE = 'action_done'
+EVENT_TIMELINE = 'timeline'
+EVENT_STATUS = 'status'
+EVENT_STR = 'str_report'
+
+
+def _schema(dialect):
+    event_id = "BIGSERIAL PRIMARY KEY" if dialect == 'postgres' else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    return [
+        """CREATE TABLE IF NOT EXISTS cases (
+            case_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            assigned_to TEXT,
+            start_date TEXT NOT NULL,
+            case_summary TEXT
+        )""",
+        # Append-only log; rows are never updated, so concurrent analysts only ever insert
+        f"""CREATE TABLE IF NOT EXISTS case_events (
+            event_id {event_id},
+            case_id TEXT NOT NULL REFERENCES cases (case_id),
+            event_type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            author TEXT,
+            created_at TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_case_events_case ON case_events (case_id, event_id)",
+        "CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status, priority)",
+    ]
+
+
+class CaseStore:
+    """Investigation cases with append-only evidence/action/timeline event logs"""
+
+    def __init__(self, db=None):
+        self.db = db if isinstance(db, Database) else Database(db)
+        self.db.executescript(_schema(self.db.dialect))
+
+    def open_case(self, case_id, case_summary, priority, assigned_to, evidence=(), actions=(), author=None):
+        """Create a case once; later calls (or other analysts) reuse the existing one
+
+        Returns True when this call created the case.
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                """INSERT INTO cases (case_id, status, priority, assigned_to, start_date, case_summary)
+                   VALUES (?, 'ACTIVE', ?, ?, ?, ?) ON CONFLICT (case_id) DO NOTHING""",
+                (case_id, priority, assigned_to, now, json.dumps(case_summary, default=str)),
+            )
+            created = cursor.rowcount == 1
+            if created:
+                events = [(case_id, EVENT_EVIDENCE, item, author, now) for item in evidence]
+                events += [(case_id, EVENT_ACTION, item, author, now) for item in actions]
+                events.append((case_id, EVENT_TIMELINE, 'Investigation opened', author, now))
+                cursor.executemany(
+                    "INSERT INTO case_events (case_id, event_type, content, author, created_at) VALUES (?, ?, ?, ?, ?)",
+                    events,
+                )
+        return created
+
+    def append_event(self, case_id, event_type, content, author=None):
+        self.db.execute(
+            "INSERT INTO case_events (case_id, event_type, content, author, created_at) VALUES (?, ?, ?, ?, ?)",
+            (case_id, event_type, content, author, datetime.now().isoformat(timespec='seconds')),
+        )
+
+    def add_evidence(self, case_id, evidence, author=None):
+        self.append_event(case_id, EVENT_EVIDENCE, evidence, author)
+
+    def add_action(self, case_id, action, author=None):
+        self.append_event(case_id, EVENT_ACTION, action, author)
+
+    def complete_action(self, case_id, action, author=None):
+        self.append_event(case_id, EVENT_ACTION_DONE, action, author)
+
+    def add_str_report(self, case_id, report, author=None):
+        self.append_event(case_id, EVENT_STR, report, author)
+
+    def set_status(self, case_id, status, author=None):
+        """Status changes are logged as events; the current status is the latest one"""
+        self.append_event(case_id, EVENT_STATUS, status, author)
+
+    def load_case(self, case_id):
+        """Load the case row and its whole event log with one indexed query
+
+        Returns the investigation dict used by the dashboard, or None.
+        """
+        rows = self.db.query(
+            """SELECT c.case_id, c.status, c.priority, c.assigned_to, c.start_date, c.case_summary,
+                      e.event_type, e.content, e.author, e.created_at
+               FROM cases c LEFT JOIN case_events e ON e.case_id = c.case_id
+               WHERE c.case_id = ?
+               ORDER BY e.event_id""",
+            (case_id,),
+        )
+        if not rows:
+            return None
+
+        first = rows[0]
+        case = {
+            'alert_id': first['case_id'],
+            'status': first['status'],
+            'priority': first['priority'],
+            'assigned_to': first['assigned_to'],
+            'start_date': datetime.fromisoformat(first['start_date']),
+            'case_summary': json.loads(first['case_summary'] or '{}'),
+            'evidence_collected': [],
+            'next_actions': [],
+            'completed_actions': set(),
+            'str_reports': [],
+            'timeline': []
+        }
+        for row in rows:
+            event_type = row['event_type']
+            if event_type is None:
+                continue
+            if event_type == EVENT_EVIDENCE:
+                case['evidence_collected'].append(row['content'])
+            elif event_type == EVENT_ACTION:
+                case['next_actions'].append(row['content'])
+            elif event_type == EVENT_ACTION_DONE:
+                case['completed_actions'].add(row['content'])
+            elif event_type == EVENT_STATUS:
+                case['status'] = row['content']
+            elif event_type == EVENT_STR:
+                case['str_reports'].append(row['content'])
+            case['timeline'].append({
+                'time': datetime.fromisoformat(row['created_at']),
+                'type': event_type,
+                'content': 'STR report generated' if event_type == EVENT_STR else row['content'],
+                'author': row['author']
+            })
+        return case
+
+    def events_since(self, event_id=0, limit=1000):
+        """Events appended after event_id in log order, for consumers that follow the log incrementally"""
+        return self.db.query(
+            """SELECT event_id, case_id, event_type, content, author, created_at FROM case_events
+               WHERE event_id > ? ORDER BY event_id LIMIT ?""",
+            (event_id, limit),
+        )
@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import rasterio
+import shapely
+from rasterio import features, windows
+
+# Band numbers (1-based) of red and near-infrared in the scenes
+RED_BAND = 3
+NIR_BAND = 4
+# A pixel counts as forest loss when it was vegetated and NDVI dropped by at least this much
+VEGETATED_NDVI = 0.5
+NDVI_LOSS = 0.3
+EARTH_RADIUS_M = 6371007.2
+# GeoTIFF tags recording which polygon layer a zone mask was burned from
+ZONES_HASH_TAG = 'JALAK_ZONES_HASH'
+ZONES_COUNT_TAG = 'JALAK_ZONES_COUNT'
+
+
+def ndvi(red, nir):
+    red = red.astype(np.float32)
+    nir = nir.astype(np.float32)
+    total = nir + red
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, (nir - red) / total, 0.0).astype(np.float32)
+
+
+def row_pixel_area_ha(transform, crs, window):
+    """Pixel area in hectares for each row of a window (varies with latitude on geographic grids)"""
+    if crs is not None and crs.is_geographic:
+        rows = np.arange(window.row_off, window.row_off + window.height)
+        top = np.radians(transform.f + transform.e * rows)
+        bottom = np.radians(transform.f + transform.e * (rows + 1))
+        width = np.radians(abs(transform.a))
+        return EARTH_RADIUS_M ** 2 * width * np.abs(np.sin(top) - np.sin(bottom)) / 10_000
+    return np.full(window.height, abs(transform.a * transform.e) / 10_000)
+
+
+def zones_layer_hash(polygons_gdf):
+    """Fingerprint of a polygon layer's geometries, order and CRS"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(polygons_gdf.crs.to_wkt() if polygons_gdf.crs else '').encode('utf-8'))
+    for wkb in shapely.to_wkb(polygons_gdf.geometry.to_numpy()):
+        digest.update(wkb or b'')
+    return digest.hexdigest()
+
+
+def zones_match(zones_path, polygons_gdf, like_path):
+    """Whether an existing zone mask was burned from this layer on the grid of like_path"""
+    if not Path(zones_path).exists():
+        return False
+    with rasterio.open(zones_path) as zones, rasterio.open(like_path) as like:
+        tags = zones.tags()
+        return (tags.get(ZONES_HASH_TAG) == zones_layer_hash(polygons_gdf)
+                and tags.get(ZONES_COUNT_TAG) == str(len(polygons_gdf))
+                and (zones.width, zones.height) == (like.width, like.height)
+                and zones.transform == like.transform and zones.crs == like.crs)
+
+
+def rasterize_zones(polygons_gdf, like_path, out_path):
+    """Burn polygons into a zone-id GeoTIFF on the grid of a scene, one block at a time
+
+    Zone ids are row positions + 1 (0 is background); where polygons overlap
+    the later one wins. The mask is built once per polygon layer and grid and
+    then read window by window alongside the scenes; the layer's hash and
+    length are stored in its tags so a changed layer is detected.
+    """
+    with rasterio.open(like_path) as like:
+        polygons = polygons_gdf.to_crs(like.crs) if polygons_gdf.crs and like.crs else polygons_gdf
+        geoms = polygons.geometry.to_numpy()
+        tree = shapely.STRtree(geoms)
+        profile = like.profile.copy()
+        profile.update(count=1, dtype='uint32', nodata=0, compress='deflate')
+        with rasterio.open(out_path, 'w', **profile) as dst:
+            dst.update_tags(**{ZONES_HASH_TAG: zones_layer_hash(polygons_gdf), ZONES_COUNT_TAG: str(len(polygons_gdf))})
+            for _, window in like.block_windows(1):
+                bounds = windows.bounds(window, like.transform)
+                hits = np.sort(tree.query(shapely.box(*bounds)))
+                zone = np.zeros((window.height, window.width), dtype=np.uint32)
+                if len(hits):
+                    zone = features.rasterize(
+                        zip(geoms[hits], hits + 1), out_shape=zone.shape,
+                        transform=windows.transform(window, like.transform), fill=0, dtype='uint32')
+                dst.write(zone, 1, window=window)
+    return out_path
+
+
+def _check_aligned(*datasets):
+    first = datasets[0]
+    for other in datasets[1:]:
+        if (other.width, other.height) != (first.width, first.height) or other.transform != first.transform:
+            raise ValueError(f"{other.name} is not on the grid of {first.name}; resample before change detection")
+
+
+def detect_change(before_path, after_path, zones_path, n_zones, red_band=RED_BAND, nir_band=NIR_BAND,
+                  vegetated_ndvi=VEGETATED_NDVI, ndvi_loss=NDVI_LOSS, loss_path=None):
+    """Vegetation loss between two aligned scenes, aggregated per zone
+
+    Reads the scenes and the zone mask one internal block at a time, so
+    memory use depends on the block size rather than the scene size.
+    Returns a DataFrame indexed by zone position with vegetated and lost
+    hectares; optionally writes the loss mask as a GeoTIFF.
+    """
+    vegetated = np.zeros(n_zones + 1)
+    lost = np.zeros(n_zones + 1)
+    ndvi_drop = np.zeros(n_zones + 1)
+    loss_pixels = np.zeros(n_zones + 1, dtype=np.int64)
+
+    with rasterio.open(before_path) as before, rasterio.open(after_path) as after, \
+            rasterio.open(zones_path) as zones:
+        _check_aligned(before, after, zones)
+        loss_dst = None
+        if loss_path is not None:
+            profile = before.profile.copy()
+            profile.update(count=1, dtype='uint8', nodata=255, compress='deflate')
+            loss_dst = rasterio.open(loss_path, 'w', **profile)
+        try:
+            for _, window in before.block_windows(1):
+                zone = zones.read(1, window=window)
+                if not zone.any() and loss_dst is None:
+                    continue
+                bands_before = before.read([red_band, nir_band], window=window, masked=True)
+                bands_after = after.read([red_band, nir_band], window=window, masked=True)
+                valid = ~(np.ma.getmaskarray(bands_before).any(axis=0) | np.ma.getmaskarray(bands_after).any(axis=0))
+                ndvi_before = ndvi(bands_before[0].filled(0), bands_before[1].filled(0))
+                ndvi_after = ndvi(bands_after[0].filled(0), bands_after[1].filled(0))
+
+                was_vegetated = valid & (ndvi_before >= vegetated_ndvi)
+                drop = ndvi_before - ndvi_after
+                loss = was_vegetated & (drop >= ndvi_loss)
+
+                area = np.broadcast_to(row_pixel_area_ha(before.transform, before.crs, window)[:, None], zone.shape)
+                zone_flat = zone.ravel()
+                if zone_flat.max(initial=0) > n_zones:
+                    raise ValueError(f"{zones_path} has zone ids above {n_zones}; it was built from another layer")
+                vegetated += np.bincount(zone_flat, weights=(area * was_vegetated).ravel(), minlength=n_zones + 1)
+                lost += np.bincount(zone_flat, weights=(area * loss).ravel(), minlength=n_zones + 1)
+                ndvi_drop += np.bincount(zone_flat, weights=np.where(loss, drop, 0).ravel(), minlength=n_zones + 1)
+                loss_pixels += np.bincount(zone_flat, weights=loss.ravel(), minlength=n_zones + 1).astype(np.int64)
+
+                if loss_dst is not None:
+                    loss_dst.write(np.where(valid, loss, 255).astype(np.uint8), 1, window=window)
+        finally:
+            if loss_dst is not None:
+                loss_dst.close()
+
+    result = pd.DataFrame({
+        'vegetated_ha': vegetated[1:],
+        'loss_ha': lost[1:],
+        'loss_pixels': loss_pixels[1:],
+        'mean_ndvi_drop': np.where(loss_pixels[1:] > 0, ndvi_drop[1:] / np.maximum(loss_pixels[1:], 1), 0.0),
+    })
+    result['loss_percentage'] = np.where(result['vegetated_ha'] > 0,
+                                         100 * result['loss_ha'] / result['vegetated_ha'].where(result['vegetated_ha'] > 0, 1),
+                                         0.0)
+    return result
+
+
+def concession_change(polygons_gdf, before_path, after_path, zones_path, **kwargs):
+    """Change detection per concession; zones_path is reused while it matches the layer and grid, else rebuilt"""
+    if not zones_match(zones_path, polygons_gdf, before_path):
+        rasterize_zones(polygons_gdf, before_path, zones_path)
+    change = detect_change(before_path, after_path, zones_path, len(polygons_gdf), **kwargs)
+    change.index = polygons_gdf.index
+    keep = [column for column in ('company', 'name', 'group_comp') if column in polygons_gdf.columns]
+    return polygons_gdf[keep].join(change)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NDVI loss per concession between two aligned GeoTIFF scenes")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--concessions', default='map/overlap.shp')
+    parser.add_argument('--zones', default='concession_zones.tif',
+                        help="Rasterized concession mask; rebuilt when the layer or scene grid changes")
+    parser.add_argument('--loss-raster', default=None)
+    parser.add_argument('--red-band', type=int, default=RED_BAND)
+    parser.add_argument('--nir-band', type=int, default=NIR_BAND)
+    args = parser.parse_args()
+
+    concessions = gpd.read_file(args.concessions)
+    change = concession_change(concessions, args.before, args.after, args.zones, red_band=args.red_band,
+                               nir_band=args.nir_band, loss_path=args.loss_raster)
+    change = change[change['loss_ha'] > 0].sort_values('loss_ha', ascending=False)
+    print(change.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from join_layer import normalize_company_name
+
+# Defaults for the geo-financial correlation window (days relative to a change event)
+LAG_BEFORE_DAYS = 0
+LAG_AFTER_DAYS = 7
+
+# Outflows are unusual when they stand out from the sender's own history or were risk-flagged
+ROBUST_Z_THRESHOLD = 3.0
+UNUSUAL_RISK_SCORE = 70
+
+MIN_ALERT_SCORE = 60
+
+
+def to_days(dates):
+    """Convert a datetime-like column to integer day numbers"""
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def find_unusual_outflows(transactions_df, z_threshold=ROBUST_Z_THRESHOLD, risk_threshold=UNUSUAL_RISK_SCORE):
+    """Flag outflows that are large for their sender (robust z-score on log amount) or high-risk"""
+    columns = ['company_key', 'transaction_id', 'day', 'amount_idr', 'robust_z']
+    if transactions_df is None or len(transactions_df) == 0:
+        return pd.DataFrame(columns=columns)
+
+    outflows = pd.DataFrame({
+        'company_key': transactions_df['sender_company'].map(normalize_company_name),
+        'transaction_id': transactions_df.get('transaction_id', pd.Series(transactions_df.index, index=transactions_df.index)),
+        'day': to_days(transactions_df['transaction_date']),
+        'amount_idr': transactions_df['amount_idr'].astype(float),
+    })
+
+    log_amount = np.log1p(outflows['amount_idr'].clip(lower=0))
+    by_sender = log_amount.groupby(outflows['company_key'])
+    median = by_sender.transform('median')
+    mad = (log_amount - median).abs().groupby(outflows['company_key']).transform('median')
+    # 1.4826 scales MAD to a standard deviation; senders with a flat history get no z-score
+    outflows['robust_z'] = np.where(mad > 0, (log_amount - median) / (1.4826 * mad.where(mad > 0, 1)), 0.0)
+
+    unusual = outflows['robust_z'] >= z_threshold
+    if 'risk_score' in transactions_df.columns:
+        unusual |= transactions_df['risk_score'].to_numpy() >= risk_threshold
+    if 'is_flagged' in transactions_df.columns:
+        unusual |= transactions_df['is_flagged'].astype(bool).to_numpy()
+
+    return outflows[unusual & (outflows['company_key'] != "")].reset_index(drop=True)[columns]
+
+
+def correlate_change_events(change_events, outflows, lag_before=LAG_BEFORE_DAYS, lag_after=LAG_AFTER_DAYS):
+    """Interval-join change events to unusual outflows of the same company
+
+    Every event gets the count and amount of outflows in
+    [event_date - lag_before, event_date + lag_after] and its nearest outflow.
+    All companies are joined at once: outflows are sorted on a (company, day)
+    composite key and each event window becomes two searchsorted bounds.
+    """
+    matches = change_events.copy().reset_index(drop=True)
+    matches['company_key'] = matches['company'].map(normalize_company_name)
+    matches['day'] = to_days(matches['event_date'])
+    matches['n_outflows'] = 0
+    matches['outflow_amount'] = 0.0
+    matches['nearest_lag_days'] = np.nan
+    matches['nearest_transaction_id'] = None
+    matches['lift'] = 0.0
+    if len(matches) == 0 or len(outflows) == 0:
+        return matches
+
+    companies = pd.Index(np.unique(np.concatenate([matches['company_key'].to_numpy(), outflows['company_key'].to_numpy()])))
+    day0 = min(matches['day'].min(), outflows['day'].min()) - lag_before
+    span = max(matches['day'].max(), outflows['day'].max()) - day0 + lag_after + 1
+
+    out_pos = companies.get_indexer(outflows['company_key']) * span + (outflows['day'].to_numpy() - day0)
+    order = np.argsort(out_pos, kind='stable')
+    out_pos = out_pos[order]
+    out_days = outflows['day'].to_numpy()[order]
+    out_ids = outflows['transaction_id'].to_numpy()[order]
+    amount_cumsum = np.concatenate([[0.0], np.cumsum(outflows['amount_idr'].to_numpy()[order])])
+
+    ev_pos = companies.get_indexer(matches['company_key']) * span + (matches['day'].to_numpy() - day0)
+    lo = np.searchsorted(out_pos, ev_pos - lag_before, side='left')
+    hi = np.searchsorted(out_pos, ev_pos + lag_after, side='right')
+    matches['n_outflows'] = hi - lo
+    matches['outflow_amount'] = amount_cumsum[hi] - amount_cumsum[lo]
+
+    # Nearest outflow is either the first at/after the event day or the last before it
+    after = np.searchsorted(out_pos, ev_pos, side='left')
+    before = after - 1
+    lag_after_candidate = np.where(after < hi, out_days[np.minimum(after, len(out_days) - 1)] - matches['day'].to_numpy(), np.inf)
+    lag_before_candidate = np.where(before >= lo, out_days[np.maximum(before, 0)] - matches['day'].to_numpy(), -np.inf)
+    use_after = np.abs(lag_after_candidate) <= np.abs(lag_before_candidate)
+    nearest = np.where(use_after, after, before)
+    has_match = matches['n_outflows'].to_numpy() > 0
+    matches['nearest_lag_days'] = np.where(has_match, np.where(use_after, lag_after_candidate, lag_before_candidate), np.nan)
+    matches['nearest_transaction_id'] = np.where(has_match, out_ids[np.clip(nearest, 0, len(out_ids) - 1)], None)
+
+    # Baseline: how much of the company's unusual outflow would fall in a window by chance
+    per_company = outflows.groupby('company_key').agg(
+        total_amount=('amount_idr', 'sum'), first_day=('day', 'min'), last_day=('day', 'max'))
+    window_days = lag_before + lag_after + 1
+    active_days = (per_company['last_day'] - per_company['first_day'] + 1).clip(lower=window_days)
+    expected_share = (window_days / active_days).reindex(matches['company_key']).to_numpy()
+    total_amount = per_company['total_amount'].reindex(matches['company_key']).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observed_share = np.where(total_amount > 0, matches['outflow_amount'].to_numpy() / total_amount, 0.0)
+        matches['lift'] = np.nan_to_num(observed_share / expected_share)
+
+    return matches
+
+
+def score_correlations(matches, lag_before=LAG_BEFORE_DAYS, lag_after=LAG_AFTER_DAYS):
+    """Score each event/outflow correlation on a 0-100 scale"""
+    scored = matches.copy()
+    max_lag = max(lag_before, lag_after) + 1
+    proximity = (1 - scored['nearest_lag_days'].abs() / max_lag).fillna(0).clip(0, 1)
+    concentration = (scored['lift'].clip(upper=5) / 5).fillna(0)
+    if 'hectares' in scored.columns:
+        extent = (scored['hectares'].fillna(0) / 1000).clip(upper=1)
+    else:
+        extent = 0.5
+    scored['score'] = (100 * (0.45 * proximity + 0.35 * concentration + 0.2 * extent)).round(1)
+    scored.loc[scored['n_outflows'] == 0, 'score'] = 0.0
+    return scored
+
+
+def risk_level(score):
+    if score >= 85:
+        return 'CRITICAL'
+    if score >= 70:
+        return 'HIGH'
+    return 'MEDIUM'
+
+
+def generate_integrated_alerts(change_events, transactions_df, join_layer=None,
+                               lag_before=LAG_BEFORE_DAYS, lag_after=LAG_AFTER_DAYS, min_score=MIN_ALERT_SCORE):
+    """Run the correlation batch over all companies and emit one scored alert per company
+
+    change_events needs company, event_date and optionally hectares/event columns.
+    When a join layer is given only companies whose concession overlaps protected
+    forest are considered.
+    """
+    events = change_events
+    if join_layer is not None and len(events) > 0:
+        overlapping = join_layer.loc[join_layer['is_overlapping'], 'company'].map(normalize_company_name)
+        events = events[events['company'].map(normalize_company_name).isin(set(overlapping))]
+
+    outflows = find_unusual_outflows(transactions_df)
+    scored = score_correlations(correlate_change_events(events, outflows, lag_before, lag_after), lag_before, lag_after)
+    scored = scored[scored['score'] >= min_score]
+    if len(scored) == 0:
+        return []
+
+    regions = {}
+    if join_layer is not None:
+        regions = dict(zip(join_layer['company'].map(normalize_company_name), join_layer['region']))
+
+    alerts = []
+    best = scored.sort_values(['score', 'outflow_amount'], ascending=False).drop_duplicates('company_key')
+    for _, row in best.iterrows():
+        lag = int(row['nearest_lag_days'])
+        lag_text = "same-day activity" if lag == 0 else f"{abs(lag)}-day {'lag' if lag > 0 else 'lead'}"
+        hectares = f"{row['hectares']:,.0f} ha change + " if 'hectares' in row and pd.notna(row['hectares']) else ""
+        event_date = pd.Timestamp(row['event_date'])
+        alerts.append({
+            'id': f"ALT-INT-{row['company_key'].replace(' ', '-')}-{event_date.strftime('%Y%m%d')}",
+            'created_at': event_date.isoformat(),
+            'location': regions.get(row['company_key']) or 'Concession Area',
+            'type': 'Land-Cover Change + Unusual Outflows',
+            'risk': risk_level(row['score']),
+            'company': row['company'],
+            'details': (f"{hectares}{row['n_outflows']} unusual outflows "
+                        f"(Rp {row['outflow_amount']/1e9:.1f}B) within window, {lag_text}"),
+            'alert_source': 'integrated',
+            'score': float(row['score']),
+            'nearest_transaction_id': row['nearest_transaction_id'],
+        })
+    return alerts
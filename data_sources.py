@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+
+from equal_area import with_equal_area
+
+# Data files live next to the app or in data/; map layers in map/
+DATA_DIRS = ('.', 'data')
+MAP_DIR = 'map'
+
+
+def data_path(name, base_dir='.'):
+    """First existing location of a data file, or None"""
+    for directory in DATA_DIRS:
+        path = Path(base_dir) / directory / name
+        if path.exists():
+            return path
+    return None
+
+
+def _read_csv(name, base_dir, parse_dates=()):
+    path = data_path(name, base_dir)
+    if path is None:
+        return None
+    df = pd.read_csv(path)
+    for column in parse_dates:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def load_transactions(base_dir='.'):
+    return _read_csv('transactions.csv', base_dir, parse_dates=['transaction_date'])
+
+
+def load_companies(base_dir='.'):
+    return _read_csv('pt_data.csv', base_dir)
+
+
+def load_bank_accounts(base_dir='.'):
+    return _read_csv('bank_accounts.csv', base_dir)
+
+
+def load_map_layer(name, base_dir='.'):
+    """A layer from map/ as a GeoDataFrame with equal-area geometry and area_ha, or None when missing"""
+    path = Path(base_dir) / MAP_DIR / f"{name}.shp"
+    if not path.exists():
+        return None
+    return with_equal_area(gpd.read_file(path))
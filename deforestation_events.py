@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+from datetime import datetime
+
+import geopandas as gpd
+import numpy as np
+
+from change_detection import NDVI_LOSS, concession_change
+from storage import Database
+
+# Columns tried in order for a stable concession id (GFW id in map/overlap.shp, company name in demo layers)
+CONCESSION_ID_COLUMNS = ('gfwid', 'globalid', 'company')
+# Smaller losses are treated as noise and not recorded
+MIN_EVENT_HA = 1.0
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS deforestation_events (
+        event_id TEXT PRIMARY KEY,
+        concession_id TEXT NOT NULL,
+        event_date TEXT NOT NULL,
+        company TEXT,
+        loss_ha REAL NOT NULL,
+        transitions TEXT,
+        confidence REAL,
+        source TEXT,
+        details TEXT,
+        recorded_at TEXT NOT NULL
+    )""",
+    # Timelines are range queries over one concession's history
+    "CREATE INDEX IF NOT EXISTS idx_deforestation_concession_date ON deforestation_events (concession_id, event_date)",
+    "CREATE INDEX IF NOT EXISTS idx_deforestation_date ON deforestation_events (event_date)",
+]
+
+
+def _event_id(concession_id, event_date, source):
+    """Stable id so re-running change detection on the same scenes updates rather than duplicates"""
+    digest = hashlib.blake2b(f"{concession_id}|{event_date}|{source}".encode('utf-8'), digest_size=8).hexdigest()
+    return f"DEF-{digest.upper()}"
+
+
+def _iso_date(value):
+    return value if isinstance(value, str) else value.strftime('%Y-%m-%d')
+
+
+_UPSERT = """INSERT INTO deforestation_events (event_id, concession_id, event_date, company, loss_ha,
+                                              transitions, confidence, source, details, recorded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (event_id) DO UPDATE SET
+                company = excluded.company, loss_ha = excluded.loss_ha, transitions = excluded.transitions,
+                confidence = excluded.confidence, details = excluded.details, recorded_at = excluded.recorded_at"""
+
+
+def _event_rows(events, now=None):
+    now = (now or datetime.now()).isoformat(timespec='seconds')
+    rows = []
+    for event in events:
+        event_date = _iso_date(event['event_date'])
+        source = event.get('source', 'ndvi')
+        rows.append((
+            _event_id(event['concession_id'], event_date, source), str(event['concession_id']), event_date,
+            event.get('company'), float(event['loss_ha']), json.dumps(event.get('transitions') or {}),
+            event.get('confidence'), source, event.get('details'), now,
+        ))
+    return rows
+
+
+def concession_ids(concessions_gdf):
+    """Stable concession id per row from the first available id column"""
+    for column in CONCESSION_ID_COLUMNS:
+        if column in concessions_gdf.columns:
+            return concessions_gdf[column].astype(str)
+    return concessions_gdf.index.astype(str).to_series(index=concessions_gdf.index)
+
+
+class DeforestationEventStore:
+    """Time-indexed forest loss events per concession, appended as new scenes are processed"""
+
+    def __init__(self, db=None):
+        self.db = db if isinstance(db, Database) else Database(db)
+        self.db.executescript(_SCHEMA)
+
+    def record(self, events, now=None):
+        """Insert or refresh events keyed by (concession_id, event_date, source)
+
+        Each event is a dict with concession_id, event_date (date or
+        YYYY-MM-DD), loss_ha and optionally company, transitions (dict of
+        'from->to': hectares), confidence (0-1), source and details.
+        """
+        rows = _event_rows(events, now)
+        self.db.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def replace_source(self, source, events, now=None):
+        """Replace every event of one source with the given events in a single transaction
+
+        Used for sources that are regenerated as a whole, such as the
+        dashboard's demo case, so events that moved to new dates do not
+        leave stale rows behind.
+        """
+        rows = _event_rows([dict(event, source=source) for event in events], now)
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM deforestation_events WHERE source = ?", (source,))
+            cursor.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def events(self, concession_id, start=None, end=None):
+        """Events of one concession with start <= event_date <= end, oldest first
+
+        Served from idx_deforestation_concession_date, so the cost depends on
+        the events in the range, not on how many years of history are stored.
+        """
+        sql = "SELECT * FROM deforestation_events WHERE concession_id = ?"
+        params = [str(concession_id)]
+        if start is not None:
+            sql += " AND event_date >= ?"
+            params.append(_iso_date(start))
+        if end is not None:
+            sql += " AND event_date <= ?"
+            params.append(_iso_date(end))
+        rows = self.db.query(sql + " ORDER BY event_date, event_id", params)
+        for row in rows:
+            row['transitions'] = json.loads(row['transitions'] or '{}')
+        return rows
+
+    def events_between(self, start=None, end=None):
+        """Events of every concession with start <= event_date <= end, oldest first (served from idx_deforestation_date)"""
+        sql = "SELECT * FROM deforestation_events WHERE 1 = 1"
+        params = []
+        if start is not None:
+            sql += " AND event_date >= ?"
+            params.append(_iso_date(start))
+        if end is not None:
+            sql += " AND event_date <= ?"
+            params.append(_iso_date(end))
+        rows = self.db.query(sql + " ORDER BY event_date, event_id", params)
+        for row in rows:
+            row['transitions'] = json.loads(row['transitions'] or '{}')
+        return rows
+
+    def total_loss(self, concession_id, start=None, end=None):
+        return sum(row['loss_ha'] for row in self.events(concession_id, start, end))
+
+    def is_empty(self, ignore_source=None):
+        """True when no events are stored, not counting those of ignore_source"""
+        if ignore_source is None:
+            return not self.db.query("SELECT 1 AS found FROM deforestation_events LIMIT 1")
+        return not self.db.query("SELECT 1 AS found FROM deforestation_events WHERE source <> ? LIMIT 1",
+                                 (ignore_source,))
+
+
+def events_from_change(change, event_date, ids, source='ndvi', min_loss_ha=MIN_EVENT_HA):
+    """Deforestation events from a concession_change() table observed on event_date
+
+    ids are the concession ids aligned with the table's index. The NDVI test
+    only tells vegetated from cleared, so the transition is recorded as
+    vegetated->cleared; confidence grows with the mean NDVI drop and reaches 1
+    at twice the loss threshold.
+    """
+    events = []
+    for index, row in change[change['loss_ha'] >= min_loss_ha].iterrows():
+        events.append({
+            'concession_id': ids[index],
+            'event_date': event_date,
+            'company': row.get('company'),
+            'loss_ha': float(row['loss_ha']),
+            'transitions': {'vegetated->cleared': round(float(row['loss_ha']), 2)},
+            'confidence': float(np.clip(row['mean_ndvi_drop'] / (2 * NDVI_LOSS), 0, 1)),
+            'source': source,
+            'details': f"{row['loss_ha']:,.0f} ha vegetation loss ({row['loss_percentage']:.1f}% of vegetated area)",
+        })
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record per-concession forest loss between two scenes as dated events")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--date', required=True, help="Acquisition date of the after scene (YYYY-MM-DD)")
+    parser.add_argument('--concessions', default='map/overlap.shp')
+    parser.add_argument('--zones', default='concession_zones.tif')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    concessions = gpd.read_file(args.concessions)
+    change = concession_change(concessions, args.before, args.after, args.zones)
+    events = events_from_change(change, args.date, concession_ids(concessions))
+    DeforestationEventStore(args.database_url).record(events)
+    print(f"Recorded {len(events)} deforestation events for {args.date}")
+
+
+if __name__ == '__main__':
+    main()
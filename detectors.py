@@ -0,0 +1,126 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from correlation_engine import to_days
+
+# Transfers just below the reporting threshold, repeated within a short window, look like structuring
+REPORTING_THRESHOLD_IDR = 500_000_000
+STRUCTURING_BAND = 0.6
+STRUCTURING_WINDOW_DAYS = 7
+STRUCTURING_MIN_COUNT = 3
+
+HIGH_RISK_SCORE = 70
+MAX_CYCLE_LENGTH = 4
+MIN_CLUSTER_TRANSACTIONS = 3
+
+
+def detect_structuring(transactions_df, threshold=REPORTING_THRESHOLD_IDR, band=STRUCTURING_BAND,
+                       window_days=STRUCTURING_WINDOW_DAYS, min_count=STRUCTURING_MIN_COUNT):
+    """Find senders splitting money into sub-threshold transfers
+
+    Returns one row per sender and burst: the densest window of at least
+    min_count transfers in [band * threshold, threshold) within window_days.
+    """
+    columns = ['company', 'first_date', 'last_date', 'n_transactions', 'total_amount', 'transaction_ids']
+    if transactions_df is None or len(transactions_df) == 0:
+        return pd.DataFrame(columns=columns)
+
+    amounts = transactions_df['amount_idr']
+    near = transactions_df[(amounts >= band * threshold) & (amounts < threshold)]
+    near = near.assign(day=to_days(near['transaction_date'])).sort_values(['sender_company', 'day', 'transaction_id'])
+
+    rows = []
+    for company, group in near.groupby('sender_company', sort=False):
+        days = group['day'].to_numpy()
+        # Number of transfers in the window starting at each transfer
+        ends = np.searchsorted(days, days + window_days, side='right')
+        counts = ends - np.arange(len(days))
+        start = 0
+        while start < len(days):
+            if counts[start] < min_count:
+                start += 1
+                continue
+            burst = group.iloc[start:ends[start]]
+            rows.append({
+                'company': company,
+                'first_date': burst['transaction_date'].min(),
+                'last_date': burst['transaction_date'].max(),
+                'n_transactions': len(burst),
+                'total_amount': int(burst['amount_idr'].sum()),
+                'transaction_ids': tuple(burst['transaction_id']),
+            })
+            # Bursts do not share transfers
+            start = ends[start]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def detect_cycles(transactions_df, max_length=MAX_CYCLE_LENGTH, high_risk_score=HIGH_RISK_SCORE):
+    """Circular flows among companies over high-risk or flagged transfers
+
+    Each cycle is reported once with the bottleneck amount (the smallest
+    aggregated transfer along it), which bounds how much money went round.
+    Run it per date range (the batch pipeline uses months): over long
+    periods nearly every group of active companies closes a cycle.
+    """
+    columns = ['companies', 'length', 'cycle_amount', 'n_transactions', 'first_date', 'last_date']
+    if transactions_df is None or len(transactions_df) == 0:
+        return pd.DataFrame(columns=columns)
+
+    risky = transactions_df['risk_score'] >= high_risk_score
+    if 'is_flagged' in transactions_df.columns:
+        risky |= transactions_df['is_flagged'].astype(bool)
+    transfers = transactions_df[risky].groupby(['sender_company', 'receiver_company']).agg(
+        amount=('amount_idr', 'sum'), count=('amount_idr', 'size')).reset_index()
+    transfers = transfers[transfers['sender_company'] != transfers['receiver_company']]
+    first_date = transactions_df.loc[risky, 'transaction_date'].min()
+    last_date = transactions_df.loc[risky, 'transaction_date'].max()
+
+    G = nx.DiGraph()
+    G.add_edges_from((row.sender_company, row.receiver_company, {'amount': row.amount, 'count': row.count})
+                     for row in transfers.itertuples(index=False))
+
+    rows = []
+    for cycle in nx.simple_cycles(G, length_bound=max_length):
+        # Start every cycle at its smallest name so results do not depend on traversal order
+        start = cycle.index(min(cycle))
+        cycle = cycle[start:] + cycle[:start]
+        edges = [G.edges[u, v] for u, v in zip(cycle, cycle[1:] + cycle[:1])]
+        rows.append({
+            'companies': tuple(cycle),
+            'length': len(cycle),
+            'cycle_amount': int(min(edge['amount'] for edge in edges)),
+            'n_transactions': int(sum(edge['count'] for edge in edges)),
+            'first_date': first_date,
+            'last_date': last_date,
+        })
+    return pd.DataFrame(rows, columns=columns).sort_values('companies', ignore_index=True)
+
+
+def cluster_transactions(transactions_df, high_risk_score=HIGH_RISK_SCORE, min_transactions=MIN_CLUSTER_TRANSACTIONS):
+    """Group high-risk transfers by company pair, in the layout of transactions_clusters.csv"""
+    columns = ['cluster_id', 'companies_involved', 'transaction_count', 'total_amount', 'average_risk_score',
+               'risk_level', 'pattern_type', 'first_transaction', 'last_transaction', 'transaction_ids']
+    if transactions_df is None or len(transactions_df) == 0:
+        return pd.DataFrame(columns=columns)
+
+    risky = transactions_df[transactions_df['risk_score'] >= high_risk_score]
+    pair = pd.Series([tuple(sorted(names)) for names in zip(risky['sender_company'], risky['receiver_company'])],
+                     index=risky.index)
+    clusters = risky.assign(pair=pair).groupby('pair').agg(
+        transaction_count=('amount_idr', 'size'),
+        total_amount=('amount_idr', 'sum'),
+        average_risk_score=('risk_score', 'mean'),
+        pattern_type=('transaction_type', lambda types: types.mode().iloc[0]),
+        first_transaction=('transaction_date', 'min'),
+        last_transaction=('transaction_date', 'max'),
+        transaction_ids=('transaction_id', tuple),
+    )
+    clusters = clusters[clusters['transaction_count'] >= min_transactions]
+    clusters = clusters.sort_values('total_amount', ascending=False).reset_index()
+    clusters['companies_involved'] = clusters['pair'].map(list)
+    clusters['average_risk_score'] = clusters['average_risk_score'].round(1)
+    clusters['risk_level'] = np.where(clusters['average_risk_score'] >= 85, 'HIGH', 'MEDIUM')
+    clusters['pattern_type'] = clusters['pattern_type'].str.replace('_', ' ').str.title()
+    clusters['cluster_id'] = [f"CLUSTER_{i + 1:03d}" for i in range(len(clusters))]
+    return clusters[columns]
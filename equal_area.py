@@ -0,0 +1,79 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import CRS, Transformer
+
+# Equal-area CRS for hectare figures (World Cylindrical Equal Area); valid across all of Indonesia
+AREA_CRS = 'EPSG:6933'
+WGS84 = 'EPSG:4326'
+# Projected copy of the geometry kept next to the WGS84 original
+PROJECTED_COLUMN = 'geometry_ea'
+M2_PER_HA = 10_000
+
+_transformers = {}
+
+
+def _transformer(crs):
+    key = CRS.from_user_input(crs).to_wkt()
+    if key not in _transformers:
+        _transformers[key] = Transformer.from_crs(crs, AREA_CRS, always_xy=True)
+    return _transformers[key]
+
+
+def project_geometries(geoms, crs):
+    """Geometries in AREA_CRS, reprojecting every coordinate in one vectorized pyproj call
+
+    Anything not already in AREA_CRS is reprojected, including other projected
+    CRSs (Web Mercator and UTM distort areas). Geometries without a CRS are
+    taken to be WGS84, as in with_equal_area.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    crs = CRS.from_user_input(WGS84 if crs is None else crs)
+    if crs.equals(AREA_CRS):
+        return geoms
+    transformer = _transformer(crs)
+
+    def transform(coords):
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+    return shapely.transform(geoms, transform)
+
+
+def projected(gdf):
+    """Equal-area geometries of a layer: the cached projected column when present, else projected now
+
+    Layers without a CRS are taken to be WGS84.
+    """
+    if PROJECTED_COLUMN in gdf.columns:
+        return gdf[PROJECTED_COLUMN].to_numpy()
+    return project_geometries(gdf.geometry.to_numpy(), gdf.crs)
+
+
+def with_equal_area(gdf, area_column='area_ha'):
+    """Copy of a WGS84 layer with its projected geometry cached and areas computed from it
+
+    The projection runs once here; later area and overlap math reads the
+    cached column. An existing area field (GIS_AREA, area_ha of unknown
+    method) is kept as reported_<area_column>.
+    """
+    gdf = gdf.copy()
+    # Same rule as project_geometries: a layer without a CRS is WGS84
+    if gdf.crs is None:
+        gdf = gdf.set_crs(WGS84)
+    geoms = project_geometries(gdf.geometry.to_numpy(), gdf.crs)
+    gdf[PROJECTED_COLUMN] = gpd.GeoSeries(geoms, index=gdf.index, crs=AREA_CRS)
+    if area_column in gdf.columns:
+        gdf[f"reported_{area_column}"] = gdf[area_column]
+    gdf[area_column] = shapely.area(geoms) / M2_PER_HA
+    return gdf
+
+
+def area_ha(gdf):
+    return shapely.area(projected(gdf)) / M2_PER_HA
+
+
+def intersection_area_ha(a_gdf, b_gdf, a_idx, b_idx):
+    """Intersection hectares of row pairs (a_idx[k], b_idx[k]) of two layers"""
+    a = projected(a_gdf)[np.asarray(a_idx, dtype=np.int64)]
+    b = projected(b_gdf)[np.asarray(b_idx, dtype=np.int64)]
+    return shapely.area(shapely.intersection(a, b)) / M2_PER_HA
@@ -0,0 +1,270 @@
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from graph_layout import graph_hash
+from storage import Database
+
+BETWEENNESS_SAMPLES = 128
+PAGERANK_ALPHA = 0.85
+LABEL_PROPAGATION_ROUNDS = 30
+
+
+def graph_matrix(G):
+    """Directed weighted adjacency of the entity graph
+
+    Transfer edges are weighted by amount relative to the median transfer so
+    they are comparable to ownership edges, which weigh 1.
+    """
+    nodes = list(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    rows, cols, weights = [], [], []
+    amounts = [attrs['amount'] for _, _, attrs in G.edges(data=True) if attrs.get('relation') == 'transfer']
+    typical_amount = float(np.median(amounts)) if amounts else 1.0
+    for u, v, attrs in G.edges(data=True):
+        rows.append(index[u])
+        cols.append(index[v])
+        weights.append(attrs['amount'] / typical_amount if attrs.get('relation') == 'transfer' else 1.0)
+    n = len(nodes)
+    A = sp.csr_matrix((np.asarray(weights, dtype=float), (rows, cols)), shape=(n, n))
+    return nodes, A
+
+
+def pagerank(A, alpha=PAGERANK_ALPHA, tol=1e-10, max_iter=200):
+    """Weighted PageRank by power iteration on a sparse matrix"""
+    n = A.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_strength = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_strength == 0
+    inv_strength = np.where(dangling, 0.0, 1.0 / np.where(dangling, 1.0, out_strength))
+    P = sp.diags(inv_strength) @ A
+    PT = P.T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        updated = alpha * (PT @ rank + rank[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(updated - rank).sum() < n * tol:
+            return updated
+        rank = updated
+    return rank
+
+
+def approximate_betweenness(A, samples=BETWEENNESS_SAMPLES, seed=42):
+    """Betweenness estimated from a sample of BFS sources (Brandes on the undirected graph)
+
+    BFS levels and path counts are propagated with sparse mat-vecs, so each
+    source costs O(m * depth). Normalized like networkx for undirected graphs.
+    """
+    n = A.shape[0]
+    if n <= 2:
+        return np.zeros(n)
+    S = ((A + A.T) > 0).astype(np.float64).tocsr()
+    S.setdiag(0)
+    S.eliminate_zeros()
+    sources = np.random.default_rng(seed).choice(n, size=min(samples, n), replace=False)
+
+    betweenness = np.zeros(n)
+    for source in sources:
+        dist = np.full(n, -1)
+        sigma = np.zeros(n)
+        dist[source] = 0
+        sigma[source] = 1.0
+        levels = [np.array([source])]
+        while True:
+            frontier = np.zeros(n)
+            frontier[levels[-1]] = sigma[levels[-1]]
+            paths = S @ frontier
+            reached = np.flatnonzero((paths > 0) & (dist < 0))
+            if len(reached) == 0:
+                break
+            dist[reached] = len(levels)
+            sigma[reached] = paths[reached]
+            levels.append(reached)
+
+        delta = np.zeros(n)
+        for depth in range(len(levels) - 1, 0, -1):
+            coefficient = np.zeros(n)
+            level = levels[depth]
+            coefficient[level] = (1 + delta[level]) / sigma[level]
+            parents = levels[depth - 1]
+            delta[parents] += sigma[parents] * (S @ coefficient)[parents]
+        delta[source] = 0
+        betweenness += delta
+
+    return betweenness * n / len(sources) / ((n - 1) * (n - 2))
+
+
+def label_propagation(A, rounds=LABEL_PROPAGATION_ROUNDS, seed=42):
+    """Weighted label propagation communities, relabelled 0.. by size (largest first)
+
+    Each round updates a random half of the nodes (semi-synchronous, which
+    avoids the label oscillation of fully synchronous updates). A node takes
+    the label with the largest total edge weight among its neighbors.
+    """
+    n = A.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    S = (A + A.T).tocoo()
+    i, j, w = S.row, S.col, S.data
+    labels = np.arange(n)
+    rng = np.random.default_rng(seed)
+
+    for _ in range(rounds):
+        pair = i.astype(np.int64) * n + labels[j]
+        unique_pairs, inverse = np.unique(pair, return_inverse=True)
+        weight = np.bincount(inverse, weights=w)
+        node, label = unique_pairs // n, unique_pairs % n
+        # Heaviest label per node, smallest label on ties
+        order = np.lexsort((label, -weight, node))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = node[order][1:] != node[order][:-1]
+        best_node, best_label = node[order][first], label[order][first]
+
+        update = rng.random(len(best_node)) < 0.5
+        changed = labels[best_node[update]] != best_label[update]
+        labels[best_node[update]] = best_label[update]
+        if not changed.any() and update.any():
+            # Confirm convergence with a full pass before stopping
+            if np.array_equal(labels[best_node], best_label):
+                break
+
+    _, relabelled, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=int)
+    rank[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return rank[relabelled]
+
+
+def compute_graph_metrics(G, betweenness_samples=BETWEENNESS_SAMPLES):
+    """All node metrics for a graph as a DataFrame"""
+    nodes, A = graph_matrix(G)
+    binary = (A > 0).astype(np.float64)
+    metrics = pd.DataFrame({
+        'node': nodes,
+        'node_type': [G.nodes[node].get('type', 'company') for node in nodes],
+        'pagerank': pagerank(A),
+        'betweenness': approximate_betweenness(A, samples=betweenness_samples),
+        'weighted_degree': np.asarray(A.sum(axis=0)).ravel() + np.asarray(A.sum(axis=1)).ravel(),
+        'degree': (np.asarray(binary.sum(axis=0)).ravel() + np.asarray(binary.sum(axis=1)).ravel()).astype(int),
+        'community': label_propagation(A),
+    })
+    metrics['community_size'] = metrics.groupby('community')['node'].transform('size')
+    metrics['pagerank_rank'] = metrics['pagerank'].rank(ascending=False, method='min').astype(int)
+    return metrics
+
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS graph_runs (
+        run_id TEXT PRIMARY KEY,
+        graph_name TEXT NOT NULL,
+        graph_key TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        n_nodes INTEGER NOT NULL,
+        n_edges INTEGER NOT NULL,
+        n_communities INTEGER NOT NULL,
+        top_node TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_graph_runs_latest ON graph_runs (graph_name, created_at)",
+    """CREATE TABLE IF NOT EXISTS graph_metrics (
+        run_id TEXT NOT NULL,
+        node TEXT NOT NULL,
+        node_type TEXT,
+        pagerank REAL,
+        betweenness REAL,
+        weighted_degree REAL,
+        degree INTEGER,
+        community INTEGER,
+        community_size INTEGER,
+        pagerank_rank INTEGER,
+        PRIMARY KEY (run_id, node)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_graph_metrics_community ON graph_metrics (run_id, community, pagerank_rank)",
+]
+
+
+class GraphMetricsStore:
+    """Latest graph analytics per graph, read by the dashboard with indexed point queries"""
+
+    def __init__(self, db=None):
+        self.db = db if isinstance(db, Database) else Database(db)
+        self.db.executescript(_SCHEMA)
+
+    def save_run(self, graph_name, graph_key, metrics, n_edges):
+        run_id = f"{graph_name}-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        top_node = metrics.loc[metrics['pagerank'].idxmax(), 'node'] if len(metrics) else None
+        columns = ['node', 'node_type', 'pagerank', 'betweenness', 'weighted_degree', 'degree',
+                   'community', 'community_size', 'pagerank_rank']
+        rows = [(run_id, *row) for row in metrics[columns].itertuples(index=False, name=None)]
+        with self.db.transaction() as cursor:
+            cursor.executemany(
+                f"INSERT INTO graph_metrics (run_id, {', '.join(columns)}) VALUES ({', '.join(['?'] * (len(columns) + 1))})",
+                [tuple(_plain(value) for value in row) for row in rows],
+            )
+            # The run row goes in last so readers never see a half-written run
+            cursor.execute(
+                """INSERT INTO graph_runs (run_id, graph_name, graph_key, created_at, n_nodes, n_edges,
+                                           n_communities, top_node)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (run_id, graph_name, graph_key, datetime.now().isoformat(timespec='seconds'), len(metrics), int(n_edges),
+                 int(metrics['community'].nunique()) if len(metrics) else 0, top_node),
+            )
+        return run_id
+
+    def latest_run(self, graph_name):
+        rows = self.db.query(
+            "SELECT * FROM graph_runs WHERE graph_name = ? ORDER BY created_at DESC LIMIT 1", (graph_name,))
+        return rows[0] if rows else None
+
+    def node_metrics(self, run_id, node):
+        rows = self.db.query("SELECT * FROM graph_metrics WHERE run_id = ? AND node = ?", (run_id, node))
+        return rows[0] if rows else None
+
+    def top_in_community(self, run_id, community, limit=5):
+        return self.db.query(
+            """SELECT * FROM graph_metrics WHERE run_id = ? AND community = ?
+               ORDER BY pagerank_rank LIMIT ?""",
+            (run_id, community, limit),
+        )
+
+
+def _plain(value):
+    """NumPy scalars to Python values for the database driver"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def run_graph_analytics(G, store, graph_name='entity'):
+    """Compute and store all metrics for G; returns the run id"""
+    metrics = compute_graph_metrics(G)
+    return store.save_run(graph_name, graph_hash(G), metrics, G.number_of_edges())
+
+
+def start_background_run(G, store, graph_name='entity'):
+    """Run the analytics batch on a daemon thread so page renders never wait for it"""
+    thread = threading.Thread(target=run_graph_analytics, args=(G, store, graph_name), daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    from network_graph import build_entity_graph
+
+    parser = argparse.ArgumentParser(description="Compute graph centrality and communities into the shared database")
+    parser.add_argument('--transactions', default='transactions.csv')
+    parser.add_argument('--companies', default='pt_data.csv')
+    parser.add_argument('--graph-name', default='entity')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    G = build_entity_graph(pd.read_csv(args.transactions), pd.read_csv(args.companies))
+    store = GraphMetricsStore(args.database_url)
+    run_id = run_graph_analytics(G, store, args.graph_name)
+    run = store.latest_run(args.graph_name)
+    print(f"{run_id}: {run['n_nodes']} nodes, {run['n_edges']} edges, "
+          f"{run['n_communities']} communities, most central: {run['top_node']}")
+
+
+if __name__ == '__main__':
+    main()
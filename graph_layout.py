@@ -0,0 +1,163 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import shortest_path
+
+PIVOTS = 30
+ITERATIONS = 40
+WARM_ITERATIONS = 15
+CACHE_SIZE = 64
+
+
+def graph_hash(G):
+    """Stable hash of a graph's nodes and (undirected) edges"""
+    digest = hashlib.sha1()
+    for node in sorted(map(str, G.nodes())):
+        digest.update(node.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(b'\1')
+    for u, v in sorted(tuple(sorted((str(u), str(v)))) for u, v in G.edges()):
+        digest.update(f"{u}\0{v}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _adjacency(G, nodes):
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+    n = len(nodes)
+    A = sp.coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(n, n)).tocsr()
+    A = ((A + A.T) > 0).astype(np.float64)
+    return A, edges
+
+
+def _pivot_distances(A, pivots):
+    """Hop distances from each pivot to every node; unreachable pairs get max + 1"""
+    D = shortest_path(A, method='D', unweighted=True, indices=pivots)
+    finite = np.isfinite(D)
+    D[~finite] = (D[finite].max() if finite.any() else 0) + 1
+    return D
+
+
+def _pivot_mds(D, seed):
+    """Initial 2-D coordinates from pivot MDS (Brandes & Pich)"""
+    squared = D.T ** 2
+    C = squared - squared.mean(axis=0) - squared.mean(axis=1, keepdims=True) + squared.mean()
+    C = -0.5 * C
+    eigenvalues, eigenvectors = np.linalg.eigh(C.T @ C)
+    coords = C @ eigenvectors[:, -2:][:, ::-1]
+    if not np.all(np.isfinite(coords)) or np.allclose(coords, 0):
+        coords = np.random.default_rng(seed).normal(size=(D.shape[1], 2))
+    return coords
+
+
+def stress_layout(G, initial=None, iterations=ITERATIONS, pivots=PIVOTS, seed=42):
+    """Sparse stress majorization layout in hop-distance units
+
+    Stress terms are restricted to the graph's edges plus each node's
+    distance to a small set of pivots, so one iteration is a handful of
+    vectorized bincounts over O((m + n * pivots)) pairs instead of the
+    O(n^2) force computation of spring_layout. Positions in initial (from
+    an earlier layout of an overlapping graph) are used as a warm start.
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+
+    rng = np.random.default_rng(seed)
+    A, edges = _adjacency(G, nodes)
+    pivot_idx = np.sort(rng.choice(n, size=min(pivots, n), replace=False))
+    D = _pivot_distances(A, pivot_idx)
+
+    if initial:
+        known = np.array([node in initial for node in nodes])
+        X = np.zeros((n, 2))
+        X[known] = np.array([initial[node] for node, is_known in zip(nodes, known) if is_known], dtype=float)
+        X = _place_new_nodes(A, X, known, rng)
+    else:
+        X = _pivot_mds(D, seed)
+
+    # Term list: edges at distance 1 (both endpoints move) plus each node's
+    # hop distance to every pivot (only the node moves)
+    node_ids = np.tile(np.arange(n), len(pivot_idx))
+    pivot_ids = np.repeat(pivot_idx, n)
+    keep = node_ids != pivot_ids
+    i = np.concatenate([edges[:, 0], edges[:, 1], node_ids[keep]])
+    j = np.concatenate([edges[:, 1], edges[:, 0], pivot_ids[keep]])
+    d = np.concatenate([np.ones(2 * len(edges)), D.ravel()[keep]])
+    w = 1.0 / d ** 2
+    weight_sum = np.bincount(i, weights=w, minlength=n)
+    weight_sum[weight_sum == 0] = 1.0
+
+    for _ in range(iterations):
+        delta = X[i] - X[j]
+        dist = np.sqrt((delta ** 2).sum(axis=1))
+        dist[dist == 0] = 1e-9
+        target = X[j] + (d / dist)[:, None] * delta
+        X = np.column_stack([
+            np.bincount(i, weights=w * target[:, 0], minlength=n),
+            np.bincount(i, weights=w * target[:, 1], minlength=n),
+        ]) / weight_sum[:, None]
+
+    return dict(zip(nodes, X))
+
+
+def _place_new_nodes(A, X, known, rng):
+    """Put unplaced nodes at the mean of their placed neighbors, spreading outwards"""
+    if not known.any():
+        return rng.normal(size=X.shape)
+    placed = known.copy()
+    centroid = X[placed].mean(axis=0)
+    while not placed.all():
+        counts = A @ placed.astype(float)
+        sums = A @ (X * placed[:, None])
+        frontier = (~placed) & (counts > 0)
+        if not frontier.any():
+            # Disconnected from everything placed: drop near the centroid
+            X[~placed] = centroid + rng.normal(scale=1.0, size=((~placed).sum(), 2))
+            break
+        X[frontier] = sums[frontier] / counts[frontier, None] + rng.normal(scale=0.1, size=(frontier.sum(), 2))
+        placed |= frontier
+    return X
+
+
+class LayoutService:
+    """Cache of graph layouts keyed by graph hash, warm-starting from the previous layout per view"""
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._previous = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def layout(self, G, key=None):
+        """Positions for G; key names the view (e.g. the ego-network center) for warm starts"""
+        graph_key = graph_hash(G)
+        with self._lock:
+            if graph_key in self._cache:
+                self._cache.move_to_end(graph_key)
+                self.hits += 1
+                pos = self._cache[graph_key]
+                self._previous[key] = pos
+                return dict(pos)
+            initial = self._previous.get(key)
+            self.misses += 1
+
+        if initial and any(node in initial for node in G):
+            pos = stress_layout(G, initial=initial, iterations=WARM_ITERATIONS)
+        else:
+            pos = stress_layout(G)
+
+        with self._lock:
+            self._cache[graph_key] = pos
+            self._previous[key] = pos
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return dict(pos)
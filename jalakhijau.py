@@ -6,16 +6,28 @@ import random
 from streamlit_folium import st_folium
 import plotly.express as px
 import plotly.graph_objects as go
-import networkx as nx
 from datetime import datetime, timedelta
 import json
 import geopandas as gpd
 from shapely.geometry import Point, Polygon
-from openai import AzureOpenAI
 import os
 from pathlib import Path
 from io import BytesIO
 import base64
+from join_layer import build_concession_join_layer, build_marker_index, exposure_at
+from correlation_engine import correlate_change_events, find_unusual_outflows, score_correlations
+from alert_store import AlertStore
+from case_store import CaseStore
+from network_graph import build_entity_graph, ego_network, network_figure
+from graph_layout import LayoutService, graph_hash
+from graph_analytics import GraphMetricsStore, start_background_run
+from deforestation_events import DeforestationEventStore, concession_ids
+from equal_area import WGS84, with_equal_area
+from location_lookup import LocationLookup, parse_coordinates
+from response_cache import ResponseCache, response_cache_key
+from retrieval import RetrievalIndex, company_documents, transaction_documents
+from llm_backend import BACKEND_AZURE, BACKEND_ENV, LocalChatClient, create_client
+from ai_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RequestScheduler
 
 # Page config
 st.set_page_config(
@@ -160,8 +172,6 @@ def init_session_state():
         st.session_state.chat_history = []
     if 'investigation_mode' not in st.session_state:
         st.session_state.investigation_mode = False
-    if 'investigation_data' not in st.session_state:
-        st.session_state.investigation_data = {}
     if 'current_page' not in st.session_state:
         st.session_state.current_page = "🏠 Dashboard Overview"
 
@@ -171,9 +181,9 @@ def load_geospatial_data():
     """Load geospatial data with PT SAWIT NUSANTARA focus"""
     try:
         # Try current directory first
-        forest_gdf = gpd.read_file("forest.shp")
-        sawit_gdf = gpd.read_file("sawit.shp")
-        overlap_gdf = gpd.read_file("overlap.shp")
+        forest_gdf = with_equal_area(gpd.read_file("forest.shp"))
+        sawit_gdf = with_equal_area(gpd.read_file("sawit.shp"))
+        overlap_gdf = with_equal_area(gpd.read_file("overlap.shp"))
         st.success("✅ Loaded actual shapefiles successfully!")
         return forest_gdf, sawit_gdf, overlap_gdf
     except Exception as e:
@@ -248,6 +258,139 @@ def load_company_data():
     except:
         return generate_demo_companies_with_sawit_nusantara()
 
+@st.cache_data
+def load_concession_join_layer():
+    """Join concessions to registry companies, accounts and transactions once per data load"""
+    forest_gdf, sawit_gdf, overlap_gdf = load_geospatial_data()
+    transactions_df, high_risk_df, clusters_df, bank_accounts_df, sawit_case_df = load_financial_data()
+    companies_df = load_company_data()
+    
+    join_layer = build_concession_join_layer(sawit_gdf, companies_df, bank_accounts_df, transactions_df)
+    return join_layer, build_marker_index(join_layer)
+
+# Demo alerts published to an empty alert store
+DEMO_ALERTS = [
+    {
+        'id': 'ALT-CRIT-001', 'time': '14:23', 'location': 'Riau Province',
+        'type': 'Forest-Concession Overlap + Money Laundering', 'risk': 'CRITICAL',
+        'company': 'PT SAWIT NUSANTARA', 
+        'details': 'Overlap: 35.2% (5,100 ha) + Rp 67B suspicious transfers',
+        'alert_source': 'integrated'
+    },
+    {
+        'id': 'ALT-FIN-002', 'time': '13:45', 'location': 'Financial Network',
+        'type': 'Structuring Pattern', 'risk': 'HIGH',
+        'company': 'PT HIJAU SAWIT KALIMANTAN', 
+        'details': 'Pattern: 8 transactions < Rp 500M threshold',
+        'alert_source': 'financial'
+    },
+    {
+        'id': 'ALT-GEO-003', 'time': '12:30', 'location': 'Kalimantan Selatan',
+        'type': 'Unauthorized Land Clearing', 'risk': 'MEDIUM',
+        'company': 'PT AGRO SEJAHTERA', 
+        'details': 'Satellite detected: 800 ha clearing without permit',
+        'alert_source': 'geospatial'
+    }
+]
+
+ALERT_FEED_SIZE = 10
+
+@st.cache_resource
+def get_alert_store():
+    """Shared alert store (SQLite locally, Postgres when JALAK_DATABASE_URL points to one)"""
+    store = AlertStore()
+    if not store.open_alerts(limit=1)[0]:
+        today = datetime.now().strftime('%Y-%m-%d')
+        store.publish([dict(alert, created_at=f"{today}T{alert['time']}:00") for alert in DEMO_ALERTS])
+    return store
+
+@st.cache_resource
+def load_entity_graph():
+    """Company/person graph built once per data load"""
+    transactions_df, high_risk_df, clusters_df, bank_accounts_df, sawit_case_df = load_financial_data()
+    companies_df = load_company_data()
+    
+    # Case transactions carry the PT SAWIT NUSANTARA naming used across the app
+    if sawit_case_df is not None and len(sawit_case_df) > 0:
+        transactions_df = pd.concat([sawit_case_df, transactions_df]).drop_duplicates('transaction_id')
+    
+    return build_entity_graph(transactions_df, companies_df)
+
+@st.cache_resource
+def get_layout_service():
+    """Graph layouts shared across reruns and sessions"""
+    return LayoutService()
+
+@st.cache_resource
+def get_graph_metrics_store():
+    """Graph analytics results; refreshed in the background whenever the entity graph changes"""
+    store = GraphMetricsStore()
+    G = load_entity_graph()
+    latest = store.latest_run('entity')
+    if latest is None or latest['graph_key'] != graph_hash(G):
+        start_background_run(G, store, 'entity')
+    return store
+
+@st.cache_resource
+def get_case_store():
+    """Shared investigation case store; sessions only keep the selected case id"""
+    return CaseStore()
+
+CASE_COMPANY = 'PT SAWIT NUSANTARA'
+# History shown on the case timeline, either side of the case date
+CASE_TIMELINE_DAYS = 90
+# Case outflows plotted on the timeline, relative to the first clearing
+CASE_OUTFLOWS_BEFORE_DAYS = 14
+CASE_OUTFLOWS_AFTER_DAYS = 30
+
+def get_case_date():
+    """Reference date of the case: the case company's largest outflow (the placement transfer)
+
+    Derived from the case transactions rather than today, so the demo events and
+    timeline stay lined up with the financial data however long the app runs.
+    """
+    sawit_case_df = load_financial_data()[4]
+    if sawit_case_df is not None and len(sawit_case_df) > 0:
+        outflows = sawit_case_df[sawit_case_df['sender_company'] == CASE_COMPANY]
+        if len(outflows) > 0:
+            return pd.Timestamp(outflows.loc[outflows['amount_idr'].idxmax(), 'transaction_date']).date()
+    return datetime.now().date()
+
+@st.cache_resource
+def get_deforestation_store():
+    """Deforestation events from change detection runs; the demo case is re-dated on startup until real events exist"""
+    store = DeforestationEventStore()
+    if store.is_empty(ignore_source='demo'):
+        concession_id = get_case_concession_id()
+        # The placement transfer followed the first clearing by a day
+        first_clearing = get_case_date() - timedelta(days=1)
+        store.replace_source('demo', [
+            {
+                'concession_id': concession_id, 'company': CASE_COMPANY, 'event_date': first_clearing,
+                'loss_ha': 600, 'transitions': {'forest_land->barren_land': 600}, 'confidence': 0.85,
+                'details': '🛰️ Satellite imagery shows initial clearing activity in Hutan Lindung Riau'
+            },
+            {
+                'concession_id': concession_id, 'company': CASE_COMPANY, 'event_date': first_clearing + timedelta(days=3),
+                'loss_ha': 4500, 'transitions': {'forest_land->barren_land': 3900, 'forest_land->agriculture_land': 600},
+                'confidence': 0.95,
+                'details': '🌲 5,100 hectares cleared - 35.2% overlap with protected area confirmed'
+            },
+        ])
+    return store
+
+@st.cache_resource
+def get_location_lookup():
+    """Protected-area and concession lookup for coordinates, over the layers shown on the map"""
+    forest_gdf, sawit_gdf, _ = load_geospatial_data()
+    return LocationLookup(forest_gdf, sawit_gdf)
+
+def get_case_concession_id():
+    """Event-store id of the case concession (GFW id when the real layer is loaded)"""
+    _, sawit_gdf, _ = load_geospatial_data()
+    case_rows = sawit_gdf[sawit_gdf['company'] == CASE_COMPANY] if 'company' in sawit_gdf.columns else sawit_gdf.iloc[:0]
+    return concession_ids(case_rows).iloc[0] if len(case_rows) else CASE_COMPANY
+
 def create_sawit_nusantara_case_study(high_risk_df):
     """Create specific PT SAWIT NUSANTARA case study from existing data"""
     # Filter for PT SAWIT NUSANTARA or create synthetic case
@@ -322,7 +465,6 @@ def generate_realistic_geodata_with_sawit_nusantara():
         'name': 'Hutan Lindung Riau Tengah',
         'region': 'Riau',
         'status': 'Protected',
-        'area_ha': 16700,
         'center_lat': forest_lat,
         'center_lon': forest_lon
     })
@@ -336,7 +478,6 @@ def generate_realistic_geodata_with_sawit_nusantara():
         'company': 'PT SAWIT NUSANTARA',
         'region': 'Riau',
         'permit_status': 'Active',
-        'area_ha': 14500,
         'center_lat': sawit_lat,
         'center_lon': sawit_lon,
         'overlap_percentage': 35.2,
@@ -381,7 +522,6 @@ def generate_realistic_geodata_with_sawit_nusantara():
                 'company': company_id,
                 'region': region_name,
                 'permit_status': 'Active',
-                'area_ha': int(size * 111000 * 111000),
                 'center_lat': lat,
                 'center_lon': lon,
                 'overlap_percentage': overlap_pct * 100,
@@ -389,9 +529,10 @@ def generate_realistic_geodata_with_sawit_nusantara():
                 'risk_score': risk_score
             })
     
-    forest_gdf = gpd.GeoDataFrame(forest_areas)
-    sawit_gdf = gpd.GeoDataFrame(sawit_concessions)
-    overlap_gdf = gpd.GeoDataFrame(overlap_areas)
+    # Areas come from the polygons, projected once to equal-area coordinates
+    forest_gdf = with_equal_area(gpd.GeoDataFrame(forest_areas, crs=WGS84))
+    sawit_gdf = with_equal_area(gpd.GeoDataFrame(sawit_concessions, crs=WGS84))
+    overlap_gdf = with_equal_area(gpd.GeoDataFrame(overlap_areas, crs=WGS84))
     
     return forest_gdf, sawit_gdf, overlap_gdf
 
@@ -557,61 +698,75 @@ Berdasarkan analisis komprehensif sistem JALAK-HIJAU:
     return insights.get(query_type, insights["general"])
 
 # OpenAI Integration with enhanced PT SAWIT NUSANTARA context
+AI_MODEL = "gpt-4o-mini"
+AI_TEMPERATURE = 0.7
+AI_MAX_TOKENS = 800
+AI_SYSTEM_PROMPT = "Anda adalah expert analyst untuk PPATK Indonesia yang spesialis dalam mendeteksi environmental crime dan money laundering, dengan fokus khusus pada kasus PT SAWIT NUSANTARA."
+
+@st.cache_resource
+def get_response_cache():
+    """AI responses shared across sessions, keyed by model, prompts, context and normalized query"""
+    return ResponseCache()
+
+@st.cache_resource
+def get_ai_scheduler():
+    """One rate-limited queue for LLM calls from every session, so concurrent analysts share the deployment quota"""
+    return RequestScheduler()
+
+@st.cache_resource
+def get_retrieval_index():
+    """BM25 index over registry, transactions, alerts, cases and STRs; cases and alerts are followed as they change"""
+    transactions_df, high_risk_df, clusters_df, bank_accounts_df, sawit_case_df = load_financial_data()
+    if sawit_case_df is not None and len(sawit_case_df) > 0:
+        transactions_df = pd.concat([sawit_case_df, transactions_df]).drop_duplicates('transaction_id')
+    
+    index = RetrievalIndex(get_alert_store(), get_case_store())
+    index.add_documents(company_documents(load_company_data()))
+    index.add_documents(transaction_documents(transactions_df))
+    index.refresh(force=True)
+    return index
+
 def setup_openai():
-    """Setup Azure OpenAI client"""
+    """Chat-completions client: Azure OpenAI, or the local stand-in / server selected by JALAK_LLM_BACKEND"""
+    # Retries on 429 are left to the shared scheduler, which also paces the other sessions
+    backend = os.getenv(BACKEND_ENV, BACKEND_AZURE)
+    if backend != BACKEND_AZURE:
+        return create_client(backend, max_retries=0)
     try:
         endpoint = os.getenv('AZURE_OPENAI_ENDPOINT') or st.secrets.get('AZURE_OPENAI_ENDPOINT')
         api_key = os.getenv('AZURE_OPENAI_API_KEY') or st.secrets.get('AZURE_OPENAI_API_KEY')
         api_version = os.getenv('AZURE_OPENAI_API_VERSION') or st.secrets.get('AZURE_OPENAI_API_VERSION', '2024-08-01-preview')
         
-        if api_key and endpoint:
-            client = AzureOpenAI(
-                api_key=api_key,
-                api_version=api_version,
-                azure_endpoint=endpoint
-            )
-            return client
-        else:
-            return None
+        return create_client(BACKEND_AZURE, azure_endpoint=endpoint, api_key=api_key, api_version=api_version,
+                             max_retries=0)
     except Exception as e:
         st.error(f"Error setting up Azure OpenAI: {str(e)}")
         return None
 
-def generate_ai_analysis(client, data_context, user_query):
-    """Generate AI-powered analysis with PT SAWIT NUSANTARA focus"""
-    
-    # Check if query is about PT SAWIT NUSANTARA case - use pre-computed insights
-    query_lower = user_query.lower()
-    if any(term in query_lower for term in ['sawit nusantara', 'structuring', 'network', 'legal', 'ahmad wijaya']):
-        if 'structuring' in query_lower:
-            return get_sawit_nusantara_ai_insights("structuring")
-        elif 'network' in query_lower:
-            return get_sawit_nusantara_ai_insights("network")
-        elif 'legal' in query_lower or 'rekomendasi' in query_lower:
-            return get_sawit_nusantara_ai_insights("legal")
-        else:
-            return get_sawit_nusantara_ai_insights("general")
+def stream_ai_analysis(client, data_context, user_query, priority=PRIORITY_INTERACTIVE):
+    """Generate AI-powered analysis with PT SAWIT NUSANTARA focus, yielding text as it arrives"""
     
-    # For other queries, use OpenAI if available
+    # Without a client, case questions fall back to the pre-computed insights
     if not client:
-        return "AI Assistant tidak tersedia. Menggunakan analisis pre-computed untuk kasus PT SAWIT NUSANTARA."
+        query_lower = user_query.lower()
+        if any(term in query_lower for term in ['sawit nusantara', 'structuring', 'network', 'legal', 'ahmad wijaya']):
+            if 'structuring' in query_lower:
+                yield get_sawit_nusantara_ai_insights("structuring")
+            elif 'network' in query_lower:
+                yield get_sawit_nusantara_ai_insights("network")
+            elif 'legal' in query_lower or 'rekomendasi' in query_lower:
+                yield get_sawit_nusantara_ai_insights("legal")
+            else:
+                yield get_sawit_nusantara_ai_insights("general")
+        else:
+            yield "AI Assistant tidak tersedia. Menggunakan analisis pre-computed untuk kasus PT SAWIT NUSANTARA."
+        return
     
     try:
-        enhanced_context = f"""
-        {data_context}
-        
-        KASUS UNGGULAN: PT SAWIT NUSANTARA
-        - Environmental crime: 5,100 ha illegal forest clearing
-        - Money laundering: Rp 67+ miliar through shell companies
-        - Beneficial owner: Ahmad Wijaya (NIK: 1471010101800001)
-        - Pattern: Placement → Structuring → Layering → Integration
-        - Legal violations: UU 18/2013, UU 8/2010, UU 32/2009
-        """
-        
         prompt = f"""
         Anda adalah AI Assistant untuk sistem JALAK-HIJAU yang mendeteksi kejahatan lingkungan dan pencucian uang di Indonesia.
         
-        Konteks data: {enhanced_context}
+        Konteks data: {data_context}
         Pertanyaan user: {user_query}
         
         Berikan analisis yang spesifik, actionable, dan dalam bahasa Indonesia. 
@@ -623,20 +778,43 @@ def generate_ai_analysis(client, data_context, user_query):
         5. Referensi hukum yang relevan
         """
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Anda adalah expert analyst untuk PPATK Indonesia yang spesialis dalam mendeteksi environmental crime dan money laundering, dengan fokus khusus pada kasus PT SAWIT NUSANTARA."},
+        # Identical questions on the same context are answered from the cache without an API call
+        cache = get_response_cache()
+        cache_key = response_cache_key(AI_MODEL, AI_SYSTEM_PROMPT, data_context, user_query, AI_TEMPERATURE,
+                                       max_tokens=AI_MAX_TOKENS)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        # Scheduled against the shared quota; the same question asked meanwhile in another session joins this call
+        stream = get_ai_scheduler().stream(
+            client,
+            [
+                {"role": "system", "content": AI_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=800,
-            temperature=0.7
+            priority=priority,
+            key=cache_key,
+            model=AI_MODEL,
+            max_tokens=AI_MAX_TOKENS,
+            temperature=AI_TEMPERATURE
         )
         
-        return response.choices[0].message.content
+        parts = []
+        for delta in stream:
+            parts.append(delta)
+            yield delta
+        
+        # Only complete answers are cached
+        cache.put(cache_key, ''.join(parts), model=AI_MODEL)
         
     except Exception as e:
-        return f"Error dalam analisis AI: {str(e)}. Menggunakan analisis pre-computed untuk kasus PT SAWIT NUSANTARA."
+        yield f"Error dalam analisis AI: {str(e)}. Menggunakan analisis pre-computed untuk kasus PT SAWIT NUSANTARA."
+
+def generate_ai_analysis(client, data_context, user_query, priority=PRIORITY_BATCH):
+    """Complete AI analysis as one string; queued behind interactive questions unless told otherwise"""
+    return ''.join(stream_ai_analysis(client, data_context, user_query, priority))
 
 # Enhanced Investigation Mode Functions
 def start_investigation(alert_id, alert_data):
@@ -645,15 +823,10 @@ def start_investigation(alert_id, alert_data):
     st.session_state.selected_alert = alert_id
     
     investigation_data = {
-        'alert_id': alert_id,
-        'status': 'ACTIVE',
         'priority': 'CRITICAL' if 'SAWIT NUSANTARA' in alert_data.get('company', '') else 'HIGH',
         'assigned_to': 'Tim Investigasi PPATK',
-        'start_date': datetime.now(),
-        'case_summary': alert_data,
         'evidence_collected': [],
-        'next_actions': [],
-        'timeline': []
+        'next_actions': []
     }
     
     # Special handling for PT SAWIT NUSANTARA case
@@ -689,166 +862,31 @@ def start_investigation(alert_id, alert_data):
             '🏦 Review rekening koran terkait'
         ]
     
-    st.session_state.investigation_data = investigation_data
+    # Opening an existing case is a no-op, so analysts joining a case keep its history
+    get_case_store().open_case(
+        alert_id,
+        alert_data,
+        investigation_data['priority'],
+        investigation_data['assigned_to'],
+        evidence=investigation_data['evidence_collected'],
+        actions=investigation_data['next_actions'],
+        author=investigation_data['assigned_to']
+    )
 
 def create_enhanced_network_visualization(case_data):
-    """Create sophisticated network visualization for PT SAWIT NUSANTARA"""
-    
-    # Create enhanced network graph
-    G = nx.DiGraph()
-    
-    # Define node attributes with enhanced styling
-    nodes = {
-        "Ahmad Wijaya": {
-            "type": "beneficial_owner", 
-            "risk": 95, 
-            "color": "#DC3545", 
-            "size": 60,
-            "details": "NIK: 1471010101800001<br>Central Controller<br>Risk: 95/100"
-        },
-        "PT SAWIT NUSANTARA": {
-            "type": "front_company", 
-            "risk": 95, 
-            "color": "#FF6B35", 
-            "size": 50,
-            "details": "Front Company<br>Palm Oil Operations<br>Risk: 95/100"
-        },
-        "PT KARYA UTAMA": {
-            "type": "shell_company", 
-            "risk": 90, 
-            "color": "#8B0000", 
-            "size": 45,
-            "details": "Shell Company<br>Rp 45B Receiver<br>Risk: 90/100"
-        },
-        "Shell Company 1": {
-            "type": "shell_company", 
-            "risk": 85, 
-            "color": "#CD5C5C", 
-            "size": 35,
-            "details": "Secondary Shell<br>Layering Vehicle<br>Risk: 85/100"
-        },
-        "Shell Company 2": {
-            "type": "shell_company", 
-            "risk": 83, 
-            "color": "#CD5C5C", 
-            "size": 35,
-            "details": "Secondary Shell<br>Layering Vehicle<br>Risk: 83/100"
-        },
-        "Bank Account A": {
-            "type": "account", 
-            "risk": 88, 
-            "color": "#4682B4", 
-            "size": 30,
-            "details": "Primary Account<br>PT SAWIT NUSANTARA<br>Risk: 88/100"
-        },
-        "Bank Account B": {
-            "type": "account", 
-            "risk": 85, 
-            "color": "#87CEEB", 
-            "size": 25,
-            "details": "Shell Account<br>PT KARYA UTAMA<br>Risk: 85/100"
-        },
-        "Hutan Lindung Riau": {
-            "type": "protected_area", 
-            "risk": 100, 
-            "color": "#228B22", 
-            "size": 40,
-            "details": "Protected Forest<br>5,100 ha damaged<br>Critical Violation"
-        }
-    }
-    
-    # Add nodes with attributes
-    for node_id, attrs in nodes.items():
-        G.add_node(node_id, **attrs)
-    
-    # Define edges with enhanced attributes
-    edges = [
-        ("Ahmad Wijaya", "PT SAWIT NUSANTARA", {"weight": 0.95, "relation": "100% Owner", "amount": "", "color": "#DC3545", "width": 4}),
-        ("Ahmad Wijaya", "PT KARYA UTAMA", {"weight": 0.90, "relation": "Hidden Owner", "amount": "", "color": "#8B0000", "width": 3}),
-        ("Ahmad Wijaya", "Shell Company 1", {"weight": 0.85, "relation": "Controller", "amount": "", "color": "#CD5C5C", "width": 2}),
-        ("Ahmad Wijaya", "Shell Company 2", {"weight": 0.83, "relation": "Controller", "amount": "", "color": "#CD5C5C", "width": 2}),
-        ("PT SAWIT NUSANTARA", "Hutan Lindung Riau", {"weight": 0.95, "relation": "Illegal Clearing", "amount": "5,100 ha", "color": "#FF4500", "width": 5}),
-        ("PT SAWIT NUSANTARA", "Bank Account A", {"weight": 0.90, "relation": "Primary Account", "amount": "", "color": "#4682B4", "width": 3}),
-        ("Bank Account A", "Bank Account B", {"weight": 0.88, "relation": "Transfer", "amount": "Rp 45B", "color": "#FF6B35", "width": 6}),
-        ("Bank Account B", "Shell Company 1", {"weight": 0.80, "relation": "Layering", "amount": "Rp 15B", "color": "#FFA500", "width": 3}),
-        ("Shell Company 1", "Shell Company 2", {"weight": 0.75, "relation": "Layering", "amount": "Rp 8B", "color": "#FFA500", "width": 2}),
-    ]
-    
-    # Add edges with attributes
-    for source, target, attrs in edges:
-        G.add_edge(source, target, **attrs)
-    
-    # Create sophisticated layout
-    pos = nx.spring_layout(G, k=3, iterations=50, seed=42)
-    
-    # Position Ahmad Wijaya at center
-    pos["Ahmad Wijaya"] = (0, 0)
-    
-    # Create plotly figure
-    fig = go.Figure()
+    """Render the ego-network of the case company from transactions and ownership data"""
+    center = (case_data or {}).get('case_summary', {}).get('company') or 'PT SAWIT NUSANTARA'
     
-    # Draw edges with varying widths and colors
-    for edge in G.edges(data=True):
-        source, target, attrs = edge
-        x0, y0 = pos[source]
-        x1, y1 = pos[target]
-        
-        fig.add_trace(go.Scatter(
-            x=[x0, x1, None], 
-            y=[y0, y1, None],
-            mode='lines',
-            line=dict(width=attrs['width'], color=attrs['color']),
-            hoverinfo='text',
-            hovertext=f"{source} → {target}<br>{attrs['relation']}<br>{attrs.get('amount', '')}",
-            showlegend=False,
-            opacity=0.8
-        ))
+    G = load_entity_graph()
+    H = ego_network(G, center, radius=2)
     
-    # Draw nodes with varying sizes and colors
-    for node in G.nodes(data=True):
-        node_id, attrs = node
-        x, y = pos[node_id]
-        
-        fig.add_trace(go.Scatter(
-            x=[x], 
-            y=[y],
-            mode='markers+text',
-            marker=dict(
-                size=attrs['size'],
-                color=attrs['color'],
-                line=dict(width=3, color='white'),
-                opacity=0.9
-            ),
-            text=node_id,
-            textposition="bottom center",
-            textfont=dict(size=10, color='black'),
-            hoverinfo='text',
-            hovertext=attrs['details'],
-            showlegend=False
-        ))
+    # Cached per graph; a changed neighborhood warm-starts from the last layout of this center
+    pos = get_layout_service().layout(H, key=center)
+    if center in pos:
+        origin = pos[center]
+        pos = {node: xy - origin for node, xy in pos.items()}
     
-    # Update layout for better visualization
-    fig.update_layout(
-        showlegend=False,
-        hovermode='closest',
-        margin=dict(b=20,l=5,r=5,t=40),
-        annotations=[ 
-            dict(
-                text="Ahmad Wijaya: Central Controller | PT SAWIT NUSANTARA: Environmental Crime | Money Flow: Rp 67B+",
-                showarrow=False,
-                xref="paper", yref="paper",
-                x=0.005, y=-0.002,
-                xanchor='left', yanchor='bottom',
-                font=dict(color='darkred', size=12)
-            )
-        ],
-        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-        plot_bgcolor='rgba(248,248,255,0.8)',
-        height=600
-    )
-    
-    return fig
+    return network_figure(H, pos, center=center)
 
 def create_investigation_dashboard():
     """Create enhanced investigation mode dashboard"""
@@ -856,7 +894,11 @@ def create_investigation_dashboard():
         st.error("Investigation mode not active!")
         return
     
-    inv_data = st.session_state.investigation_data
+    case_store = get_case_store()
+    inv_data = case_store.load_case(st.session_state.selected_alert)
+    if inv_data is None:
+        st.error(f"Case {st.session_state.selected_alert} not found!")
+        return
     
     # Special header for PT SAWIT NUSANTARA case
     if 'SAWIT NUSANTARA' in inv_data.get('case_summary', {}).get('company', ''):
@@ -930,10 +972,31 @@ def create_investigation_dashboard():
         
         new_evidence = st.text_input("Add New Evidence:")
         if st.button("➕ Add Evidence") and new_evidence:
-            inv_data['evidence_collected'].append(f"📝 {new_evidence}")
-            st.session_state.investigation_data = inv_data
+            case_store.add_evidence(inv_data['alert_id'], f"📝 {new_evidence}", author=inv_data['assigned_to'])
             st.rerun()
         
+        # Field verification points and geotagged evidence, one coordinate per line
+        points_text = st.text_area("📍 Field verification coordinates (one per line, e.g. 0.52°S, 101.43°E):")
+        lines = [line.strip() for line in points_text.splitlines() if line.strip()]
+        if lines:
+            try:
+                coordinates = [parse_coordinates(line) for line in lines]
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                coordinates = []
+            if coordinates:
+                located = get_location_lookup().lookup(*zip(*coordinates))
+                located.insert(0, 'coordinates', lines)
+                st.dataframe(located[['coordinates', 'protected_area', 'designation', 'company']], use_container_width=True)
+                if st.button("➕ Add Locations as Evidence"):
+                    for row in located.itertuples():
+                        inside = [f"{label}: {value}" for label, value in (('Protected area', row.protected_area),
+                                                                          ('Concession', row.company)) if pd.notna(value)]
+                        case_store.add_evidence(inv_data['alert_id'],
+                                                f"📍 {row.coordinates} — {'; '.join(inside) or 'outside mapped areas'}",
+                                                author=inv_data['assigned_to'])
+                    st.rerun()
+        
         # Evidence strength meter
         if 'SAWIT NUSANTARA' in inv_data.get('case_summary', {}).get('company', ''):
             st.subheader("📊 Evidence Strength Analysis")
@@ -951,16 +1014,20 @@ def create_investigation_dashboard():
         st.subheader("🎯 Next Actions")
         for i, action in enumerate(inv_data['next_actions']):
             col1, col2 = st.columns([4, 1])
+            is_done = action in inv_data['completed_actions']
             with col1:
-                st.markdown(f"**{i+1}.** {action}")
+                st.markdown(f"**{i+1}.** {'~~' + action + '~~' if is_done else action}")
             with col2:
-                if st.button("✅", key=f"complete_{i}"):
+                if is_done:
+                    st.markdown("✔️ Done")
+                elif st.button("✅", key=f"complete_{i}"):
+                    case_store.complete_action(inv_data['alert_id'], action, author=inv_data['assigned_to'])
                     st.success(f"Action {i+1} marked complete!")
+                    st.rerun()
         
         new_action = st.text_input("Add New Action:")
         if st.button("➕ Add Action") and new_action:
-            inv_data['next_actions'].append(f"🎯 {new_action}")
-            st.session_state.investigation_data = inv_data
+            case_store.add_action(inv_data['alert_id'], f"🎯 {new_action}", author=inv_data['assigned_to'])
             st.rerun()
         
         # Priority matrix for PT SAWIT NUSANTARA
@@ -985,14 +1052,25 @@ def create_investigation_dashboard():
         network_fig = create_enhanced_network_visualization(inv_data)
         st.plotly_chart(network_fig, use_container_width=True)
         
-        # Network statistics
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("🕸️ Network Nodes", "8", delta="Key entities")
-        with col2:
-            st.metric("🔗 Connections", "9", delta="Money flows")
-        with col3:
-            st.metric("🎯 Central Risk", "95%", delta="Ahmad Wijaya")
+        # Network statistics from the latest graph analytics run
+        center = inv_data.get('case_summary', {}).get('company') or 'PT SAWIT NUSANTARA'
+        metrics_store = get_graph_metrics_store()
+        run = metrics_store.latest_run('entity')
+        node = metrics_store.node_metrics(run['run_id'], center) if run else None
+        if node is None:
+            st.info("⏳ Network analytics are being computed in the background")
+        else:
+            top = metrics_store.top_in_community(run['run_id'], node['community'], limit=1)[0]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🕸️ Community", f"{node['community_size']} entities",
+                          delta=f"{run['n_communities']} communities in network")
+            with col2:
+                st.metric("🔗 Connections", f"{node['degree']}",
+                          delta=f"Betweenness {node['betweenness']:.3f}")
+            with col3:
+                st.metric("🎯 Most Central", top['node'],
+                          delta=f"Case company PageRank #{node['pagerank_rank']} of {run['n_nodes']}")
         
         # Money flow analysis
         if 'SAWIT NUSANTARA' in inv_data.get('case_summary', {}).get('company', ''):
@@ -1016,6 +1094,11 @@ def create_investigation_dashboard():
         
         if st.button("🚀 Generate Automatic STR", type="primary"):
             str_content = generate_str_report(inv_data)
+            client = setup_openai()
+            if client:
+                with st.spinner("🤖 Drafting analyst narrative..."):
+                    str_content += generate_str_narrative(client, inv_data)
+            case_store.add_str_report(inv_data['alert_id'], str_content, author=inv_data['assigned_to'])
             st.markdown("### Generated STR Report:")
             st.text_area("STR Content", str_content, height=400)
             
@@ -1189,6 +1272,22 @@ RECOMMENDATION: Further investigation recommended.
     
     return report
 
+def generate_str_narrative(client, investigation_data):
+    """AI-drafted narrative section for an STR, queued behind interactive chat questions"""
+    case = investigation_data['case_summary']
+    company = case.get('company', '')
+    data_context = get_retrieval_index().context(f"{company} {case.get('type', '')} {case.get('details', '')}")
+    narrative = generate_ai_analysis(
+        client, data_context,
+        f"Susun narasi analis untuk laporan STR {investigation_data['alert_id']} atas {company}: "
+        f"kronologi, pola transaksi mencurigakan, pihak terkait, dan dasar hukum."
+    )
+    return f"""
+IX. ANALYST NARRATIVE (AI-ASSISTED)
+----------------------------------
+{narrative}
+"""
+
 # Enhanced Dashboard Functions
 def create_overview_dashboard():
     """Enhanced overview dashboard with PT SAWIT NUSANTARA focus"""
@@ -1231,7 +1330,7 @@ def create_overview_dashboard():
                 folium.CircleMarker(
                     location=[forest.center_lat, forest.center_lon],
                     radius=12,
-                    popup=f"🌲 {forest.get('name', 'Protected Forest')}<br>Status: {forest.get('status', 'Protected')}<br>Area: {forest.get('area_ha', 0):,} ha",
+                    popup=f"🌲 {forest.get('name', 'Protected Forest')}<br>Status: {forest.get('status', 'Protected')}<br>Area: {forest.get('area_ha', 0):,.0f} ha",
                     color='green', fill=True, fillColor='green', fillOpacity=0.6
                 ).add_to(m)
     
@@ -1259,7 +1358,7 @@ def create_overview_dashboard():
                 <div style="width: 350px;">
                   <h4>🏭 {sawit.get('company', 'Palm Company')}</h4><hr>
                   <b>Region:</b> {sawit.get('region', 'Unknown')}<br>
-                  <b>Area:</b> {sawit.get('area_ha', 0):,} ha<br>
+                  <b>Area:</b> {sawit.get('area_ha', 0):,.0f} ha<br>
                   <b>Risk Score:</b> {risk_score}/100<br>
                   <b>Risk Level:</b> 
                     <span style="color: {color}; font-weight: bold;">
@@ -1275,32 +1374,36 @@ def create_overview_dashboard():
     # Display map
     map_data = st_folium(m, width=None, height=500)
     
+    # Financial exposure of the selected concession from the precomputed join layer
+    clicked = (map_data or {}).get('last_object_clicked')
+    if clicked:
+        join_layer, marker_index = load_concession_join_layer()
+        exposure = exposure_at(join_layer, marker_index, clicked['lat'], clicked['lng'])
+        if exposure is not None:
+            st.markdown(f"#### 💼 Financial Exposure - {exposure['company']}")
+            if pd.isna(exposure['company_id']):
+                st.info("No registry company matched to this concession.")
+            else:
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("🏦 Accounts", f"{exposure['n_accounts']}", delta=f"{exposure['n_suspicious_accounts']} suspicious")
+                with col2:
+                    st.metric("⬇️ Total In", f"Rp {exposure['total_in']/1e9:.1f}B", delta=f"{exposure['n_tx_in']} transactions")
+                with col3:
+                    st.metric("⬆️ Total Out", f"Rp {exposure['total_out']/1e9:.1f}B", delta=f"{exposure['n_tx_out']} transactions")
+                with col4:
+                    st.metric("⚠️ High-Risk Counterparties", f"{exposure['n_high_risk_counterparties']}",
+                              delta=f"Rp {exposure['high_risk_amount']/1e9:.1f}B", delta_color="inverse")
+                if exposure['high_risk_counterparties']:
+                    with st.expander("High-risk counterparties"):
+                        st.markdown("\n".join(f"- {name}" for name in exposure['high_risk_counterparties']))
+    
     # Enhanced alert feed
     st.subheader("🚨 Live Alert Feed")
     
-    alerts = [
-        {
-            'id': 'ALT-CRIT-001', 'time': '14:23 WIB', 'location': 'Riau Province',
-            'type': 'Forest-Concession Overlap + Money Laundering', 'risk': 'CRITICAL',
-            'company': 'PT SAWIT NUSANTARA', 
-            'details': 'Overlap: 35.2% (5,100 ha) + Rp 67B suspicious transfers',
-            'alert_source': 'integrated'
-        },
-        {
-            'id': 'ALT-FIN-002', 'time': '13:45 WIB', 'location': 'Financial Network',
-            'type': 'Structuring Pattern', 'risk': 'HIGH',
-            'company': 'PT HIJAU SAWIT KALIMANTAN', 
-            'details': 'Pattern: 8 transactions < Rp 500M threshold',
-            'alert_source': 'financial'
-        },
-        {
-            'id': 'ALT-GEO-003', 'time': '12:30 WIB', 'location': 'Kalimantan Selatan',
-            'type': 'Unauthorized Land Clearing', 'risk': 'MEDIUM',
-            'company': 'PT AGRO SEJAHTERA', 
-            'details': 'Satellite detected: 800 ha clearing without permit',
-            'alert_source': 'geospatial'
-        }
-    ]
+    alerts, _ = get_alert_store().open_alerts(limit=ALERT_FEED_SIZE)
+    if not alerts:
+        st.info("No open alerts.")
     
     # Display alerts with PT SAWIT NUSANTARA highlighted
     for alert in alerts:
@@ -1312,7 +1415,7 @@ def create_overview_dashboard():
         
         st.markdown(f"""
         <div class="{alert_class}">
-            <strong>{icon} Alert {alert['id']}</strong> - {alert['time']}<br>
+            <strong>{icon} Alert {alert['id']}</strong> - {alert['time']}{f" (repeated {alert['occurrences']}×)" if alert.get('occurrences', 1) > 1 else ''}<br>
             <strong>Company:</strong> {alert['company']}<br>
             <strong>Type:</strong> {alert['type']}<br>
             <strong>Details:</strong> {alert.get('details', 'N/A')}<br>
@@ -1376,7 +1479,8 @@ def create_sawit_nusantara_analysis(sawit_case_df, forest_gdf, sawit_gdf, overla
         st.markdown("#### 🛰️ Geospatial Evidence")
         
         # PT SAWIT NUSANTARA specific metrics
-        st.metric("🌲 Forest Area Damaged", "5,100 ha")
+        forest_loss_ha = get_deforestation_store().total_loss(get_case_concession_id())
+        st.metric("🌲 Forest Area Damaged", f"{forest_loss_ha:,.0f} ha")
         st.metric("📍 Overlap Percentage", "35.2%")
         st.metric("🚨 Violation Severity", "CRITICAL")
         st.metric("📍 Coordinates", "0.52°S, 101.43°E")
@@ -1416,113 +1520,58 @@ def create_sawit_nusantara_analysis(sawit_case_df, forest_gdf, sawit_gdf, overla
     # Enhanced timeline visualization replacing Complete Case Timeline Analysis
     st.markdown("#### 📊 Chronological Case Timeline - Interactive")
     
-    # Create comprehensive timeline data for PT SAWIT NUSANTARA
-    base_date = datetime.now() - timedelta(days=15)
+    # Environmental track: forest loss events of the case concession from the event store
+    case_date = get_case_date()
+    clearing_events = get_deforestation_store().events(
+        get_case_concession_id(), start=case_date - timedelta(days=CASE_TIMELINE_DAYS),
+        end=case_date + timedelta(days=CASE_TIMELINE_DAYS))
+    # The other tracks are laid out relative to the first recorded clearing
+    base_date = (datetime.strptime(clearing_events[0]['event_date'], '%Y-%m-%d') if clearing_events
+                 else datetime.combine(case_date, datetime.min.time()) - timedelta(days=1))
     timeline_events = []
     
-    # Environmental track events
-    timeline_events.extend([
-        {
-            'date': base_date,
+    for i, clearing in enumerate(clearing_events):
+        transitions = ', '.join(f"{name.replace('->', ' → ')}: {ha:,.0f} ha"
+                                for name, ha in clearing['transitions'].items())
+        timeline_events.append({
+            'date': datetime.strptime(clearing['event_date'], '%Y-%m-%d'),
             'event_type': 'Environmental',
             'track': 'Environmental Crime',
-            'event': 'Forest clearing initiation detected',
-            'details': '🛰️ Satellite imagery shows initial clearing activity in Hutan Lindung Riau',
-            'amount': 0,
-            'risk_level': 85,
-            'color': '#228B22',
-            'size': 15,
-            'y_position': 3
-        },
-        {
-            'date': base_date + timedelta(days=3),
-            'event_type': 'Environmental',
-            'track': 'Environmental Crime', 
-            'event': 'Major clearing expansion',
-            'details': '🌲 5,100 hectares cleared - 35.2% overlap with protected area confirmed',
+            'event': 'Forest clearing initiation detected' if i == 0 else f"Clearing: {clearing['loss_ha']:,.0f} ha",
+            'details': f"{clearing['details'] or ''}<br>{transitions}",
             'amount': 0,
-            'risk_level': 95,
-            'color': '#DC3545',
-            'size': 25,
+            'risk_level': round(100 * (clearing['confidence'] or 0)),
+            'color': '#DC3545' if clearing['loss_ha'] >= 1000 else '#228B22',
+            'size': int(np.clip(10 + clearing['loss_ha'] / 300, 12, 30)),
             'y_position': 3
-        }
-    ])
+        })
     
-    # Financial track events - overlapping with environmental
-    timeline_events.extend([
-        {
-            'date': base_date + timedelta(days=1),
-            'event_type': 'Financial',
-            'track': 'Money Laundering',
-            'event': 'Placement: Rp 45B transfer',
-            'details': '💰 PT SAWIT NUSANTARA → PT KARYA UTAMA CONSULTING (Rp 45,000,000,000)',
-            'amount': 45000000000,
-            'risk_level': 95,
-            'color': '#FF6B35',
-            'size': 30,
-            'y_position': 2
-        },
-        {
-            'date': base_date + timedelta(days=2),
-            'event_type': 'Financial',
-            'track': 'Money Laundering',
-            'event': 'Structuring begins',
-            'details': '📊 First transaction Rp 450M - under threshold pattern starts',
-            'amount': 450000000,
-            'risk_level': 88,
-            'color': '#FFA500',
-            'size': 18,
-            'y_position': 2
-        },
-        {
-            'date': base_date + timedelta(days=3),
+    # Financial track: the case company's outflows around the first clearing, from the transaction data
+    case_transactions = sawit_case_df if sawit_case_df is not None else pd.DataFrame(
+        columns=['transaction_id', 'transaction_date', 'sender_company', 'receiver_company', 'amount_idr', 'risk_score'])
+    case_transactions = case_transactions[case_transactions['sender_company'] == CASE_COMPANY]
+    # Unusual against the company's whole outflow history, not just the window shown
+    case_outflows = find_unusual_outflows(case_transactions)
+    unusual_ids = set(case_outflows['transaction_id'])
+    shown = case_transactions[
+        (case_transactions['transaction_date'] >= base_date - timedelta(days=CASE_OUTFLOWS_BEFORE_DAYS)) &
+        (case_transactions['transaction_date'] <= base_date + timedelta(days=CASE_OUTFLOWS_AFTER_DAYS))]
+    
+    for outflow in shown.sort_values('transaction_date').itertuples(index=False):
+        unusual = outflow.transaction_id in unusual_ids
+        timeline_events.append({
+            'date': pd.Timestamp(outflow.transaction_date).to_pydatetime(),
             'event_type': 'Financial',
             'track': 'Money Laundering',
-            'event': 'Structuring continues',
-            'details': '📊 Transaction 2: Rp 485M to Shell Company 1',
-            'amount': 485000000,
-            'risk_level': 85,
-            'color': '#FFA500',
-            'size': 16,
+            'event': f"{'Unusual outflow' if unusual else 'Outflow'}: Rp {outflow.amount_idr/1e9:.1f}B",
+            'details': (f"💰 {outflow.sender_company} → {outflow.receiver_company} "
+                        f"(Rp {outflow.amount_idr:,.0f})<br>{outflow.transaction_id}"),
+            'amount': outflow.amount_idr,
+            'risk_level': getattr(outflow, 'risk_score', 0),
+            'color': '#FF6B35' if unusual else '#FFA500',
+            'size': int(np.clip(12 + outflow.amount_idr / 1e9, 12, 30)),
             'y_position': 2
-        },
-        {
-            'date': base_date + timedelta(days=4),
-            'event_type': 'Financial',
-            'track': 'Money Laundering',
-            'event': 'Peak structuring activity',
-            'details': '📊 Transactions 3-5: Multiple Rp 400-499M transfers (same day as major clearing)',
-            'amount': 1350000000,
-            'risk_level': 92,
-            'color': '#FF6B35',
-            'size': 22,
-            'y_position': 2
-        },
-        {
-            'date': base_date + timedelta(days=7),
-            'event_type': 'Financial',
-            'track': 'Money Laundering',
-            'event': 'Layering phase',
-            'details': '🔄 Complex transfers through shell company network - obscuring trail',
-            'amount': 15000000000,
-            'risk_level': 80,
-            'color': '#CD5C5C',
-            'size': 20,
-            'y_position': 2
-        },
-        {
-            'date': base_date + timedelta(days=10),
-            'event_type': 'Financial',
-            'track': 'Money Laundering',
-            'event': 'Integration phase',
-            'details': '🏢 Final placement into legitimate business accounts',
-            'amount': 8000000000,
-            'risk_level': 75,
-            'color': '#4682B4',
-            'size': 18,
-            'y_position': 2
-        }
-    ])
+        })
     
     # Investigation track events
     timeline_events.extend([
@@ -1592,40 +1641,50 @@ def create_sawit_nusantara_analysis(sawit_case_df, forest_gdf, sawit_gdf, overla
             showlegend=True
         ))
     
-    # Add connecting lines to show causality
-    # Environmental → Financial correlation
-    env_major = timeline_df[(timeline_df['event'] == 'Major clearing expansion')]['date'].iloc[0]
-    fin_peak = timeline_df[(timeline_df['event'] == 'Peak structuring activity')]['date'].iloc[0]
-    
-    fig_timeline.add_shape(
-        type="line",
-        x0=env_major, y0=3,
-        x1=fin_peak, y1=2,
-        line=dict(color="red", width=2, dash="dash"),
-        opacity=0.6
-    )
-    
-    # Add annotation for correlation
-    fig_timeline.add_annotation(
-        x=fin_peak,
-        y=2.5,
-        text="🔗 Correlation:<br>Same-day activity",
-        showarrow=True,
-        arrowhead=2,
-        arrowsize=1,
-        arrowwidth=2,
-        arrowcolor="red",
-        font=dict(size=10, color="red"),
-        bgcolor="rgba(255,255,255,0.8)",
-        bordercolor="red",
-        borderwidth=1
-    )
+    # Connect each clearing event to its nearest unusual outflow found by the correlation engine
+    lag_after = st.slider("🔗 Correlation lag window (days after clearing)", 0, 14, 7)
+    env_events = timeline_df[timeline_df['track'] == 'Environmental Crime']
+    change_events = pd.DataFrame({
+        'company': CASE_COMPANY,
+        'event_date': env_events['date'].to_numpy(),
+        'event': env_events['event'].to_numpy()
+    })
+    correlations = score_correlations(correlate_change_events(change_events, case_outflows, 0, lag_after), 0, lag_after)
+    fin_dates = dict(zip(case_transactions['transaction_id'], case_transactions['transaction_date']))
+    
+    for _, match in correlations[correlations['n_outflows'] > 0].iterrows():
+        outflow_date = fin_dates[match['nearest_transaction_id']]
+        lag = int(match['nearest_lag_days'])
+        fig_timeline.add_shape(
+            type="line",
+            x0=match['event_date'], y0=3,
+            x1=outflow_date, y1=2,
+            line=dict(color="red", width=2, dash="dash"),
+            opacity=0.6
+        )
+        fig_timeline.add_annotation(
+            x=outflow_date,
+            y=2.5,
+            text=f"🔗 Correlation ({match['score']:.0f}/100):<br>{'Same-day activity' if lag == 0 else f'{lag}-day lag'}",
+            showarrow=True,
+            arrowhead=2,
+            arrowsize=1,
+            arrowwidth=2,
+            arrowcolor="red",
+            font=dict(size=10, color="red"),
+            bgcolor="rgba(255,255,255,0.8)",
+            bordercolor="red",
+            borderwidth=1
+        )
     
     # Update layout
     fig_timeline.update_layout(
 
         xaxis=dict(
             title="Date",
+            # Opens on the case window; the current investigation status lies further right
+            range=[base_date - timedelta(days=CASE_OUTFLOWS_BEFORE_DAYS),
+                   base_date + timedelta(days=CASE_OUTFLOWS_AFTER_DAYS)],
             showgrid=True,
             gridwidth=1,
             gridcolor='lightgray'
@@ -1720,7 +1779,8 @@ def create_ai_assistant():
     st.subheader("Expert Analysis & Investigation Support")
     
     client = setup_openai()
-    
+    if isinstance(client, LocalChatClient):
+        st.caption("🧪 Offline mode: answers come from the local LLM stand-in, not Azure OpenAI")
     
     col1, col2 = st.columns([2, 1])
     
@@ -1742,6 +1802,9 @@ def create_ai_assistant():
                 </div>
                 """, unsafe_allow_html=True)
         
+        # New exchanges render here, below the history, while the answer streams in
+        live_response = st.container()
+        
         # Chat input
         user_query = st.text_input("Konsultasi dengan AI Expert:", 
                                   placeholder="Contoh: Analisis pola money laundering PT SAWIT NUSANTARA")
@@ -1750,8 +1813,6 @@ def create_ai_assistant():
         
         with col_send:
             if st.button("📤 Kirim") and user_query:
-                st.session_state.chat_history.append({'role': 'user', 'content': user_query})
-                
                 # Check if query matches any predefined prompts
                 predefined_responses = {
                     "Analisis kasus PT SAWIT NUSANTARA": get_sawit_nusantara_ai_insights("general"),
@@ -1768,17 +1829,16 @@ def create_ai_assistant():
                 if user_query in predefined_responses:
                     ai_response = predefined_responses[user_query]
                 else:
-                    # Use AI for free-form queries
-                    data_context = """
-                    PT SAWIT NUSANTARA Case:
-                    - 5,100 ha illegal forest clearing (35.2% overlap)
-                    - Rp 67B suspicious transactions
-                    - Money laundering through shell companies
-                    - Ahmad Wijaya beneficial owner
-                    - Active investigation in progress
-                    """
-                    ai_response = generate_ai_analysis(client, data_context, user_query)
+                    # Use AI for free-form queries, grounded in the cases, alerts and records that match them
+                    data_context = get_retrieval_index().context(user_query)
+                    # Tokens render as they arrive; the rerun waits for the complete answer
+                    with live_response:
+                        st.markdown(f"**👤 Anda:** {user_query}")
+                        st.markdown("**🤖 AI Expert:**")
+                        ai_response = st.write_stream(stream_ai_analysis(client, data_context, user_query))
                 
+                # History only receives finished exchanges
+                st.session_state.chat_history.append({'role': 'user', 'content': user_query})
                 st.session_state.chat_history.append({'role': 'assistant', 'content': ai_response})
                 st.rerun()
         
@@ -1834,6 +1894,11 @@ def create_ai_assistant():
         - 🛰️ Satellite imagery analysis
         - 🎯 Investigation prioritization
         """)
+        
+        cache_stats = get_response_cache().stats()
+        st.metric("⚡ Response Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+                  delta=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses", delta_color="off")
+        st.caption(f"{cache_stats['entries']} cached analyses ({cache_stats['size_bytes'] / 1024:.0f} KB)")
 
 def create_report_generation():
     """Enhanced automatic report generation page"""
@@ -2180,7 +2245,6 @@ def main():
             if st.button("❌ Exit Investigation", type="secondary"):
                 st.session_state.investigation_mode = False
                 st.session_state.selected_alert = None
-                st.session_state.investigation_data = {}
                 st.rerun()
         
         create_investigation_dashboard()
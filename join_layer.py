@@ -0,0 +1,162 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Transactions at or above this risk score mark the counterparty as high-risk
+HIGH_RISK_SCORE = 70
+
+_LEGAL_FORM = re.compile(r"^(PT|CV|UD)\s+|\s+(TBK)$")
+_NON_ALNUM = re.compile(r"[^A-Z0-9 ]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_company_name(name):
+    """Normalize a company name so registry, bank and concession spellings match"""
+    if not isinstance(name, str):
+        return ""
+    key = _NON_ALNUM.sub(" ", name.upper())
+    key = _SPACES.sub(" ", key).strip()
+    return _LEGAL_FORM.sub("", key).strip()
+
+
+def _normalized(series):
+    # Normalize each distinct name once instead of once per row
+    uniques = pd.Series(series.dropna().unique())
+    lookup = dict(zip(uniques, uniques.map(normalize_company_name)))
+    return series.map(lookup).fillna("")
+
+
+def _concession_centers(sawit_gdf):
+    """Return (lat, lon) arrays for each concession marker"""
+    if 'center_lat' in sawit_gdf.columns and 'center_lon' in sawit_gdf.columns:
+        return sawit_gdf['center_lat'].to_numpy(float), sawit_gdf['center_lon'].to_numpy(float)
+    points = sawit_gdf.geometry.representative_point()
+    return points.y.to_numpy(float), points.x.to_numpy(float)
+
+
+def _party_company_ids(transactions_df, side, account_company, name_company):
+    """Resolve sender/receiver of each transaction to a registry company_id"""
+    company_ids = pd.Series(np.nan, index=transactions_df.index, dtype=object)
+    account_col = f'{side}_account_id'
+    if account_col in transactions_df.columns:
+        company_ids = transactions_df[account_col].map(account_company)
+    # Demo data and accounts missing from the bank file fall back to the company name
+    name_col = f'{side}_company'
+    if name_col in transactions_df.columns:
+        by_name = _normalized(transactions_df[name_col]).map(name_company)
+        company_ids = company_ids.fillna(by_name)
+    return company_ids
+
+
+def build_concession_join_layer(sawit_gdf, companies_df, bank_accounts_df, transactions_df,
+                                high_risk_score=HIGH_RISK_SCORE):
+    """Materialize concession -> registry company -> accounts -> financial exposure
+
+    Returns one row per concession (indexed like sawit_gdf) so a map click is a
+    single .loc lookup instead of a scan over transactions.
+    """
+    companies_df = companies_df if companies_df is not None else pd.DataFrame()
+    bank_accounts_df = bank_accounts_df if bank_accounts_df is not None else pd.DataFrame()
+    transactions_df = transactions_df if transactions_df is not None else pd.DataFrame()
+
+    # Name -> company_id from the registry, with bank account holders as fallback
+    name_company = {}
+    if {'company_id', 'company_name'} <= set(bank_accounts_df.columns):
+        holders = bank_accounts_df[['company_id', 'company_name']].drop_duplicates('company_id')
+        name_company.update(zip(_normalized(holders['company_name']), holders['company_id']))
+    if {'company_id', 'nama_perseroan'} <= set(companies_df.columns):
+        registry = companies_df[['company_id', 'nama_perseroan']].drop_duplicates('company_id')
+        registry_keys = _normalized(registry['nama_perseroan'])
+        # First registry entry wins when two companies normalize to the same name
+        first = ~registry_keys.duplicated()
+        name_company.update(zip(registry_keys[first], registry['company_id'][first]))
+    name_company.pop("", None)
+
+    layer = pd.DataFrame(index=sawit_gdf.index)
+    layer['company'] = sawit_gdf['company'] if 'company' in sawit_gdf.columns else ""
+    layer['company_id'] = _normalized(layer['company']).map(name_company)
+    layer['center_lat'], layer['center_lon'] = _concession_centers(sawit_gdf)
+    layer['region'] = sawit_gdf['region'] if 'region' in sawit_gdf.columns else ""
+    layer['overlap_percentage'] = sawit_gdf['overlap_percentage'].fillna(0) if 'overlap_percentage' in sawit_gdf.columns else 0.0
+    layer['is_overlapping'] = (sawit_gdf['is_overlapping'].fillna(False).astype(bool)
+                               if 'is_overlapping' in sawit_gdf.columns else layer['overlap_percentage'] > 0)
+
+    # Accounts per company
+    if {'account_id', 'company_id'} <= set(bank_accounts_df.columns):
+        account_company = bank_accounts_df.set_index('account_id')['company_id']
+        accounts = bank_accounts_df.groupby('company_id')['account_id'].agg(tuple)
+        if 'is_suspicious' in bank_accounts_df.columns:
+            suspicious_accounts = bank_accounts_df.groupby('company_id')['is_suspicious'].sum()
+        else:
+            suspicious_accounts = pd.Series(dtype=float)
+    else:
+        account_company = pd.Series(dtype=object)
+        accounts = pd.Series(dtype=object)
+        suspicious_accounts = pd.Series(dtype=float)
+
+    layer['account_ids'] = layer['company_id'].map(accounts)
+    layer['account_ids'] = layer['account_ids'].apply(lambda ids: ids if isinstance(ids, tuple) else ())
+    layer['n_accounts'] = layer['account_ids'].map(len)
+    layer['n_suspicious_accounts'] = layer['company_id'].map(suspicious_accounts).fillna(0).astype(int)
+
+    # Flows in/out per company, computed with one groupby per side
+    flows = pd.DataFrame(index=pd.Index([], name='company_id'))
+    counterparties = pd.Series(dtype=object)
+    if len(transactions_df) > 0 and 'amount_idr' in transactions_df.columns:
+        tx = pd.DataFrame({
+            'sender_id': _party_company_ids(transactions_df, 'sender', account_company, name_company),
+            'receiver_id': _party_company_ids(transactions_df, 'receiver', account_company, name_company),
+            'sender_company': transactions_df.get('sender_company'),
+            'receiver_company': transactions_df.get('receiver_company'),
+            'amount_idr': transactions_df['amount_idr'],
+        })
+        risky = transactions_df.get('risk_score', pd.Series(0, index=tx.index)) >= high_risk_score
+        if 'is_flagged' in transactions_df.columns:
+            risky |= transactions_df['is_flagged'].astype(bool)
+        tx['is_high_risk'] = risky.to_numpy()
+
+        outgoing = tx.groupby('sender_id').agg(total_out=('amount_idr', 'sum'), n_tx_out=('amount_idr', 'size'))
+        incoming = tx.groupby('receiver_id').agg(total_in=('amount_idr', 'sum'), n_tx_in=('amount_idr', 'size'))
+        flows = outgoing.join(incoming, how='outer')
+
+        # High-risk counterparties are seen from both sides of the transfer
+        high_risk = tx[tx['is_high_risk']]
+        sides = pd.concat([
+            high_risk[['sender_id', 'receiver_company', 'amount_idr']].set_axis(['company_id', 'counterparty', 'amount_idr'], axis=1),
+            high_risk[['receiver_id', 'sender_company', 'amount_idr']].set_axis(['company_id', 'counterparty', 'amount_idr'], axis=1),
+        ]).dropna(subset=['company_id', 'counterparty'])
+        flows = flows.join(sides.groupby('company_id')['amount_idr'].sum().rename('high_risk_amount'), how='outer')
+        counterparties = sides.groupby('company_id')['counterparty'].agg(lambda names: tuple(sorted(set(names))))
+
+    for column in ['total_in', 'total_out', 'n_tx_in', 'n_tx_out', 'high_risk_amount']:
+        values = flows[column] if column in flows.columns else pd.Series(dtype=float)
+        layer[column] = layer['company_id'].map(values).fillna(0).astype('int64')
+    layer['net_flow'] = layer['total_in'] - layer['total_out']
+    layer['high_risk_counterparties'] = layer['company_id'].map(counterparties)
+    layer['high_risk_counterparties'] = layer['high_risk_counterparties'].apply(
+        lambda names: names if isinstance(names, tuple) else ())
+    layer['n_high_risk_counterparties'] = layer['high_risk_counterparties'].map(len)
+
+    return layer
+
+
+def build_marker_index(join_layer, precision=6):
+    """Map rounded marker coordinates to concession index for click lookups"""
+    keys = zip(join_layer['center_lat'].round(precision), join_layer['center_lon'].round(precision))
+    return dict(zip(keys, join_layer.index))
+
+
+def concession_exposure(join_layer, concession_idx):
+    """Return the precomputed financial exposure of one concession as a dict"""
+    if concession_idx not in join_layer.index:
+        return None
+    return join_layer.loc[concession_idx].to_dict()
+
+
+def exposure_at(join_layer, marker_index, lat, lon, precision=6):
+    """Look up the exposure for a clicked map marker"""
+    concession_idx = marker_index.get((round(lat, precision), round(lon, precision)))
+    if concession_idx is None:
+        return None
+    return concession_exposure(join_layer, concession_idx)
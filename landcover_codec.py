@@ -0,0 +1,53 @@
+import numpy as np
+
+# Output classes of the land-cover model, in channel order (LandcoverClassification_TDL.ipynb)
+CLASS_NAMES = ['urban_land', 'agriculture_land', 'rangeland', 'forest_land', 'water', 'barren_land', 'unknown']
+# DeepGlobe mask colours of the same classes (class_dict.csv)
+CLASS_RGB = [(0, 255, 255), (255, 255, 0), (255, 0, 255), (0, 255, 0), (0, 0, 255), (255, 255, 255), (0, 0, 0)]
+UNKNOWN_CLASS = CLASS_NAMES.index('unknown')
+NODATA_CLASS = 255
+
+# Class index -> colour for all 256 uint8 values; nodata and unused indices are black
+PALETTE = np.zeros((256, 3), dtype=np.uint8)
+PALETTE[:len(CLASS_RGB)] = CLASS_RGB
+
+_lookup = None
+
+
+def pack_rgb(rgb):
+    """(..., 3) uint8 colours to (...) uint32 0xRRGGBB keys"""
+    rgb = np.asarray(rgb, dtype=np.uint8)
+    return (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+
+
+def _colour_lookup():
+    """Packed colour -> class table over all 2^24 colours (16 MB, built once per process)"""
+    global _lookup
+    if _lookup is None:
+        table = np.full(1 << 24, UNKNOWN_CLASS, dtype=np.uint8)
+        table[pack_rgb(CLASS_RGB)] = np.arange(len(CLASS_RGB), dtype=np.uint8)
+        _lookup = table
+    return _lookup
+
+
+def rgb_to_classes(mask):
+    """(H, W, 3) colour mask to (H, W) uint8 class indices with one table lookup per pixel
+
+    Colours outside the palette map to unknown.
+    """
+    return _colour_lookup()[pack_rgb(mask)]
+
+
+def classes_to_rgb(classes):
+    """(H, W) class indices to an (H, W, 3) colour mask by palette indexing"""
+    return PALETTE[np.asarray(classes, dtype=np.uint8)]
+
+
+def one_hot(classes, n_classes=len(CLASS_NAMES), dtype=np.float32):
+    """(H, W) class indices to (H, W, n_classes) one-hot; out-of-range indices get all zeros"""
+    return (np.asarray(classes)[..., None] == np.arange(n_classes, dtype=np.uint8)).astype(dtype)
+
+
+def reverse_one_hot(scores, axis=-1):
+    """One-hot or probability maps back to uint8 class indices"""
+    return np.argmax(scores, axis=axis).astype(np.uint8)
@@ -0,0 +1,237 @@
+import argparse
+import queue
+import resource
+import threading
+import time
+
+import numpy as np
+import rasterio
+from rasterio import windows
+
+from landcover_codec import CLASS_NAMES, NODATA_CLASS
+
+# The model was trained on 1024 x 1024 crops; DeepLabV3+ needs sides divisible by 16
+TILE_SIZE = 1024
+TILE_OVERLAP = 128
+BATCH_SIZE = 2
+PREFETCH_TILES = 4
+# ImageNet statistics used by the mobilenet_v2 encoder's preprocessing
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+_DONE = object()
+
+
+def preprocess(rgb, input_max=255.0):
+    """(3, H, W) scene pixels to the normalized float input of the encoder"""
+    x = rgb.astype(np.float32) / input_max
+    return (x - IMAGENET_MEAN[:, None, None]) / IMAGENET_STD[:, None, None]
+
+
+def torch_predictor(model, threads=None):
+    """Wrap a torch segmentation model as a numpy (N, 3, H, W) -> (N, C, H, W) probability function"""
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    model.eval()
+
+    def predict(batch):
+        with torch.inference_mode():
+            out = model(torch.from_numpy(batch))
+            # Models exported without the softmax2d head return logits
+            if out.min() < 0 or out.max() > 1:
+                out = torch.softmax(out, dim=1)
+            return out.numpy()
+    return predict
+
+
+def load_model(path):
+    """Model saved with torch.save(model, ...) in the training notebook"""
+    import torch
+
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+def _positions(length, tile, stride):
+    if length <= tile:
+        return [0]
+    positions = list(range(0, length - tile + 1, stride))
+    if positions[-1] != length - tile:
+        positions.append(length - tile)
+    return positions
+
+
+def blend_weights(tile, overlap):
+    """Per-pixel tile weight ramping up over the overlap, so seams fade between tiles"""
+    distance = np.minimum(np.arange(tile) + 0.5, tile - np.arange(tile) - 0.5)
+    ramp = np.clip(distance / max(overlap, 1), 1e-3, 1.0).astype(np.float32)
+    return np.outer(ramp, ramp)
+
+
+class _StripWriter:
+    """Accumulates blended probabilities for one band of tile rows and writes finished rows
+
+    Memory is n_classes x tile x scene width floats, independent of scene height.
+    """
+
+    def __init__(self, dst, n_classes, tile, width, height):
+        self.dst = dst
+        self.height = height
+        self.width = width
+        self.top = 0
+        self.scores = np.zeros((n_classes, tile, width), dtype=np.float32)
+        self.valid = np.zeros((tile, width), dtype=bool)
+
+    def add(self, row, col, probs, weight, valid):
+        h, w = valid.shape
+        r = row - self.top
+        # Weighted sums need no normalization: only the argmax is kept
+        self.scores[:, r:r + h, col:col + w] += probs[:, :h, :w] * weight[:h, :w]
+        self.valid[r:r + h, col:col + w] |= valid
+
+    def flush_until(self, row):
+        """Write rows above row (no later tile touches them) and slide the strip down"""
+        rows = min(row, self.height) - self.top
+        if rows <= 0:
+            return
+        classes = np.argmax(self.scores[:, :rows], axis=0).astype(np.uint8)
+        classes[~self.valid[:rows]] = NODATA_CLASS
+        self.dst.write(classes, 1, window=windows.Window(0, self.top, self.width, rows))
+        self.valid[:-rows] = self.valid[rows:].copy()
+        self.valid[-rows:] = False
+        self.scores[:, :-rows] = self.scores[:, rows:].copy()
+        self.scores[:, -rows:] = 0
+        self.top += rows
+
+
+def classify_scene(src_path, dst_path, predict, n_classes=len(CLASS_NAMES), tile=TILE_SIZE, overlap=TILE_OVERLAP,
+                   batch_size=BATCH_SIZE, prefetch=PREFETCH_TILES, bands=(1, 2, 3), input_max=255.0, log=None):
+    """Classify a large GeoTIFF tile by tile and write a georeferenced class raster
+
+    A reader thread fills a bounded queue with preprocessed tiles, the calling
+    thread runs predict on batches, and a writer thread blends overlapping
+    tiles and writes finished rows, so reading, inference and writing
+    overlap while memory stays bounded. Returns throughput statistics.
+    """
+    if tile % 16:
+        raise ValueError("tile must be a multiple of 16 for DeepLabV3+")
+    stride = tile - overlap
+    weight = blend_weights(tile, overlap)
+    to_model = queue.Queue(maxsize=prefetch)
+    to_writer = queue.Queue(maxsize=prefetch)
+    errors = []
+    stop = threading.Event()
+
+    with rasterio.open(src_path) as src:
+        profile = src.profile.copy()
+        width, height = src.width, src.height
+        grid = [(row, col) for row in _positions(height, tile, stride) for col in _positions(width, tile, stride)]
+    profile.update(count=1, dtype='uint8', nodata=NODATA_CLASS, compress='deflate', tiled=True,
+                   blockxsize=256, blockysize=256)
+    profile.pop('photometric', None)
+
+    def reader():
+        try:
+            with rasterio.open(src_path) as src:
+                for row, col in grid:
+                    if stop.is_set():
+                        break
+                    window = windows.Window(col, row, min(tile, width - col), min(tile, height - row))
+                    rgb = src.read(list(bands), window=window)
+                    valid = src.read_masks(bands[0], window=window) > 0
+                    pad = ((0, 0), (0, tile - rgb.shape[1]), (0, tile - rgb.shape[2]))
+                    to_model.put((row, col, valid, preprocess(np.pad(rgb, pad, mode='symmetric'), input_max)))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            to_model.put(_DONE)
+
+    def writer():
+        try:
+            with rasterio.open(dst_path, 'w', **profile) as dst:
+                strip = _StripWriter(dst, n_classes, tile, width, height)
+                while True:
+                    item = to_writer.get()
+                    if item is _DONE:
+                        break
+                    row, col, valid, probs = item
+                    strip.flush_until(row)
+                    strip.add(row, col, probs, weight, valid)
+                strip.flush_until(height)
+        except Exception as exc:
+            errors.append(exc)
+            # Keep draining so the model loop never blocks on a dead writer
+            while to_writer.get() is not _DONE:
+                pass
+
+    threads = [threading.Thread(target=reader, daemon=True), threading.Thread(target=writer, daemon=True)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    done = 0
+    finished = False
+    try:
+        while not finished:
+            batch = []
+            while len(batch) < batch_size:
+                item = to_model.get()
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+            if not batch:
+                break
+            probs = predict(np.stack([item[3] for item in batch]))
+            for (row, col, valid, _), tile_probs in zip(batch, probs):
+                to_writer.put((row, col, valid, tile_probs))
+            done += len(batch)
+            if log:
+                log(f"{done}/{len(grid)} tiles")
+    finally:
+        to_writer.put(_DONE)
+        if not finished:
+            # Inference failed: stop the reader and unblock it
+            stop.set()
+            while to_model.get() is not _DONE:
+                pass
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start
+    return {
+        'tiles': len(grid),
+        'seconds': elapsed,
+        'tiles_per_second': len(grid) / elapsed if elapsed > 0 else float('inf'),
+        'megapixels_per_second': width * height / 1e6 / elapsed if elapsed > 0 else float('inf'),
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a GeoTIFF with the DeepLabV3+ land-cover model on CPU")
+    parser.add_argument('scene')
+    parser.add_argument('output')
+    parser.add_argument('--model', default='best_model.pth',
+                        help="Notebook model, or a TorchScript/ONNX artifact from model_export.py")
+    parser.add_argument('--tile', type=int, default=TILE_SIZE)
+    parser.add_argument('--overlap', type=int, default=TILE_OVERLAP)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--threads', type=int, default=None, help="Torch intra-op threads")
+    args = parser.parse_args()
+
+    from model_export import get_predictor
+
+    predict = get_predictor(args.model, threads=args.threads)
+    stats = classify_scene(args.scene, args.output, predict, tile=args.tile, overlap=args.overlap,
+                           batch_size=args.batch_size, log=print)
+    print(f"{stats['tiles']} tiles in {stats['seconds']:.1f}s: {stats['tiles_per_second']:.2f} tiles/s, "
+          f"{stats['megapixels_per_second']:.2f} MP/s, peak RSS {stats['peak_rss_mb']:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+# JALAK_LLM_BACKEND: 'azure' (default), 'local' for the in-process stand-in,
+# or the base URL of an OpenAI-compatible server such as `python llm_backend.py`
+BACKEND_ENV = 'JALAK_LLM_BACKEND'
+BACKEND_AZURE = 'azure'
+BACKEND_LOCAL = 'local'
+# Stand-in timing: delay before the first token, then a steady generation rate
+FIRST_TOKEN_LATENCY = 0.3
+TOKENS_PER_SECOND = 60.0
+DEFAULT_PORT = 8765
+
+_CONTEXT_LINE = re.compile(r"^\s*\[([^\]]+)\]\s*(.+)$", re.MULTILINE)
+
+
+class RateLimitedError(Exception):
+    """429 from the stand-in, shaped like openai.RateLimitError (status_code, retry_after)"""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def stand_in_answer(messages):
+    """Deterministic answer built from the prompt: the retrieved context snippets it was given, summarized"""
+    prompt = messages[-1]['content'] if messages else ''
+    question = re.search(r"Pertanyaan user:\s*(.+)", prompt)
+    lines = [f"Analisis lokal untuk: {question.group(1).strip() if question else prompt.strip()[:200]}", '']
+    snippets = _CONTEXT_LINE.findall(prompt)
+    if snippets:
+        lines.append("Temuan dari data terkait:")
+        for title, text in snippets:
+            lines.append(f"- {title}: {' '.join(text.split()[:40])}")
+    else:
+        lines.append("Tidak ada data terkait yang ditemukan untuk pertanyaan ini.")
+    lines += ['', "Rekomendasi: verifikasi temuan di atas dan lanjutkan penelusuran transaksi serta kepemilikan."]
+    return '\n'.join(lines)
+
+
+def _split_tokens(text):
+    """Text split into word-sized pieces that join back to the original"""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class _Completions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, messages, stream=False, max_tokens=None, temperature=None, **params):
+        return self._client.complete(model, messages, stream=stream, max_tokens=max_tokens)
+
+
+class _Chat:
+    def __init__(self, client):
+        self.completions = _Completions(client)
+
+
+class LocalChatClient:
+    """In-process stand-in for an OpenAI/Azure client's chat.completions API
+
+    Answers come from responder(messages) (stand_in_answer by default),
+    cut to max_tokens word-sized tokens and delivered after
+    first_token_latency seconds at tokens_per_second, as one ChatCompletion
+    or as ChatCompletionChunk objects when stream=True. No network or
+    credentials are needed, so the assistant, caches and reports run
+    offline with realistic timing. With requests_per_minute set, requests
+    over that quota in any 60 s window raise RateLimitedError like a
+    throttled deployment.
+    """
+
+    def __init__(self, first_token_latency=FIRST_TOKEN_LATENCY, tokens_per_second=TOKENS_PER_SECOND,
+                 responder=stand_in_answer, requests_per_minute=None):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.responder = responder
+        self.requests_per_minute = requests_per_minute
+        self.chat = _Chat(self)
+        self.requests = 0
+        self.rate_limited = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        quota = os.getenv('JALAK_LLM_REQUESTS_PER_MINUTE')
+        return cls(float(os.getenv('JALAK_LLM_LATENCY', FIRST_TOKEN_LATENCY)),
+                   float(os.getenv('JALAK_LLM_TOKENS_PER_SECOND', TOKENS_PER_SECOND)),
+                   requests_per_minute=int(quota) if quota else None)
+
+    def _admit(self):
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0] <= now - 60:
+                self._window.popleft()
+            if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+                self.rate_limited += 1
+                raise RateLimitedError(self._window[0] + 60 - now)
+            self._window.append(now)
+            self.requests += 1
+
+    def _tokens(self, messages, max_tokens):
+        tokens = _split_tokens(self.responder(messages))
+        return tokens[:max_tokens] if max_tokens else tokens
+
+    def _sleep_per_token(self):
+        if self.tokens_per_second:
+            time.sleep(1 / self.tokens_per_second)
+
+    def complete(self, model, messages, stream=False, max_tokens=None):
+        self._admit()
+        tokens = self._tokens(messages, max_tokens)
+        completion_id = f"chatcmpl-local-{uuid.uuid4().hex[:12]}"
+        if stream:
+            return self._stream(completion_id, model, tokens, max_tokens)
+        time.sleep(self.first_token_latency + (len(tokens) / self.tokens_per_second if self.tokens_per_second else 0))
+        return ChatCompletion.model_validate({
+            'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+            'choices': [{'index': 0, 'finish_reason': _finish_reason(tokens, max_tokens),
+                         'message': {'role': 'assistant', 'content': ''.join(tokens)}}],
+            'usage': {'prompt_tokens': _prompt_tokens(messages), 'completion_tokens': len(tokens),
+                      'total_tokens': _prompt_tokens(messages) + len(tokens)},
+        })
+
+    def _stream(self, completion_id, model, tokens, max_tokens):
+        created = int(time.time())
+
+        def chunk(delta, finish_reason=None):
+            return ChatCompletionChunk.model_validate({
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            })
+
+        time.sleep(self.first_token_latency)
+        yield chunk({'role': 'assistant', 'content': ''})
+        for token in tokens:
+            yield chunk({'content': token})
+            self._sleep_per_token()
+        yield chunk({}, _finish_reason(tokens, max_tokens))
+
+
+def _finish_reason(tokens, max_tokens):
+    return 'length' if max_tokens and len(tokens) >= max_tokens else 'stop'
+
+
+def _prompt_tokens(messages):
+    return sum(len(_split_tokens(message.get('content') or '')) for message in messages)
+
+
+def create_client(backend=None, azure_endpoint=None, api_key=None, api_version=None, max_retries=2):
+    """Chat-completions client for the configured backend, or None when Azure is selected without credentials
+
+    max_retries is the openai client's own retry count; pass 0 when a caller such as
+    ai_scheduler.RequestScheduler already retries.
+    """
+    backend = backend or os.getenv(BACKEND_ENV) or BACKEND_AZURE
+    if backend == BACKEND_LOCAL:
+        return LocalChatClient.from_env()
+    if backend.startswith(('http://', 'https://')):
+        from openai import OpenAI
+        return OpenAI(base_url=backend, api_key=api_key or 'local', max_retries=max_retries)
+    if not (azure_endpoint and api_key):
+        return None
+    from openai import AzureOpenAI
+    return AzureOpenAI(api_key=api_key, api_version=api_version, azure_endpoint=azure_endpoint,
+                       max_retries=max_retries)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """POST /v1/chat/completions (and Azure's deployments path) answered by the server's LocalChatClient"""
+
+    def do_POST(self):
+        if not self.path.split('?')[0].endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or '{}')
+        model = request.get('model') or self.path.split('/deployments/')[-1].split('/')[0]
+        try:
+            result = self.server.client.complete(model, request.get('messages', []), stream=request.get('stream', False),
+                                                 max_tokens=request.get('max_tokens'))
+        except RateLimitedError as e:
+            self._send(429, 'application/json', json.dumps({'error': {'code': '429', 'message': str(e)}}).encode('utf-8'),
+                       {'Retry-After': str(max(1, round(e.retry_after)))})
+            return
+        if not request.get('stream'):
+            self._send(200, 'application/json', result.model_dump_json(exclude_none=True).encode('utf-8'))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        for chunk in result:
+            self.wfile.write(f"data: {chunk.model_dump_json(exclude_none=True)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(client=None, host='127.0.0.1', port=DEFAULT_PORT, background=False):
+    """OpenAI-compatible HTTP server around a LocalChatClient; returns the server when run in the background"""
+    server = ThreadingHTTPServer((host, port), _StandInHandler)
+    server.daemon_threads = True
+    server.client = client or LocalChatClient.from_env()
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local chat-completions stand-in for offline runs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=FIRST_TOKEN_LATENCY, help="Seconds before the first token")
+    parser.add_argument('--tokens-per-second', type=float, default=TOKENS_PER_SECOND)
+    parser.add_argument('--requests-per-minute', type=int, default=None, help="Answer 429 above this quota")
+    args = parser.parse_args()
+
+    print(f"Serving on http://{args.host}:{args.port}/v1 "
+          f"(set {BACKEND_ENV}=http://{args.host}:{args.port}/v1 to use it)")
+    serve(LocalChatClient(args.latency, args.tokens_per_second, requests_per_minute=args.requests_per_minute),
+          args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from data_sources import load_map_layer
+from equal_area import WGS84
+
+# Output column -> candidate layer fields, first present wins (WDPA names, then the app's demo layers)
+PROTECTED_AREA_FIELDS = {'protected_area': ('NAME', 'name'), 'designation': ('DESIG', 'status'),
+                         'iucn_category': ('IUCN_CAT',)}
+CONCESSION_FIELDS = {'company': ('company',), 'group_comp': ('group_comp',)}
+# Grid cell size (degrees) of the candidate index, grown when the layer's extent would need more cells
+CELL_SIZE_DEG = 0.025
+MAX_GRID_CELLS = 2_000_000
+
+_COORDINATE = re.compile(r"(-?\d+(?:\.\d+)?)\s*°?\s*([NSEW])?", re.IGNORECASE)
+
+
+def parse_coordinates(text):
+    """(lon, lat) from text such as '0.52°S, 101.43°E' or '-0.52, 101.43' (lat first)"""
+    parts = _COORDINATE.findall(text)
+    if len(parts) != 2:
+        raise ValueError(f"Expected two coordinates in {text!r}")
+    lat = lon = None
+    for position, (value, hemisphere) in enumerate(parts):
+        value = float(value)
+        hemisphere = hemisphere.upper()
+        if hemisphere in ('S', 'W'):
+            value = -abs(value)
+        if hemisphere in ('E', 'W') or (not hemisphere and position == 1):
+            lon = value
+        else:
+            lat = value
+    if lat is None or lon is None:
+        raise ValueError(f"Need one latitude and one longitude in {text!r}")
+    return lon, lat
+
+
+class PolygonIndex:
+    """Grid of polygon candidates built from an STRtree, answering which polygon each point falls in
+
+    At build time the layer's extent is cut into cells and the tree is
+    queried once with all cell boxes, recording per cell the polygons that
+    touch it and whether the cell lies entirely inside each of them. A batch
+    of points then costs one array index per point to find its cell; only
+    points in cells on a polygon edge run a (vectorized, prepared)
+    contains_xy test, and no point geometries are ever built.
+    """
+
+    def __init__(self, gdf, fields, cell_size=CELL_SIZE_DEG):
+        if gdf.crs is not None and not gdf.crs.equals(WGS84):
+            gdf = gdf.to_crs(WGS84)
+        self.geoms = gdf.geometry.to_numpy()
+        shapely.prepare(self.geoms)
+        self.tree = shapely.STRtree(self.geoms)
+        self.attributes = pd.DataFrame(index=range(len(gdf)))
+        for column, candidates in fields.items():
+            source = next((name for name in candidates if name in gdf.columns), None)
+            self.attributes[column] = gdf[source].to_numpy() if source else None
+        self._build_grid(cell_size)
+
+    def _build_grid(self, cell_size):
+        minx, miny, maxx, maxy = shapely.total_bounds(self.geoms) if len(self.geoms) else (0, 0, 0, 0)
+        # Keep the grid near MAX_GRID_CELLS however large the layer's extent
+        cell_size = max(cell_size, np.sqrt((maxx - minx) * (maxy - miny) / MAX_GRID_CELLS))
+        self.origin = (minx, miny)
+        self.cell_size = cell_size
+        self.shape = (int((maxx - minx) // cell_size) + 1, int((maxy - miny) // cell_size) + 1)
+        cx, cy = np.divmod(np.arange(self.shape[0] * self.shape[1]), self.shape[1])
+        boxes = shapely.box(minx + cx * cell_size, miny + cy * cell_size,
+                            minx + (cx + 1) * cell_size, miny + (cy + 1) * cell_size)
+        cells, polygons = self.tree.query(boxes, predicate='intersects')
+        order = np.lexsort((polygons, cells))
+        cells, polygons = cells[order], polygons[order]
+        self.cell_polygons = polygons
+        self.cell_full = shapely.within(boxes[cells], self.geoms[polygons])
+        self.cell_ptr = np.zeros(len(boxes) + 1, dtype=np.int64)
+        self.cell_ptr[1:] = np.cumsum(np.bincount(cells, minlength=len(boxes)))
+
+    def locate(self, lons, lats):
+        """Position of the containing polygon for each point (lowest position on overlaps), -1 if none"""
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        result = np.full(len(lons), -1, dtype=np.int64)
+        if len(self.geoms) == 0:
+            return result
+
+        with np.errstate(invalid='ignore'):
+            cx = np.floor((lons - self.origin[0]) / self.cell_size)
+            cy = np.floor((lats - self.origin[1]) / self.cell_size)
+            on_grid = (cx >= 0) & (cx < self.shape[0]) & (cy >= 0) & (cy < self.shape[1])
+        points = np.flatnonzero(on_grid)
+        cells = cx[points].astype(np.int64) * self.shape[1] + cy[points].astype(np.int64)
+        counts = self.cell_ptr[cells + 1] - self.cell_ptr[cells]
+        points, cells, counts = points[counts > 0], cells[counts > 0], counts[counts > 0]
+
+        # One row per (point, candidate polygon), candidates in ascending polygon order
+        rows = np.repeat(np.arange(len(points)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = self.cell_ptr[cells][rows] + offsets
+        points, polygons = points[rows], self.cell_polygons[candidates]
+        hit = self.cell_full[candidates]
+        edge = ~hit
+        hit[edge] = shapely.contains_xy(self.geoms[polygons[edge]], lons[points[edge]], lats[points[edge]])
+        points, polygons = points[hit], polygons[hit]
+
+        # Rows are grouped by point with ascending polygons, so the first hit per point is the lowest
+        first = np.concatenate([[True], points[1:] != points[:-1]]) if len(points) else np.zeros(0, dtype=bool)
+        result[points[first]] = polygons[first]
+        return result
+
+    def lookup(self, lons, lats):
+        """Layer fields per point as {column: object array}, None outside every polygon"""
+        positions = self.locate(lons, lats)
+        found = positions >= 0
+        columns = {}
+        for column in self.attributes.columns:
+            values = np.full(len(positions), None, dtype=object)
+            values[found] = self.attributes[column].to_numpy(dtype=object)[positions[found]]
+            columns[column] = values
+        return columns
+
+
+class LocationLookup:
+    """Protected area and concession of coordinate batches (field checks, geotagged evidence)"""
+
+    def __init__(self, protected_areas=None, concessions=None, cell_size=CELL_SIZE_DEG):
+        self.indexes = []
+        if protected_areas is not None and len(protected_areas) > 0:
+            self.indexes.append(PolygonIndex(protected_areas, PROTECTED_AREA_FIELDS, cell_size))
+        if concessions is not None and len(concessions) > 0:
+            self.indexes.append(PolygonIndex(concessions, CONCESSION_FIELDS, cell_size))
+
+    @classmethod
+    def from_map_layers(cls, base_dir='.'):
+        return cls(load_map_layer('forest', base_dir), load_map_layer('overlap', base_dir))
+
+    def lookup(self, lons, lats):
+        """One row per point with lon, lat and the fields of the polygons it falls in (missing outside)"""
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        columns = {'lon': lons, 'lat': lats}
+        columns.update({column: np.full(len(lons), None, dtype=object)
+                        for column in {**PROTECTED_AREA_FIELDS, **CONCESSION_FIELDS}})
+        for index in self.indexes:
+            columns.update(index.lookup(lons, lats))
+        return pd.DataFrame(columns)
+
+    def lookup_text(self, text):
+        """Lookup of one coordinate string as cited in reports, as a dict"""
+        lon, lat = parse_coordinates(text)
+        return self.lookup([lon], [lat]).iloc[0].to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Protected area and concession of each point in a CSV")
+    parser.add_argument('points', help="CSV with lon and lat columns")
+    parser.add_argument('--lon', default='lon')
+    parser.add_argument('--lat', default='lat')
+    parser.add_argument('--output', default=None, help="Write the table to this CSV instead of printing it")
+    args = parser.parse_args()
+
+    points = pd.read_csv(args.points)
+    table = LocationLookup.from_map_layers().lookup(points[args.lon], points[args.lat])
+    table = pd.concat([points.drop(columns=[args.lon, args.lat]), table], axis=1)
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import rasterio
+
+from landcover_codec import CLASS_NAMES
+from landcover_inference import TILE_SIZE, load_model, preprocess, torch_predictor
+
+# Minimum mean IoU of the quantized model's classes against the float model's
+MIN_AGREEMENT_IOU = 0.9
+CALIBRATION_TILES = 32
+# Image extensions accepted in calibration and hold-out directories
+TILE_EXTENSIONS = ('.tif', '.tiff', '.png', '.jpg', '.jpeg')
+
+_predictors = {}
+
+
+def read_tiles(directory, tile=TILE_SIZE, limit=None):
+    """Preprocessed (N, 3, tile, tile) array from the RGB images in a directory, sorted by name
+
+    Images are center-cropped (or padded) to the model tile size.
+    """
+    paths = sorted(path for path in Path(directory).iterdir() if path.suffix.lower() in TILE_EXTENSIONS)[:limit]
+    tiles = []
+    for path in paths:
+        if path.suffix.lower() in ('.tif', '.tiff'):
+            with rasterio.open(path) as src:
+                rgb = src.read([1, 2, 3])
+        else:
+            from PIL import Image
+
+            rgb = np.moveaxis(np.asarray(Image.open(path).convert('RGB')), -1, 0)
+        top = max((rgb.shape[1] - tile) // 2, 0)
+        left = max((rgb.shape[2] - tile) // 2, 0)
+        rgb = rgb[:, top:top + tile, left:left + tile]
+        rgb = np.pad(rgb, ((0, 0), (0, tile - rgb.shape[1]), (0, tile - rgb.shape[2])), mode='symmetric')
+        tiles.append(preprocess(rgb))
+    if not tiles:
+        raise ValueError(f"No image tiles found in {directory}")
+    return np.stack(tiles)
+
+
+def _batches(tiles, batch_size):
+    for start in range(0, len(tiles), batch_size):
+        yield tiles[start:start + batch_size]
+
+
+def export_torchscript(model, calibration, out_path, quantize=True, engine='x86'):
+    """Trace the model to TorchScript, statically int8-quantized with FX graph mode
+
+    Dynamic quantization only covers Linear/LSTM layers and leaves the
+    convolutions of DeepLabV3+ in float, so convolutions are quantized
+    statically with activation ranges observed on the calibration tiles.
+    """
+    import torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    model = model.eval()
+    example = (torch.from_numpy(calibration[:1]),)
+    if quantize:
+        torch.backends.quantized.engine = engine
+        prepared = prepare_fx(model, get_default_qconfig_mapping(engine), example)
+        with torch.inference_mode():
+            for batch in _batches(calibration, 2):
+                prepared(torch.from_numpy(batch))
+        model = convert_fx(prepared)
+    with torch.inference_mode():
+        scripted = torch.jit.freeze(torch.jit.trace(model, example))
+    torch.jit.save(scripted, str(out_path))
+    return out_path
+
+
+def export_onnx(model, calibration, out_path, quantize=True):
+    """Export to ONNX and, optionally, statically quantize it with ONNX Runtime (QDQ format)"""
+    import torch
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    out_path = Path(out_path)
+    float_path = out_path.with_name(out_path.stem + '.float.onnx') if quantize else out_path
+    torch.onnx.export(
+        model.eval(), (torch.from_numpy(calibration[:1]),), str(float_path),
+        input_names=['image'], output_names=['probs'], opset_version=17,
+        dynamic_axes={'image': {0: 'batch', 2: 'height', 3: 'width'}, 'probs': {0: 'batch', 2: 'height', 3: 'width'}},
+    )
+    if not quantize:
+        return out_path
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._tiles = iter(calibration[i:i + 1] for i in range(len(calibration)))
+
+        def get_next(self):
+            batch = next(self._tiles, None)
+            return None if batch is None else {'image': batch}
+
+    quantize_static(str(float_path), str(out_path), _Reader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return out_path
+
+
+def _build_predictor(path, threads=None):
+    suffix = Path(path).suffix.lower()
+    if suffix == '.onnx':
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        session = onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+
+        def predict(batch):
+            return session.run(None, {'image': np.ascontiguousarray(batch, dtype=np.float32)})[0]
+        return predict
+
+    import torch
+
+    try:
+        model = torch.jit.load(str(path), map_location='cpu')
+    except RuntimeError:
+        # Not TorchScript: the pickled eager model saved by the training notebook
+        model = load_model(path)
+    return torch_predictor(model, threads=threads)
+
+
+def get_predictor(path, threads=None):
+    """Predictor for a model file, loaded once per process and reused by every later call"""
+    key = (os.getpid(), str(Path(path).resolve()), threads)
+    if key not in _predictors:
+        _predictors[key] = _build_predictor(path, threads)
+    return _predictors[key]
+
+
+def class_iou(reference, candidate, n_classes=len(CLASS_NAMES)):
+    """Per-class IoU of two class maps; classes absent from both are NaN"""
+    confusion = np.bincount(reference.ravel().astype(np.int64) * n_classes + candidate.ravel(),
+                            minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+    intersection = np.diag(confusion).astype(float)
+    union = confusion.sum(axis=0) + confusion.sum(axis=1) - intersection
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, intersection / union, np.nan)
+
+
+def regression_check(reference_predict, candidate_predict, tiles, batch_size=2):
+    """Compare a candidate (e.g. quantized) model with the float model on hold-out tiles
+
+    Returns per-class IoU of the candidate's class map against the float
+    model's, their mean, pixel agreement and the throughput of both.
+    """
+    timings = {}
+    maps = {}
+    for name, predict in (('reference', reference_predict), ('candidate', candidate_predict)):
+        predict(tiles[:1])  # warm-up outside the timing
+        start = time.perf_counter()
+        maps[name] = np.concatenate([np.argmax(predict(batch), axis=1) for batch in _batches(tiles, batch_size)])
+        timings[name] = len(tiles) / (time.perf_counter() - start)
+
+    iou = class_iou(maps['reference'], maps['candidate'])
+    return {
+        'class_iou': dict(zip(CLASS_NAMES, iou)),
+        'mean_iou': float(np.nanmean(iou)),
+        'pixel_agreement': float((maps['reference'] == maps['candidate']).mean()),
+        'reference_tiles_per_second': timings['reference'],
+        'candidate_tiles_per_second': timings['candidate'],
+        'speedup': timings['candidate'] / timings['reference'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the land-cover model for CPU inference and check it")
+    parser.add_argument('model', help="Float model saved by the training notebook (best_model.pth)")
+    parser.add_argument('output', help="Output artifact (.pt for TorchScript, .onnx for ONNX)")
+    parser.add_argument('--calibration-dir', required=True, help="RGB tiles used to calibrate int8 ranges")
+    parser.add_argument('--holdout-dir', required=True, help="RGB tiles for the IoU regression check")
+    parser.add_argument('--no-quantize', action='store_true')
+    parser.add_argument('--tile', type=int, default=TILE_SIZE)
+    parser.add_argument('--min-iou', type=float, default=MIN_AGREEMENT_IOU)
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    calibration = read_tiles(args.calibration_dir, args.tile, limit=CALIBRATION_TILES)
+    export = export_onnx if Path(args.output).suffix.lower() == '.onnx' else export_torchscript
+    export(model, calibration, args.output, quantize=not args.no_quantize)
+    print(f"Exported {args.output} ({Path(args.output).stat().st_size / 1e6:.1f} MB)")
+
+    holdout = read_tiles(args.holdout_dir, args.tile)
+    report = regression_check(torch_predictor(model), get_predictor(args.output), holdout)
+    for name, value in report['class_iou'].items():
+        print(f"  {name:<18} IoU {value:.3f}")
+    print(f"mean IoU {report['mean_iou']:.3f}, pixel agreement {report['pixel_agreement']:.3f}, "
+          f"{report['candidate_tiles_per_second']:.2f} vs {report['reference_tiles_per_second']:.2f} tiles/s "
+          f"({report['speedup']:.1f}x)")
+    if report['mean_iou'] < args.min_iou:
+        print(f"FAILED: mean IoU below {args.min_iou}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
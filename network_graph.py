@@ -0,0 +1,230 @@
+from collections import deque
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Above this many nodes the figure switches to WebGL traces without labels
+WEBGL_NODE_THRESHOLD = 1000
+MAX_EGO_NODES = 5000
+HIGH_RISK_SCORE = 70
+
+NODE_COLORS = {
+    'center': '#DC3545',
+    'person': '#6A4C93',
+    'suspicious': '#8B0000',
+    'high_risk': '#FF6B35',
+    'company': '#4682B4',
+}
+
+# Registry columns that link a person to a company
+_ROLE_COLUMNS = [
+    ('direktur_utama', None, 'Direktur Utama'),
+    ('komisaris_utama', None, 'Komisaris Utama'),
+    ('pemegang_saham_1_nama', 'pemegang_saham_1_persentase', 'Shareholder'),
+    ('pemegang_saham_2_nama', 'pemegang_saham_2_persentase', 'Shareholder'),
+    ('pemegang_saham_3_nama', 'pemegang_saham_3_persentase', 'Shareholder'),
+]
+
+
+def build_entity_graph(transactions_df, companies_df=None, high_risk_score=HIGH_RISK_SCORE):
+    """Build the company/person graph from transfers and registry ownership
+
+    Transfers between the same pair of companies are aggregated into one edge
+    (total amount, count, max risk); registry roles become person -> company edges.
+    """
+    G = nx.DiGraph()
+
+    if transactions_df is not None and len(transactions_df) > 0:
+        tx = transactions_df.dropna(subset=['sender_company', 'receiver_company'])
+        risk = tx['risk_score'] if 'risk_score' in tx.columns else pd.Series(0, index=tx.index)
+        transfers = tx.assign(risk_score=risk).groupby(['sender_company', 'receiver_company']).agg(
+            amount=('amount_idr', 'sum'), count=('amount_idr', 'size'), risk=('risk_score', 'max')).reset_index()
+
+        sent = transfers.groupby('sender_company')['amount'].sum()
+        received = transfers.groupby('receiver_company')['amount'].sum()
+        max_risk = pd.concat([
+            transfers.groupby('sender_company')['risk'].max(),
+            transfers.groupby('receiver_company')['risk'].max()
+        ]).groupby(level=0).max()
+        flow = sent.add(received, fill_value=0)
+        G.add_nodes_from(
+            (name, {'type': 'company', 'risk': int(max_risk.get(name, 0)), 'flow': float(flow[name]),
+                    'is_suspicious': False})
+            for name in flow.index
+        )
+        G.add_edges_from(
+            (row.sender_company, row.receiver_company,
+             {'relation': 'transfer', 'amount': float(row.amount), 'count': int(row.count), 'risk': int(row.risk)})
+            for row in transfers.itertuples(index=False)
+        )
+
+    if companies_df is not None and 'nama_perseroan' in companies_df.columns:
+        registry = companies_df.drop_duplicates('nama_perseroan')
+        for name, risk, suspicious in zip(registry['nama_perseroan'],
+                                          registry.get('risk_score', pd.Series(0, index=registry.index)),
+                                          registry.get('is_suspicious', pd.Series(False, index=registry.index))):
+            attrs = G.nodes[name] if name in G else {'type': 'company', 'flow': 0.0}
+            attrs.update({'risk': int(risk) if pd.notna(risk) else 0, 'is_suspicious': bool(suspicious)})
+            G.add_node(name, **attrs)
+
+        for name_column, share_column, role in _ROLE_COLUMNS:
+            if name_column not in registry.columns:
+                continue
+            people = registry[['nama_perseroan', name_column]].assign(
+                share=registry[share_column] if share_column in registry.columns else np.nan
+            ).dropna(subset=[name_column])
+            G.add_nodes_from((person, {'type': 'person', 'risk': 0, 'flow': 0.0, 'is_suspicious': False})
+                             for person in people[name_column].unique() if person not in G)
+            G.add_edges_from(
+                (person, company, {'relation': role, 'share': float(share) if pd.notna(share) else None})
+                for company, person, share in people.itertuples(index=False)
+            )
+
+    return G
+
+
+def ego_network(G, center, radius=2, max_nodes=MAX_EGO_NODES):
+    """Breadth-first neighborhood of center (ignoring edge direction), capped at max_nodes"""
+    if center not in G:
+        return G.subgraph([]).copy()
+    seen = {center: 0}
+    queue = deque([center])
+    while queue and len(seen) < max_nodes:
+        node = queue.popleft()
+        if seen[node] >= radius:
+            continue
+        for neighbor in _neighbors(G, node):
+            if neighbor not in seen:
+                seen[neighbor] = seen[node] + 1
+                queue.append(neighbor)
+                if len(seen) >= max_nodes:
+                    break
+    H = G.subgraph(seen).copy()
+    nx.set_node_attributes(H, seen, 'hops')
+    return H
+
+
+def _neighbors(G, node):
+    if G.is_directed():
+        yield from G.successors(node)
+        yield from G.predecessors(node)
+    else:
+        yield from G.neighbors(node)
+
+
+def _node_color(attrs, is_center):
+    if is_center:
+        return NODE_COLORS['center']
+    if attrs.get('type') == 'person':
+        return NODE_COLORS['person']
+    if attrs.get('is_suspicious'):
+        return NODE_COLORS['suspicious']
+    if attrs.get('risk', 0) >= HIGH_RISK_SCORE:
+        return NODE_COLORS['high_risk']
+    return NODE_COLORS['company']
+
+
+def network_figure(H, pos, center=None, height=600):
+    """Render a graph with one edge trace, one edge-hover trace and one node trace"""
+    nodes = list(H.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    xy = np.array([pos[node] for node in nodes], dtype=float).reshape(-1, 2)
+    use_webgl = len(nodes) > WEBGL_NODE_THRESHOLD
+    Scatter = go.Scattergl if use_webgl else go.Scatter
+
+    # All edges as one polyline with None breaks between segments
+    edges = list(H.edges(data=True))
+    edge_index = np.array([(index[u], index[v]) for u, v, _ in edges], dtype=int).reshape(-1, 2)
+    segments = np.full((len(edges), 3, 2), np.nan)
+    segments[:, 0] = xy[edge_index[:, 0]]
+    segments[:, 1] = xy[edge_index[:, 1]]
+    segments = segments.reshape(-1, 2)
+
+    edge_text = []
+    for u, v, attrs in edges:
+        if attrs.get('relation') == 'transfer':
+            edge_text.append(f"{u} → {v}<br>Transfer Rp {attrs['amount']/1e9:.2f}B ({attrs['count']} tx)<br>Max risk: {attrs['risk']}")
+        else:
+            share = f" ({attrs['share']:.1f}%)" if attrs.get('share') else ""
+            edge_text.append(f"{u} → {v}<br>{attrs.get('relation', '')}{share}")
+    midpoints = (xy[edge_index[:, 0]] + xy[edge_index[:, 1]]) / 2 if len(edges) else np.empty((0, 2))
+
+    flows = np.array([H.nodes[node].get('flow', 0.0) for node in nodes], dtype=float)
+    sizes = 10 + 30 * np.log1p(flows) / max(np.log1p(flows).max(), 1.0) if len(nodes) else flows
+    colors = [_node_color(H.nodes[node], node == center) for node in nodes]
+    node_text = [
+        f"<b>{node}</b><br>Type: {attrs.get('type', 'company')}<br>Risk: {attrs.get('risk', 0)}/100"
+        + (f"<br>Flow: Rp {attrs['flow']/1e9:.2f}B" if attrs.get('flow') else "")
+        for node, attrs in H.nodes(data=True)
+    ]
+
+    fig = go.Figure()
+    fig.add_trace(Scatter(
+        x=segments[:, 0], y=segments[:, 1],
+        mode='lines',
+        line=dict(width=1, color='rgba(120,120,120,0.5)'),
+        hoverinfo='skip',
+        showlegend=False
+    ))
+    fig.add_trace(Scatter(
+        x=midpoints[:, 0], y=midpoints[:, 1],
+        mode='markers',
+        marker=dict(size=6, color='rgba(0,0,0,0)'),
+        hoverinfo='text',
+        hovertext=edge_text,
+        showlegend=False
+    ))
+    fig.add_trace(Scatter(
+        x=xy[:, 0], y=xy[:, 1],
+        mode='markers' if use_webgl else 'markers+text',
+        marker=dict(size=sizes, color=colors, line=dict(width=1, color='white'), opacity=0.9),
+        text=None if use_webgl else nodes,
+        textposition="bottom center",
+        textfont=dict(size=9, color='black'),
+        hoverinfo='text',
+        hovertext=node_text,
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=20, l=5, r=5, t=40),
+        annotations=[
+            dict(
+                text=f"{center or 'Network'}: {H.number_of_nodes()} entities | {H.number_of_edges()} links",
+                showarrow=False,
+                xref="paper", yref="paper",
+                x=0.005, y=-0.002,
+                xanchor='left', yanchor='bottom',
+                font=dict(color='darkred', size=12)
+            )
+        ],
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        plot_bgcolor='rgba(248,248,255,0.8)',
+        height=height
+    )
+    return fig
+
+
+def build_company_index(companies_df, key='nama_perseroan'):
+    """Company attributes keyed by name (first registry row wins), built once per data load"""
+    if companies_df is None or key not in companies_df.columns:
+        return pd.DataFrame()
+    return companies_df.drop_duplicates(key).set_index(key)
+
+
+def node_attributes(company_index, nodes, defaults):
+    """Attributes for many nodes with one index lookup; unknown nodes get the defaults
+
+    defaults maps column name -> fill value and decides which columns are returned.
+    """
+    frame = company_index.reindex(pd.Index(nodes))
+    result = pd.DataFrame(index=frame.index)
+    for column, default in defaults.items():
+        values = frame[column] if column in frame.columns else pd.Series(default, index=frame.index)
+        result[column] = values.where(values.notna(), default)
+    return result
@@ -0,0 +1,175 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from equal_area import M2_PER_HA, area_ha, projected
+
+TILE_SIZE_M = 100_000
+# Pairs per worker task; tiles are packed into tasks of about this size
+TASK_PAIRS = 2000
+
+
+class SharedGeometries:
+    """Geometries as one WKB buffer in shared memory, decoded lazily by index
+
+    Workers attach by name and only parse the geometries they need, so a
+    layer is serialized once instead of being pickled into every task.
+    """
+
+    def __init__(self, name, offsets, owner=None):
+        self.name = name
+        self.offsets = offsets
+        self._owner = owner
+
+    @classmethod
+    def create(cls, geometries):
+        blobs = shapely.to_wkb(np.asarray(geometries, dtype=object))
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+        shm = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+        shm.buf[:offsets[-1]] = b''.join(blobs)
+        return cls(shm.name, offsets, owner=shm)
+
+    def __getstate__(self):
+        return {'name': self.name, 'offsets': self.offsets}
+
+    def __setstate__(self, state):
+        self.name = state['name']
+        self.offsets = state['offsets']
+        self._owner = None
+
+    def take(self, indices):
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            blobs = [bytes(shm.buf[self.offsets[i]:self.offsets[i + 1]]) for i in indices]
+        finally:
+            shm.close()
+        return shapely.from_wkb(np.array(blobs, dtype=object))
+
+    def release(self):
+        if self._owner is not None:
+            self._owner.close()
+            self._owner.unlink()
+            self._owner = None
+
+
+def candidate_pairs(concession_geoms, forest_geoms):
+    """(concession, forest) index pairs whose bounding boxes intersect"""
+    tree = shapely.STRtree(forest_geoms)
+    concession_idx, forest_idx = tree.query(concession_geoms)
+    return concession_idx, forest_idx
+
+
+def assign_tiles(concession_geoms, forest_geoms, concession_idx, forest_idx, tile_size=TILE_SIZE_M):
+    """Tile of each candidate pair: the tile holding the lower-left corner of the bbox overlap
+
+    A pair whose geometries span several tiles is still assigned to exactly
+    one of them, so merging per-tile results never double counts.
+    """
+    a = shapely.bounds(concession_geoms)[concession_idx]
+    b = shapely.bounds(forest_geoms)[forest_idx]
+    x = np.maximum(a[:, 0], b[:, 0])
+    y = np.maximum(a[:, 1], b[:, 1])
+    return np.floor(x / tile_size).astype(np.int64), np.floor(y / tile_size).astype(np.int64)
+
+
+def _intersect_pairs(concessions, forests, concession_idx, forest_idx):
+    """Worker: intersection areas (m2) for a batch of candidate pairs"""
+    concession_unique, concession_pos = np.unique(concession_idx, return_inverse=True)
+    forest_unique, forest_pos = np.unique(forest_idx, return_inverse=True)
+    a = concessions.take(concession_unique)[concession_pos]
+    b = forests.take(forest_unique)[forest_pos]
+    return concession_idx, forest_idx, shapely.area(shapely.intersection(a, b))
+
+
+def _tasks(tile_x, tile_y, concession_idx, forest_idx, task_pairs):
+    """Pack whole tiles, in a fixed order, into tasks of roughly task_pairs pairs"""
+    order = np.lexsort((forest_idx, concession_idx, tile_y, tile_x))
+    tile_x, tile_y = tile_x[order], tile_y[order]
+    boundaries = np.flatnonzero((np.diff(tile_x) != 0) | (np.diff(tile_y) != 0)) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(order)]])
+
+    tasks, current = [], []
+    size = 0
+    for start, end in zip(starts, ends):
+        current.append(order[start:end])
+        size += end - start
+        if size >= task_pairs:
+            tasks.append(np.concatenate(current))
+            current, size = [], 0
+    if current:
+        tasks.append(np.concatenate(current))
+    return [(concession_idx[task], forest_idx[task]) for task in tasks]
+
+
+def compute_overlaps(concessions_gdf, forest_gdf, workers=None, tile_size=TILE_SIZE_M, task_pairs=TASK_PAIRS,
+                     pool=None):
+    """Concession-forest overlap areas, computed per spatial tile on a process pool
+
+    Returns one row per intersecting (concession, forest) pair, indexed by the
+    positions of the input rows and sorted by them, with overlap_ha in
+    equal-area hectares. The result does not depend on workers or tile_size.
+    Pass pool to run the tiles on an existing executor instead of starting
+    one of workers processes.
+    """
+    columns = ['concession_idx', 'forest_idx', 'overlap_ha']
+    concessions = projected(concessions_gdf)
+    forests = projected(forest_gdf)
+    if len(concessions) == 0 or len(forests) == 0:
+        return pd.DataFrame(columns=columns)
+
+    concession_idx, forest_idx = candidate_pairs(concessions, forests)
+    if len(concession_idx) == 0:
+        return pd.DataFrame(columns=columns)
+    tile_x, tile_y = assign_tiles(concessions, forests, concession_idx, forest_idx, tile_size)
+    tasks = _tasks(tile_x, tile_y, concession_idx, forest_idx, task_pairs)
+
+    workers = workers or os.cpu_count()
+    if pool is None and workers == 1:
+        results = [(a_idx, b_idx, shapely.area(shapely.intersection(concessions[a_idx], forests[b_idx])))
+                   for a_idx, b_idx in tasks]
+    else:
+        shared_concessions = SharedGeometries.create(concessions)
+        shared_forests = SharedGeometries.create(forests)
+        try:
+            if pool is not None:
+                results = list(pool.map(_intersect_pairs, [shared_concessions] * len(tasks),
+                                        [shared_forests] * len(tasks), *zip(*tasks)))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as own_pool:
+                    results = list(own_pool.map(_intersect_pairs, [shared_concessions] * len(tasks),
+                                                [shared_forests] * len(tasks), *zip(*tasks)))
+        finally:
+            shared_concessions.release()
+            shared_forests.release()
+
+    overlaps = pd.DataFrame({
+        'concession_idx': np.concatenate([result[0] for result in results]),
+        'forest_idx': np.concatenate([result[1] for result in results]),
+        'overlap_ha': np.concatenate([result[2] for result in results]) / M2_PER_HA,
+    })
+    overlaps = overlaps[overlaps['overlap_ha'] > 0]
+    return overlaps.sort_values(columns[:2], ignore_index=True)[columns]
+
+
+def summarize_overlaps(concessions_gdf, overlaps):
+    """Per-concession overlapped hectares and share of the concession area
+
+    Assumes the forest layer has no self-overlaps; overlapping forest
+    polygons would be counted once per polygon.
+    """
+    concession_ha = area_ha(concessions_gdf)
+    overlap_ha = np.bincount(overlaps['concession_idx'].to_numpy(dtype=np.int64),
+                             weights=overlaps['overlap_ha'].to_numpy(dtype=float), minlength=len(concession_ha))
+    overlap_ha = np.minimum(overlap_ha, concession_ha)
+    return pd.DataFrame({
+        'area_ha': concession_ha,
+        'overlap_ha': overlap_ha,
+        'overlap_percentage': np.where(concession_ha > 0, 100 * overlap_ha / np.where(concession_ha > 0, concession_ha, 1),
+                                       0.0),
+    }, index=concessions_gdf.index)
@@ -0,0 +1,366 @@
+import argparse
+import hashlib
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import data_sources
+from alert_dedup import AlertDeduplicator
+from alert_store import AlertStore
+from correlation_engine import generate_integrated_alerts, risk_level
+from deforestation_events import DeforestationEventStore
+from detectors import cluster_transactions, detect_cycles, detect_structuring
+from graph_analytics import GraphMetricsStore, compute_graph_metrics
+from graph_layout import graph_hash
+from join_layer import normalize_company_name
+from network_graph import build_entity_graph
+from overlap_engine import compute_overlaps, summarize_overlaps
+from storage import Database
+
+DEFAULT_SHARDS = 8
+MIN_ALERT_SCORE = 60
+# Graph runs are saved under their own name: the dashboard's 'entity' run is built from
+# a different graph (it adds the case study data) and is managed by the dashboard itself
+GRAPH_RUN_NAME = 'entity_batch'
+
+# Weights of the per-company risk score (sum to 100)
+SCORE_WEIGHTS = {
+    'overlap': 35,
+    'high_risk_amount': 25,
+    'structuring': 15,
+    'cycles': 15,
+    'clusters': 10,
+}
+# Component values at which each part of the score saturates
+SCORE_SATURATION = {
+    'overlap_ha': 5000,
+    'high_risk_amount': 10_000_000_000,
+    'n_structuring': 3,
+    'n_cycles': 5,
+    'n_clusters': 3,
+}
+
+
+class Stage:
+    """One node of the pipeline DAG
+
+    func receives the results of deps as keyword arguments. When split is
+    given it turns those inputs into a list of per-partition keyword dicts;
+    each partition runs as its own task and merge combines the results.
+    Local stages run in the driver process (I/O and database writes); with
+    uses_pool they also receive the pipeline's process pool as pool, so work
+    they fan out shares its workers instead of starting more processes.
+    """
+
+    def __init__(self, name, func, deps=(), split=None, merge=None, local=False, uses_pool=False):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.split = split
+        self.merge = merge or _concat
+        self.local = local or uses_pool
+        self.uses_pool = uses_pool
+
+
+def _concat(results):
+    frames = [result for result in results if result is not None and len(result) > 0]
+    if not frames:
+        return results[0] if results else pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_pipeline(stages, workers=None, log=print):
+    """Run stages in dependency order, fanning partitions out over a process pool
+
+    Independent stages run concurrently; a stage starts as soon as all its
+    dependencies have finished. Returns {stage name: result}.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    pending = dict(by_name)
+    results = {}
+    running = {}
+    parts = {}
+    started = {}
+
+    def finish(name, value):
+        results[name] = value
+        log(f"  {name}: done in {time.perf_counter() - started[name]:.2f}s")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            ready = [stage for stage in pending.values() if all(dep in results for dep in stage.deps)]
+            for stage in ready:
+                del pending[stage.name]
+                started[stage.name] = time.perf_counter()
+                inputs = {dep: results[dep] for dep in stage.deps}
+                if stage.local:
+                    if stage.uses_pool:
+                        inputs['pool'] = pool
+                    finish(stage.name, stage.func(**inputs))
+                    continue
+                tasks = stage.split(**inputs) if stage.split else [inputs]
+                if not tasks:
+                    finish(stage.name, stage.merge([]))
+                    continue
+                parts[stage.name] = [None] * len(tasks)
+                for i, task_inputs in enumerate(tasks):
+                    running[pool.submit(stage.func, **task_inputs)] = (stage.name, i)
+                log(f"  {stage.name}: {len(tasks)} task(s) submitted")
+
+            if any(stage.local for stage in ready):
+                # A finished local stage may have unblocked others
+                continue
+            if not running:
+                if pending:
+                    raise ValueError(f"Unsatisfiable dependencies: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, i = running.pop(future)
+                parts[name][i] = future.result()
+                if not any(task_name == name for task_name, _ in running.values()):
+                    finish(name, by_name[name].merge(parts.pop(name)))
+    return results
+
+
+def _shard(name, n_shards):
+    """Deterministic shard of a key (the built-in hash is salted per process)"""
+    return zlib.crc32(str(name).encode('utf-8')) % n_shards
+
+
+def split_by_sender(ingest, n_shards):
+    tx = ingest['transactions']
+    shard = tx['sender_company'].map(lambda name: _shard(name, n_shards))
+    return [{'transactions_df': group} for _, group in tx.groupby(shard)]
+
+
+def split_by_company_pair(ingest, n_shards):
+    tx = ingest['transactions']
+    pair = [min(a, b) + '|' + max(a, b) for a, b in zip(tx['sender_company'].astype(str), tx['receiver_company'].astype(str))]
+    shard = pd.Series([_shard(key, n_shards) for key in pair], index=tx.index)
+    return [{'transactions_df': group} for _, group in tx.groupby(shard)]
+
+
+def split_by_month(ingest):
+    tx = ingest['transactions']
+    return [{'transactions_df': group} for _, group in tx.groupby(tx['transaction_date'].dt.to_period('M'))]
+
+
+def merge_clusters(results):
+    """Pair clusters from all shards, renumbered by total amount as in a single run"""
+    clusters = _concat(results)
+    if len(clusters) == 0:
+        return clusters
+    clusters = clusters.sort_values(['total_amount', 'cluster_id'], ascending=[False, True]).reset_index(drop=True)
+    clusters['cluster_id'] = [f"CLUSTER_{i + 1:03d}" for i in range(len(clusters))]
+    return clusters
+
+
+def ingest(base_dir='.'):
+    """Load every input once in the driver"""
+    transactions_df = data_sources.load_transactions(base_dir)
+    if transactions_df is None:
+        raise FileNotFoundError("transactions.csv not found in . or data/")
+    return {
+        'transactions': transactions_df,
+        'companies': data_sources.load_companies(base_dir),
+        'bank_accounts': data_sources.load_bank_accounts(base_dir),
+        'forest': data_sources.load_map_layer('forest', base_dir),
+        'concessions': data_sources.load_map_layer('sawit', base_dir),
+        'overlaps': data_sources.load_map_layer('overlap', base_dir),
+    }
+
+
+def concession_overlaps(ingest, pool=None):
+    """Forest overlap per company
+
+    With both concession and forest geometry available the intersections
+    are computed tile by tile on the given process pool; otherwise the
+    shipped overlap layer (already clipped to forest) is summarized.
+    """
+    columns = ['company_key', 'company', 'overlap_ha', 'n_polygons', 'center_lat', 'center_lon']
+    concessions, forest = ingest['concessions'], ingest['forest']
+    if concessions is not None and forest is not None and len(concessions) > 0 and len(forest) > 0:
+        layer = concessions
+        overlap_ha = summarize_overlaps(concessions, compute_overlaps(concessions, forest, pool=pool))['overlap_ha']
+    else:
+        layer = ingest['overlaps']
+        if layer is None or len(layer) == 0:
+            return pd.DataFrame(columns=columns)
+        overlap_ha = layer['area_ha'].astype(float)
+
+    points = layer.geometry.representative_point()
+    frame = pd.DataFrame({
+        'company_key': layer['company'].map(normalize_company_name),
+        'company': layer['company'],
+        'overlap_ha': overlap_ha,
+        'center_lat': points.y,
+        'center_lon': points.x,
+    })
+    frame = frame[(frame['company_key'] != "") & (frame['overlap_ha'] > 0)]
+    summary = frame.groupby('company_key').agg(
+        company=('company', 'first'), overlap_ha=('overlap_ha', 'sum'), n_polygons=('overlap_ha', 'size'),
+        center_lat=('center_lat', 'mean'), center_lon=('center_lon', 'mean')).reset_index()
+    return summary[columns]
+
+
+def load_change_events(database_url=None):
+    """Forest loss events recorded by change detection, as the correlation engine's change_events table"""
+    events = [event for event in DeforestationEventStore(database_url).events_between() if event['company']]
+    return pd.DataFrame({
+        'company': [event['company'] for event in events],
+        'event_date': pd.to_datetime([event['event_date'] for event in events]),
+        'hectares': [event['loss_ha'] for event in events],
+    })
+
+
+def entity_graph_metrics(ingest):
+    G = build_entity_graph(ingest['transactions'], ingest['companies'])
+    return {'graph_key': graph_hash(G), 'n_edges': G.number_of_edges(), 'metrics': compute_graph_metrics(G)}
+
+
+def _company_counts(keys):
+    return pd.Series(keys, dtype=object).map(normalize_company_name).value_counts()
+
+
+def score_companies(ingest, overlap, structuring, cycles, clustering):
+    """Combine geospatial and financial findings into one 0-100 score per company"""
+    tx = ingest['transactions']
+    risky = tx[tx['risk_score'] >= 70]
+    high_risk_amount = pd.concat([
+        risky.groupby(risky['sender_company'].map(normalize_company_name))['amount_idr'].sum(),
+        risky.groupby(risky['receiver_company'].map(normalize_company_name))['amount_idr'].sum(),
+    ]).groupby(level=0).sum()
+
+    names = pd.concat([tx['sender_company'], tx['receiver_company'], overlap['company']]).dropna().drop_duplicates()
+    scores = pd.DataFrame({'company': names.to_numpy()})
+    scores['company_key'] = scores['company'].map(normalize_company_name)
+    scores = scores[scores['company_key'] != ""].drop_duplicates('company_key').set_index('company_key')
+
+    scores['overlap_ha'] = overlap.set_index('company_key')['overlap_ha'].reindex(scores.index).fillna(0)
+    scores['high_risk_amount'] = high_risk_amount.reindex(scores.index).fillna(0)
+    scores['n_structuring'] = _company_counts(structuring['company']).reindex(scores.index).fillna(0)
+    scores['n_cycles'] = _company_counts([name for cycle in cycles['companies'] for name in cycle]).reindex(scores.index).fillna(0)
+    scores['n_clusters'] = _company_counts(
+        [name for pair in clustering['companies_involved'] for name in pair]).reindex(scores.index).fillna(0)
+
+    components = {
+        'overlap': scores['overlap_ha'] / SCORE_SATURATION['overlap_ha'],
+        'high_risk_amount': scores['high_risk_amount'] / SCORE_SATURATION['high_risk_amount'],
+        'structuring': scores['n_structuring'] / SCORE_SATURATION['n_structuring'],
+        'cycles': scores['n_cycles'] / SCORE_SATURATION['n_cycles'],
+        'clusters': scores['n_clusters'] / SCORE_SATURATION['n_clusters'],
+    }
+    scores['score'] = sum(SCORE_WEIGHTS[name] * np.minimum(value, 1.0) for name, value in components.items()).round(1)
+    return scores.reset_index().sort_values('score', ascending=False, ignore_index=True)
+
+
+def _alert_id(prefix, *parts):
+    """Stable alert id so re-running the batch updates rather than duplicates alerts"""
+    digest = hashlib.blake2b('|'.join(map(str, parts)).encode('utf-8'), digest_size=4).hexdigest().upper()
+    return f"ALT-{prefix}-{digest}"
+
+
+def generate_alerts(ingest, overlap, scoring, structuring, cycles, change_events, min_score=MIN_ALERT_SCORE):
+    """Alert dicts for high-scoring overlapping companies and every detector hit
+
+    Land-cover change events of overlapping companies are matched to their
+    unusual outflows by correlation_engine.generate_integrated_alerts.
+    """
+    alerts = []
+    flagged = scoring[(scoring['score'] >= min_score) & (scoring['overlap_ha'] > 0)]
+    for row in flagged.itertuples(index=False):
+        alerts.append({
+            'id': _alert_id('INT', row.company_key),
+            'location': 'Concession Area',
+            'type': 'Forest-Concession Overlap + Money Laundering',
+            'risk': risk_level(row.score),
+            'company': row.company,
+            'details': (f"Overlap: {row.overlap_ha:,.0f} ha + Rp {row.high_risk_amount/1e9:.1f}B high-risk transfers, "
+                        f"{int(row.n_structuring)} structuring bursts, {int(row.n_cycles)} cycles"),
+            'alert_source': 'integrated',
+            'score': float(row.score),
+        })
+    # Change events are only correlated for companies whose concessions overlap protected forest
+    overlapping = change_events['company'].map(normalize_company_name).isin(set(overlap['company_key']))
+    alerts += generate_integrated_alerts(change_events[overlapping], ingest['transactions'])
+    for row in structuring.itertuples(index=False):
+        alerts.append({
+            'id': _alert_id('FIN', row.company, *row.transaction_ids),
+            'created_at': pd.Timestamp(row.last_date).isoformat(),
+            'location': 'Financial Network',
+            'type': 'Structuring Pattern',
+            'risk': 'HIGH',
+            'company': row.company,
+            'details': (f"Pattern: {row.n_transactions} transactions < Rp 500M threshold "
+                        f"(Rp {row.total_amount/1e9:.2f}B in {(row.last_date - row.first_date).days + 1} days)"),
+            'alert_source': 'financial',
+            'transaction_ids': list(row.transaction_ids),
+        })
+    for row in cycles.itertuples(index=False):
+        alerts.append({
+            'id': _alert_id('CYC', *row.companies, pd.Timestamp(row.first_date).strftime('%Y%m')),
+            'created_at': pd.Timestamp(row.last_date).isoformat(),
+            'location': 'Financial Network',
+            'type': 'Circular Transfer Cycle',
+            'risk': 'HIGH' if row.length <= 3 else 'MEDIUM',
+            'company': row.companies[0],
+            'details': f"Cycle: {' → '.join(row.companies)} → {row.companies[0]} (Rp {row.cycle_amount/1e9:.2f}B)",
+            'alert_source': 'financial',
+            'companies': list(row.companies),
+        })
+    return alerts
+
+
+def publish(alerts, graph, database_url=None):
+    """Write results to the stores the dashboard reads; repeats go through the deduplicator"""
+    db = Database(database_url)
+    published, merged = AlertDeduplicator(AlertStore(db)).submit(alerts)
+    run_id = GraphMetricsStore(db).save_run(GRAPH_RUN_NAME, graph['graph_key'], graph['metrics'], graph['n_edges'])
+    return {'published': published, 'merged': merged, 'graph_run': run_id}
+
+
+def build_stages(base_dir='.', n_shards=DEFAULT_SHARDS, database_url=None):
+    return [
+        Stage('ingest', partial(ingest, base_dir), local=True),
+        Stage('structuring', detect_structuring, deps=['ingest'], split=partial(split_by_sender, n_shards=n_shards)),
+        Stage('cycles', detect_cycles, deps=['ingest'], split=split_by_month),
+        Stage('clustering', cluster_transactions, deps=['ingest'],
+              split=partial(split_by_company_pair, n_shards=n_shards), merge=merge_clusters),
+        Stage('graph', entity_graph_metrics, deps=['ingest'], merge=lambda results: results[0]),
+        # Runs in the driver and queues its tiles on the shared pool (pool workers cannot start
+        # processes); listed after the pooled stages so their tasks are submitted first
+        Stage('overlap', concession_overlaps, deps=['ingest'], uses_pool=True),
+        Stage('scoring', score_companies, deps=['ingest', 'overlap', 'structuring', 'cycles', 'clustering']),
+        Stage('change_events', partial(load_change_events, database_url), local=True),
+        Stage('alerts', generate_alerts, deps=['ingest', 'overlap', 'scoring', 'structuring', 'cycles', 'change_events'],
+              local=True),
+        Stage('publish', partial(publish, database_url=database_url), deps=['alerts', 'graph'], local=True),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all detectors as a batch and publish results to the shared stores")
+    parser.add_argument('--base-dir', default='.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print(f"Running pipeline with {args.workers} worker(s), {args.shards} company shards")
+    results = run_pipeline(build_stages(args.base_dir, args.shards, args.database_url), workers=args.workers)
+    summary = results['publish']
+    print(f"Done in {time.perf_counter() - start:.2f}s: {len(results['alerts'])} alerts "
+          f"({summary['published']} published, {summary['merged']} merged into existing), "
+          f"graph run {summary['graph_run']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from storage import Database
+
+# Cached analyses expire after a day: the data context changes as new alerts arrive
+DEFAULT_TTL_SECONDS = 24 * 3600
+MAX_ENTRIES = 5000
+MAX_BYTES = 50 * 1024 * 1024
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS ai_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT,
+        response TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        expires_at TEXT NOT NULL,
+        last_access TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )""",
+    # LRU eviction walks entries from the least recently used
+    "CREATE INDEX IF NOT EXISTS idx_ai_response_cache_access ON ai_response_cache (last_access)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_response_cache_expires ON ai_response_cache (expires_at)",
+    """CREATE TABLE IF NOT EXISTS ai_cache_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )""",
+]
+
+
+def normalize_query(query):
+    """Case and whitespace differences do not change the question"""
+    return ' '.join(query.lower().split())
+
+
+def response_cache_key(model, system_prompt, data_context, query, temperature, **params):
+    """Hash of everything that determines a completion; other request params (max_tokens, ...) go in params"""
+    payload = json.dumps({
+        'model': model, 'system': system_prompt, 'context': data_context, 'query': normalize_query(query),
+        'temperature': temperature, 'params': params,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Persistent LLM response cache with TTL expiry, LRU eviction under entry/byte limits and hit counters"""
+
+    def __init__(self, db=None, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.db = db if isinstance(db, Database) else Database(db)
+        self.db.executescript(_SCHEMA)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _count(self, cursor, name):
+        cursor.execute(
+            """INSERT INTO ai_cache_stats (name, value) VALUES (?, 1)
+               ON CONFLICT (name) DO UPDATE SET value = ai_cache_stats.value + 1""",
+            (name,),
+        )
+
+    def get(self, key, now=None):
+        """Cached response for key, or None when missing or expired; counts a hit or a miss"""
+        now = (now or datetime.now()).isoformat(timespec='microseconds')
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT response, expires_at FROM ai_response_cache WHERE cache_key = ?", (key,))
+            rows = cursor.fetchall()
+            if rows and rows[0]['expires_at'] > now:
+                cursor.execute("UPDATE ai_response_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                               (now, key))
+                self._count(cursor, 'hits')
+                return rows[0]['response']
+            if rows:
+                cursor.execute("DELETE FROM ai_response_cache WHERE cache_key = ?", (key,))
+            self._count(cursor, 'misses')
+        return None
+
+    def put(self, key, response, model=None, now=None):
+        now = now or datetime.now()
+        stamp = now.isoformat(timespec='microseconds')
+        expires = (now + timedelta(seconds=self.ttl_seconds)).isoformat(timespec='microseconds')
+        size = len(response.encode('utf-8'))
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                """INSERT INTO ai_response_cache (cache_key, model, response, size_bytes, created_at, expires_at, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (cache_key) DO UPDATE SET
+                       model = excluded.model, response = excluded.response, size_bytes = excluded.size_bytes,
+                       created_at = excluded.created_at, expires_at = excluded.expires_at,
+                       last_access = excluded.last_access""",
+                (key, model, response, size, stamp, expires, stamp),
+            )
+            self._evict(cursor, stamp)
+
+    def _evict(self, cursor, now):
+        """Drop expired entries, then least recently used ones until both limits hold"""
+        cursor.execute("DELETE FROM ai_response_cache WHERE expires_at <= ?", (now,))
+        cursor.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size FROM ai_response_cache")
+        usage = cursor.fetchall()[0]
+        entries, size = usage['entries'], usage['size']
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        cursor.execute("SELECT cache_key, size_bytes FROM ai_response_cache ORDER BY last_access, cache_key")
+        evicted = []
+        for row in cursor.fetchall():
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            evicted.append((row['cache_key'],))
+            entries -= 1
+            size -= row['size_bytes']
+        cursor.executemany("DELETE FROM ai_response_cache WHERE cache_key = ?", evicted)
+        for _ in evicted:
+            self._count(cursor, 'evictions')
+
+    def get_or_create(self, key, create, model=None):
+        """Cached response, or create() stored for next time; returns (response, was_cached)"""
+        response = self.get(key)
+        if response is not None:
+            return response, True
+        response = create()
+        self.put(key, response, model=model)
+        return response, False
+
+    def stats(self):
+        counters = {row['name']: row['value'] for row in self.db.query("SELECT name, value FROM ai_cache_stats")}
+        usage = self.db.query("SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS size FROM ai_response_cache")[0]
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'evictions': counters.get('evictions', 0),
+            'entries': usage['entries'],
+            'size_bytes': usage['size'],
+        }
+
+    def clear(self):
+        self.db.executescript(["DELETE FROM ai_response_cache", "DELETE FROM ai_cache_stats"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the AI response cache")
+    parser.add_argument('--clear', action='store_true')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.database_url)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['entries']} entries ({stats['size_bytes'] / 1e6:.1f} MB), "
+          f"hit rate {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses), "
+          f"{stats['evictions']} evictions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from alert_store import AlertStore
+from case_store import CaseStore
+from storage import Database
+
+# BM25 parameters (Robertson/Okapi defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOP_K = 8
+# Retrieved context per prompt, in estimated tokens
+CONTEXT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4
+# Stores are polled for new cases/alerts at most this often
+REFRESH_SECONDS = 2.0
+
+KIND_CASE = 'case'
+KIND_STR = 'str'
+KIND_ALERT = 'alert'
+KIND_COMPANY = 'company'
+KIND_TRANSACTIONS = 'transactions'
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+# Indonesian and English function words, plus legal-form prefixes every company name carries
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has have in is it of on or the to was were with what which who how
+    ada adalah akan apa atau bagaimana dalam dan dari dengan di ini itu ke mana oleh pada siapa untuk yang
+    tbk pt cv
+""".split())
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(str(text).lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class BM25Index:
+    """In-memory BM25 index that accepts document upserts and removals at any time
+
+    Postings are kept per term, so adding or replacing a document only
+    touches that document's terms and a search only walks the postings of
+    the query terms; nothing is rebuilt as documents arrive.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}
+        self.postings = defaultdict(dict)
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def upsert(self, doc_id, text, kind, title=None):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self.remove(doc_id)
+            self.docs[doc_id] = {'doc_id': doc_id, 'kind': kind, 'title': title or doc_id, 'text': text,
+                                 'length': sum(terms.values()), 'terms': list(terms)}
+            self.total_length += self.docs[doc_id]['length']
+            for term, count in terms.items():
+                self.postings[term][doc_id] = count
+
+    def remove(self, doc_id):
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            self.total_length -= doc['length']
+            for term in doc['terms']:
+                postings = self.postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query, k=TOP_K, kinds=None):
+        """Top-k (score, doc) pairs for a query, best first; kinds restricts document types"""
+        with self._lock:
+            n = len(self.docs)
+            if n == 0:
+                return []
+            average_length = self.total_length / n or 1
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.docs[doc_id]['length'] / average_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            results = []
+            for doc_id, score in ranked:
+                doc = self.docs[doc_id]
+                if kinds is None or doc['kind'] in kinds:
+                    results.append((score, doc))
+                    if len(results) == k:
+                        break
+            return results
+
+
+def _format_amount(amount):
+    return f"Rp {amount / 1e9:,.1f} miliar" if abs(amount) >= 1e9 else f"Rp {amount / 1e6:,.0f} juta"
+
+
+def company_documents(companies_df):
+    """One profile document per registry company (pt_data.csv layout)"""
+    docs = []
+    for row in companies_df.itertuples(index=False):
+        row = row._asdict()
+        name = row.get('nama_perseroan', '')
+        owners = [f"{row[f'pemegang_saham_{i}_nama']} ({row.get(f'pemegang_saham_{i}_persentase'):.1f}%)"
+                  for i in (1, 2, 3) if pd.notna(row.get(f'pemegang_saham_{i}_nama'))]
+        text = (f"Profil perusahaan {name} ({row.get('company_id')}). Status: {row.get('status_perusahaan')}. "
+                f"Usaha: {row.get('maksud_tujuan')}. Alamat: {row.get('alamat_lengkap')}. "
+                f"Direktur utama: {row.get('direktur_utama')}. Komisaris utama: {row.get('komisaris_utama')}. "
+                f"Pemegang saham: {', '.join(owners) or '-'}. Risk score: {row.get('risk_score')}, "
+                f"suspicious: {row.get('is_suspicious')}.")
+        docs.append((f"company:{row.get('company_id') or name}", ' '.join(text.split()), KIND_COMPANY, name))
+    return docs
+
+
+def transaction_documents(transactions_df, top_counterparties=5):
+    """One summary per company of its outgoing and incoming transfers"""
+    docs = []
+    tx = transactions_df.copy()
+    tx['transaction_date'] = pd.to_datetime(tx['transaction_date'])
+    tx['_flagged'] = tx['is_flagged'].astype(str).str.lower() == 'true' if 'is_flagged' in tx.columns else False
+    if 'transaction_type' not in tx.columns:
+        tx['transaction_type'] = 'transfer'
+    for side, other, label in (('sender_company', 'receiver_company', 'keluar'),
+                               ('receiver_company', 'sender_company', 'masuk')):
+        for company, group in tx.groupby(side):
+            counterparties = group.groupby(other)['amount_idr'].sum().nlargest(top_counterparties)
+            types = group['transaction_type'].value_counts().head(3)
+            text = (f"Ringkasan transaksi {label} {company}: {len(group)} transaksi senilai "
+                    f"{_format_amount(group['amount_idr'].sum())} antara {group['transaction_date'].min():%Y-%m-%d} "
+                    f"dan {group['transaction_date'].max():%Y-%m-%d}; {int(group['_flagged'].sum())} ditandai mencurigakan, "
+                    f"risk score rata-rata {group['risk_score'].mean():.0f}. "
+                    f"Jenis: {', '.join(f'{name} ({count})' for name, count in types.items())}. "
+                    f"Counterparty utama: {', '.join(f'{name} ({_format_amount(amount)})' for name, amount in counterparties.items())}.")
+            docs.append((f"transactions:{label}:{company}", text, KIND_TRANSACTIONS, f"Transaksi {label} {company}"))
+    return docs
+
+
+def alert_document(alert):
+    text = (f"Alert {alert['id']} ({alert.get('risk')}, status {alert.get('status')}): {alert.get('type')} - "
+            f"{alert.get('company')} di {alert.get('location')}. {alert.get('details')}. "
+            f"Terdeteksi {alert.get('created_at')}, {alert.get('occurrences', 1)} kali.")
+    return f"alert:{alert['id']}", text, KIND_ALERT, f"Alert {alert['id']}"
+
+
+def case_document(case):
+    # The summary is the alert the case was opened from; its bookkeeping fields are noise for search
+    summary = {key: value for key, value in (case.get('case_summary') or {}).items()
+               if value is not None and key not in ('id', 'time', 'created_at', 'updated_at', 'status', 'occurrences')}
+    text = (f"Kasus investigasi {case['alert_id']} ({case['priority']}, status {case['status']}), "
+            f"ditangani {case['assigned_to']} sejak {case['start_date']:%Y-%m-%d}. "
+            f"Ringkasan: {'; '.join(f'{key}: {value}' for key, value in summary.items())}. "
+            f"Bukti: {'; '.join(case['evidence_collected']) or '-'}. "
+            f"Tindakan: {'; '.join(case['next_actions']) or '-'}. "
+            f"Selesai: {'; '.join(sorted(case['completed_actions'])) or '-'}.")
+    return f"case:{case['alert_id']}", text, KIND_CASE, f"Kasus {case['alert_id']}"
+
+
+class RetrievalIndex:
+    """Search over cases, STR reports, alerts, company profiles and transaction summaries
+
+    Static sources (registry, transactions) are indexed once. Cases, STRs
+    and alerts are followed incrementally: each search first pulls the case
+    events and alert changes since the last poll, so new material becomes
+    searchable within REFRESH_SECONDS.
+    """
+
+    def __init__(self, alert_store=None, case_store=None, refresh_seconds=REFRESH_SECONDS):
+        self.index = BM25Index()
+        self.alert_store = alert_store
+        self.case_store = case_store
+        self.refresh_seconds = refresh_seconds
+        self._alert_cursor = ('', '')
+        self._case_event_id = 0
+        self._last_refresh = None
+        self._refresh_lock = threading.Lock()
+
+    def add_documents(self, docs):
+        for doc_id, text, kind, title in docs:
+            self.index.upsert(doc_id, text, kind, title)
+        return len(docs)
+
+    def refresh(self, force=False):
+        """Index alerts and cases changed since the last poll; returns the number of documents updated"""
+        if not force and self._last_refresh is not None and time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return 0
+        with self._refresh_lock:
+            updated = 0
+            if self.alert_store is not None:
+                while True:
+                    alerts = self.alert_store.changed_since(self._alert_cursor)
+                    if not alerts:
+                        break
+                    updated += self.add_documents([alert_document(alert) for alert in alerts])
+                    self._alert_cursor = (alerts[-1]['updated_at'], alerts[-1]['id'])
+                # updated_at has second resolution: re-read the last second next time, upserts are idempotent
+                self._alert_cursor = (self._alert_cursor[0], '')
+            if self.case_store is not None:
+                changed = set()
+                while True:
+                    events = self.case_store.events_since(self._case_event_id)
+                    if not events:
+                        break
+                    for event in events:
+                        changed.add(event['case_id'])
+                        if event['event_type'] == 'str_report':
+                            updated += self.add_documents([(f"str:{event['event_id']}", event['content'], KIND_STR,
+                                                            f"STR {event['case_id']} {event['created_at'][:10]}")])
+                    self._case_event_id = events[-1]['event_id']
+                for case_id in sorted(changed):
+                    case = self.case_store.load_case(case_id)
+                    if case is not None:
+                        updated += self.add_documents([case_document(case)])
+            self._last_refresh = time.monotonic()
+            return updated
+
+    def search(self, query, k=TOP_K, kinds=None):
+        self.refresh()
+        return self.index.search(query, k=k, kinds=kinds)
+
+    def context(self, query, token_budget=CONTEXT_TOKEN_BUDGET, k=TOP_K):
+        """Best-matching snippets for a prompt, most relevant first, cut to fit token_budget"""
+        snippets = []
+        remaining = token_budget
+        for _, doc in self.search(query, k=k):
+            snippet = f"[{doc['title']}] {doc['text']}"
+            if estimate_tokens(snippet) > remaining:
+                if remaining < 50:
+                    break
+                snippet = snippet[:remaining * CHARS_PER_TOKEN - 3] + '...'
+            snippets.append(snippet)
+            remaining -= estimate_tokens(snippet)
+        return '\n'.join(snippets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search cases, STRs, alerts, companies and transaction summaries")
+    parser.add_argument('query')
+    parser.add_argument('--companies', default='data/pt_data.csv')
+    parser.add_argument('--transactions', default='data/transactions.csv')
+    parser.add_argument('--token-budget', type=int, default=CONTEXT_TOKEN_BUDGET)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    db = Database(args.database_url)
+    index = RetrievalIndex(AlertStore(db), CaseStore(db))
+    start = time.perf_counter()
+    index.add_documents(company_documents(pd.read_csv(args.companies)))
+    index.add_documents(transaction_documents(pd.read_csv(args.transactions)))
+    index.refresh(force=True)
+    print(f"{len(index.index)} documents indexed in {time.perf_counter() - start:.2f}s\n")
+    print(index.context(args.query, token_budget=args.token_budget))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# SQLite file used when no database URL is configured
+DEFAULT_DATABASE_URL = "sqlite:///jalakhijau.db"
+
+
+def get_database_url():
+    """Database URL from the environment, falling back to the local SQLite file"""
+    return os.getenv('JALAK_DATABASE_URL') or os.getenv('DATABASE_URL') or DEFAULT_DATABASE_URL
+
+
+class Database:
+    """Thin wrapper over a SQLite or Postgres (psycopg2) connection
+
+    SQL is written with '?' placeholders and rewritten for psycopg2. A lock
+    serializes access so one connection can be shared by Streamlit sessions.
+    """
+
+    def __init__(self, url=None):
+        self.url = url or get_database_url()
+        self._lock = threading.RLock()
+        if self.url.startswith(('postgres://', 'postgresql://')):
+            import psycopg2
+            self.dialect = 'postgres'
+            self._conn = psycopg2.connect(self.url)
+        else:
+            self.dialect = 'sqlite'
+            path = self.url[len('sqlite:///'):] if self.url.startswith('sqlite:///') else self.url
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            if path != ':memory:':
+                # WAL lets readers in other processes proceed while a writer commits
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _sql(self, sql):
+        return sql.replace('?', '%s') if self.dialect == 'postgres' else sql
+
+    @contextmanager
+    def transaction(self):
+        """Run statements atomically; yields a cursor"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                yield _Cursor(self, cursor)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute(self, sql, params=()):
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def executemany(self, sql, rows):
+        with self.transaction() as cursor:
+            cursor.executemany(sql, rows)
+
+    def executescript(self, statements):
+        with self.transaction() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def query(self, sql, params=()):
+        """Return all rows as dicts"""
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Cursor:
+    def __init__(self, db, cursor):
+        self._db = db
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(self._db._sql(sql), tuple(params))
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(self._db._sql(sql), [tuple(row) for row in rows])
+
+    def fetchall(self):
+        if self._cursor.description is None:
+            return []
+        columns = [column[0] for column in self._cursor.description]
+        return [dict(zip(columns, row)) for row in self._cursor.fetchall()]
@@ -15,6 +15,8 @@ from openai import AzureOpenAI
 import os
 from io import StringIO
 import base64
+from graph_layout import LayoutService
+from network_graph import build_company_index, node_attributes
 
 # Page config
 st.set_page_config(
@@ -147,6 +149,11 @@ def load_company_data():
     except:
         return generate_demo_companies()
 
+@st.cache_data
+def load_company_index():
+    """Company attributes keyed by name, built once per data load"""
+    return build_company_index(load_company_data())
+
 @st.cache_data
 def load_transaction_data():
     """Load transaction data"""
@@ -158,6 +165,11 @@ def load_transaction_data():
     except:
         return generate_demo_transactions()
 
+@st.cache_resource
+def get_layout_service():
+    """Graph layouts shared across reruns and sessions"""
+    return LayoutService()
+
 def generate_synthetic_geodata():
     """Generate synthetic geospatial data for demo"""
     # Indonesia bounding box (approximate)
@@ -597,6 +609,7 @@ def create_company_network():
     
     # Load company data
     companies_df = load_company_data()
+    company_index = load_company_index()
     transactions_df, high_risk_df, clusters_df = load_transaction_data()
     
     col1, col2 = st.columns([1, 2])
@@ -610,7 +623,7 @@ def create_company_network():
         
         if selected_company:
             # Get company details
-            company_info = companies_df[companies_df['nama_perseroan'] == selected_company].iloc[0]
+            company_info = company_index.loc[selected_company]
             
             st.markdown("### 📊 Profile Perusahaan")
             
@@ -651,14 +664,7 @@ def create_company_network():
         G = nx.Graph()
         
         # Add nodes for companies
-        for idx, company in companies_df.iterrows():
-            node_color = 'red' if company.get('is_suspicious', False) else 'lightblue'
-            G.add_node(
-                company['nama_perseroan'], 
-                color=node_color,
-                size=company.get('risk_score', 30),
-                type='company'
-            )
+        G.add_nodes_from(company_index.index, type='company')
         
         # Add some relationships (demo)
         suspicious_companies = companies_df[companies_df.get('is_suspicious', False) == True]['nama_perseroan'].tolist()
@@ -667,7 +673,7 @@ def create_company_network():
                 G.add_edge(suspicious_companies[i], suspicious_companies[i + 1], weight=0.8)
         
         # Create plotly network visualization
-        pos = nx.spring_layout(G, k=3, iterations=50)
+        pos = get_layout_service().layout(G, key='company_network')
         
         # Extract edges
         edge_x = []
@@ -678,29 +684,17 @@ def create_company_network():
             edge_x.extend([x0, x1, None])
             edge_y.extend([y0, y1, None])
         
-        # Extract nodes
-        node_x = []
-        node_y = []
-        node_text = []
-        node_colors = []
-        node_sizes = []
-        
-        for node in G.nodes():
-            x, y = pos[node]
-            node_x.append(x)
-            node_y.append(y)
-            node_text.append(node)
-            
-            # Get node attributes
-            node_data = companies_df[companies_df['nama_perseroan'] == node]
-            if len(node_data) > 0:
-                is_suspicious = node_data.iloc[0].get('is_suspicious', False)
-                risk_score = node_data.iloc[0].get('risk_score', 30)
-                node_colors.append('red' if is_suspicious else 'lightblue')
-                node_sizes.append(max(15, risk_score / 3))
-            else:
-                node_colors.append('lightblue')
-                node_sizes.append(15)
+        # Extract nodes with one indexed lookup for all node attributes
+        nodes = list(G.nodes())
+        node_xy = np.array([pos[node] for node in nodes]).reshape(-1, 2)
+        node_x, node_y = node_xy[:, 0], node_xy[:, 1]
+        node_text = nodes
+        attrs = node_attributes(company_index, nodes, {'is_suspicious': False, 'risk_score': 30})
+        is_suspicious = attrs['is_suspicious'].astype(bool).to_numpy()
+        node_colors = np.where(is_suspicious, 'red', 'lightblue')
+        node_sizes = np.maximum(15, attrs['risk_score'].to_numpy(dtype=float) / 3)
+        hover_risk = node_attributes(company_index, nodes, {'risk_score': 0})['risk_score']
+        node_hovertext = (pd.Series(nodes, dtype=str) + "<br>Risk Score: " + hover_risk.astype(str).to_numpy()).tolist()
         
         # Create plotly figure
         fig = go.Figure()
@@ -725,7 +719,7 @@ def create_company_network():
                 color=node_colors,
                 line=dict(width=2, color='white')
             ),
-            hovertext=[f"{node}<br>Risk Score: {companies_df[companies_df['nama_perseroan']==node].iloc[0].get('risk_score', 0) if len(companies_df[companies_df['nama_perseroan']==node]) > 0 else 0}" for node in G.nodes()]
+            hovertext=node_hovertext
         ))
         
         fig.update_layout(
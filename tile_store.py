@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from landcover_codec import CLASS_NAMES, one_hot, rgb_to_classes
+
+CHUNK_SIZE = 256
+CROP_SIZE = 1024
+INDEX_FILE = 'index.json'
+
+
+def _read_rgb(path):
+    return np.asarray(Image.open(path).convert('RGB'))
+
+
+def _to_chunks(array, chunk):
+    """(H, W, ...) array to (rows * cols, chunk, chunk, ...) chunks, zero-padded at the edges"""
+    height, width = array.shape[:2]
+    rows, cols = -(-height // chunk), -(-width // chunk)
+    padded = np.zeros((rows * chunk, cols * chunk) + array.shape[2:], dtype=array.dtype)
+    padded[:height, :width] = array
+    blocks = padded.reshape((rows, chunk, cols, chunk) + array.shape[2:]).swapaxes(1, 2)
+    return blocks.reshape((rows * cols, chunk, chunk) + array.shape[2:]), rows, cols
+
+
+def build_tile_store(pairs, out_dir, chunk=CHUNK_SIZE):
+    """Convert (image path, mask path) pairs into a chunked, memory-mappable tile store
+
+    Images are stored as uint8 RGB and masks as uint8 class indices, both in
+    chunk x chunk blocks laid out chunk by chunk, so a crop reads only the
+    blocks it overlaps. Decoding and mask conversion happen once here
+    instead of once per training sample.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    items = []
+    total_chunks = 0
+    for image_path, mask_path in pairs:
+        with Image.open(image_path) as image:
+            width, height = image.size
+        rows, cols = -(-height // chunk), -(-width // chunk)
+        items.append({'image': str(image_path), 'mask': str(mask_path), 'height': height, 'width': width,
+                      'rows': rows, 'cols': cols, 'offset': total_chunks})
+        total_chunks += rows * cols
+
+    images = np.lib.format.open_memmap(out_dir / 'images.npy', mode='w+', dtype=np.uint8,
+                                       shape=(total_chunks, chunk, chunk, 3))
+    masks = np.lib.format.open_memmap(out_dir / 'masks.npy', mode='w+', dtype=np.uint8,
+                                      shape=(total_chunks, chunk, chunk))
+    for item in items:
+        start, end = item['offset'], item['offset'] + item['rows'] * item['cols']
+        images[start:end] = _to_chunks(_read_rgb(item['image']), chunk)[0]
+        masks[start:end] = _to_chunks(rgb_to_classes(_read_rgb(item['mask'])), chunk)[0]
+    images.flush()
+    masks.flush()
+    del images, masks
+
+    with open(out_dir / INDEX_FILE, 'w') as f:
+        json.dump({'chunk': chunk, 'classes': CLASS_NAMES, 'items': items}, f)
+    return TileStore(out_dir)
+
+
+class TileStore:
+    """Read-only view of a tile store; arrays are memory-mapped, so opening it costs nothing"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / INDEX_FILE) as f:
+            index = json.load(f)
+        self.chunk = index['chunk']
+        self.class_names = index['classes']
+        self.items = index['items']
+        self.images = np.load(self.path / 'images.npy', mmap_mode='r')
+        self.masks = np.load(self.path / 'masks.npy', mmap_mode='r')
+
+    def __len__(self):
+        return len(self.items)
+
+    def shape(self, i):
+        return self.items[i]['height'], self.items[i]['width']
+
+    def read_window(self, i, top, left, height, width):
+        """Image (height, width, 3) and class mask (height, width) of one window, touching only its chunks"""
+        item = self.items[i]
+        if top < 0 or left < 0 or top + height > item['height'] or left + width > item['width']:
+            raise ValueError(f"Window ({top}, {left}, {height}, {width}) outside item {i} "
+                             f"of size {item['height']}x{item['width']}")
+        c = self.chunk
+        row0, row1 = top // c, (top + height - 1) // c + 1
+        col0, col1 = left // c, (left + width - 1) // c + 1
+        chunk_ids = (item['offset'] + np.arange(row0, row1)[:, None] * item['cols'] + np.arange(col0, col1)).ravel()
+
+        def assemble(array):
+            blocks = array[chunk_ids].reshape((row1 - row0, col1 - col0, c, c) + array.shape[3:])
+            mosaic = blocks.swapaxes(1, 2).reshape(((row1 - row0) * c, (col1 - col0) * c) + array.shape[3:])
+            y, x = top - row0 * c, left - col0 * c
+            return mosaic[y:y + height, x:x + width]
+
+        return assemble(self.images), assemble(self.masks)
+
+
+class CropDataset:
+    """Random-crop training samples from a tile store
+
+    Drop-in for the notebook's LandCoverDataset: returns (image, one-hot
+    mask) before preprocessing, with the crop taken from the store rather
+    than from a fully decoded image. augmentation (e.g. flips) and
+    preprocessing are albumentations-style callables. Works with
+    torch.utils.data.DataLoader, which only needs __len__/__getitem__.
+    """
+
+    def __init__(self, store, crop=CROP_SIZE, augmentation=None, preprocessing=None, seed=None):
+        self.store = store if isinstance(store, TileStore) else TileStore(store)
+        self.crop = crop
+        self.augmentation = augmentation
+        self.preprocessing = preprocessing
+        self.seed = seed
+        self._rng = None
+        self._rng_pid = None
+
+    def __len__(self):
+        return len(self.store)
+
+    def _random(self):
+        # DataLoader workers are forked; give each process its own stream
+        if self._rng is None or self._rng_pid != os.getpid():
+            self._rng = np.random.default_rng(None if self.seed is None else (self.seed, os.getpid()))
+            self._rng_pid = os.getpid()
+        return self._rng
+
+    def __getitem__(self, i):
+        height, width = self.store.shape(i)
+        crop_h, crop_w = min(self.crop, height), min(self.crop, width)
+        rng = self._random()
+        top = int(rng.integers(0, height - crop_h + 1))
+        left = int(rng.integers(0, width - crop_w + 1))
+        image, classes = self.store.read_window(i, top, left, crop_h, crop_w)
+        mask = one_hot(classes, len(self.store.class_names), dtype='float')
+
+        if self.augmentation:
+            sample = self.augmentation(image=np.ascontiguousarray(image), mask=mask)
+            image, mask = sample['image'], sample['mask']
+        if self.preprocessing:
+            sample = self.preprocessing(image=image, mask=mask)
+            image, mask = sample['image'], sample['mask']
+        return image, mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a chunked tile store from the DeepGlobe metadata.csv")
+    parser.add_argument('data_dir', help="DeepGlobe dataset directory containing metadata.csv")
+    parser.add_argument('out_dir')
+    parser.add_argument('--split', default='train')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    metadata = pd.read_csv(Path(args.data_dir) / 'metadata.csv')
+    metadata = metadata[metadata['split'] == args.split].dropna(subset=['mask_path'])
+    pairs = [(Path(args.data_dir) / image, Path(args.data_dir) / mask)
+             for image, mask in zip(metadata['sat_image_path'], metadata['mask_path'])]
+    store = build_tile_store(pairs, args.out_dir, chunk=args.chunk)
+    size = sum(f.stat().st_size for f in Path(args.out_dir).iterdir())
+    print(f"{len(store)} images stored in {args.out_dir} ({size / 1e9:.2f} GB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import rasterio
+import shapely
+from rasterio import features, windows
+
+from change_detection import row_pixel_area_ha
+from landcover_codec import CLASS_NAMES
+
+TILE_SIZE = 2048
+
+_datasets = {}
+
+
+def _dataset(path):
+    """One open handle per raster per process"""
+    if path not in _datasets:
+        _datasets[path] = rasterio.open(path)
+    return _datasets[path]
+
+
+def _tiles(src, tile_size):
+    """Windows of about tile_size pixels, aligned to the raster's internal blocks"""
+    block_h, block_w = src.block_shapes[0]
+    step_h = max(block_h, tile_size // block_h * block_h)
+    step_w = max(block_w, tile_size // block_w * block_w)
+    for row in range(0, src.height, step_h):
+        for col in range(0, src.width, step_w):
+            yield windows.Window(col, row, min(step_w, src.width - col), min(step_h, src.height - row))
+
+
+def _non_overlapping_groups(geoms):
+    """Split polygons into groups without interior overlaps, so each group rasterizes losslessly"""
+    if len(geoms) < 2:
+        return [np.arange(len(geoms))]
+    tree = shapely.STRtree(geoms)
+    left, right = tree.query(geoms, predicate='intersects')
+    keep = left < right
+    left, right = left[keep], right[keep]
+    overlapping = ~shapely.touches(geoms[left], geoms[right])
+    conflicts = {}
+    for a, b in zip(left[overlapping], right[overlapping]):
+        conflicts.setdefault(a, set()).add(b)
+        conflicts.setdefault(b, set()).add(a)
+
+    group_of = np.full(len(geoms), -1)
+    for i in range(len(geoms)):
+        taken = {group_of[j] for j in conflicts.get(i, ())}
+        group = 0
+        while group in taken:
+            group += 1
+        group_of[i] = group
+    return [np.flatnonzero(group_of == group) for group in range(group_of.max() + 1)]
+
+
+def _tile_histogram(raster_path, window, zone_ids, zone_wkb, n_classes):
+    """Worker: class areas (ha) per zone for one tile
+
+    Returns (zone_ids, matrix of shape (len(zone_ids), n_classes)).
+    """
+    src = _dataset(raster_path)
+    classes = src.read(1, window=window)
+    transform = windows.transform(window, src.transform)
+    area = np.broadcast_to(row_pixel_area_ha(src.transform, src.crs, window)[:, None], classes.shape).ravel()
+    valid = (classes < n_classes).ravel()
+    class_flat = classes.ravel().astype(np.int64)
+
+    geoms = shapely.from_wkb(np.asarray(zone_wkb, dtype=object))
+    histogram = np.zeros((len(zone_ids), n_classes))
+    for group in _non_overlapping_groups(geoms):
+        # Local zone numbers 1..k in this group; 0 is outside every zone
+        zones = features.rasterize(zip(geoms[group], group + 1), out_shape=classes.shape,
+                                   transform=transform, fill=0, dtype='int32').ravel()
+        inside = valid & (zones > 0)
+        combined = (zones[inside] - 1) * n_classes + class_flat[inside]
+        histogram += np.bincount(combined, weights=area[inside],
+                                 minlength=len(zone_ids) * n_classes).reshape(len(zone_ids), n_classes)
+    return zone_ids, histogram
+
+
+def zonal_class_areas(raster_path, zones_gdf, class_names=CLASS_NAMES, tile_size=TILE_SIZE, workers=None):
+    """Land-cover class area (ha) per polygon from a classified raster
+
+    The raster is cut into block-aligned tiles; each tile rasterizes only the
+    polygons that touch it and histograms zone x class with one bincount.
+    Tiles run on a process pool and are summed in tile order, so results do
+    not depend on the number of workers. Overlapping polygons each get their
+    full histogram.
+    """
+    n_classes = len(class_names)
+    with rasterio.open(raster_path) as src:
+        zones = zones_gdf.to_crs(src.crs) if zones_gdf.crs and src.crs else zones_gdf
+        geoms = zones.geometry.to_numpy()
+        tree = shapely.STRtree(geoms)
+        tasks = []
+        for window in _tiles(src, tile_size):
+            hits = np.sort(tree.query(shapely.box(*windows.bounds(window, src.transform)), predicate='intersects'))
+            if len(hits):
+                tasks.append((window, hits, shapely.to_wkb(geoms[hits])))
+
+    totals = np.zeros((len(geoms), n_classes))
+    args = ([raster_path] * len(tasks), [task[0] for task in tasks], [task[1] for task in tasks],
+            [task[2] for task in tasks], [n_classes] * len(tasks))
+    if (workers or os.cpu_count()) == 1:
+        results = map(_tile_histogram, *args)
+        for zone_ids, histogram in results:
+            totals[zone_ids] += histogram
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for zone_ids, histogram in pool.map(_tile_histogram, *args):
+                totals[zone_ids] += histogram
+
+    result = pd.DataFrame(totals, index=zones_gdf.index, columns=[f"{name}_ha" for name in class_names])
+    result['classified_ha'] = totals.sum(axis=1)
+    if 'forest_land' in class_names:
+        forest = result['forest_land_ha']
+        result['forest_percentage'] = np.where(result['classified_ha'] > 0,
+                                               100 * forest / result['classified_ha'].where(result['classified_ha'] > 0, 1), 0.0)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Land-cover class areas per polygon from a classified GeoTIFF")
+    parser.add_argument('raster', help="Single-band class raster (0-6, 255 = nodata)")
+    parser.add_argument('--zones', default='map/overlap.shp')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--tile-size', type=int, default=TILE_SIZE)
+    parser.add_argument('--output', default=None, help="Write the table to this CSV instead of printing it")
+    args = parser.parse_args()
+
+    zones = gpd.read_file(args.zones)
+    stats = zonal_class_areas(args.raster, zones, tile_size=args.tile_size, workers=args.workers)
+    keep = [column for column in ('company', 'name', 'group_comp') if column in zones.columns]
+    table = zones[keep].join(stats)
+    if args.output:
+        table.to_csv(args.output)
+    else:
+        print(table.to_string())
+
+
+if __name__ == '__main__':
+    main()